@@ -172,7 +172,7 @@ SELECT
     AVG(CAST(r.NumGuests AS FLOAT)) AS AvgGuestsPerReservation,
     AVG(CAST(r.NumGuests AS FLOAT)) / t.Capacity * 100 AS UtilizationRate,
     COUNT(DISTINCT CASE WHEN r.Status = 'Completed' THEN r.ReservationID END) AS CompletedReservations,
-    COUNT(DISTINCT CASE WHEN r.Status = 'No-Show' THEN r.ReservationID END) AS NoShows
+    COUNT(DISTINCT CASE WHEN r.Status = 'Canceled' THEN r.ReservationID END) AS CanceledReservations
 FROM TABLES t
 LEFT JOIN RESERVATIONS r ON t.TableID = r.TableID
 GROUP BY t.TableNumber, t.Capacity;
@@ -438,7 +438,7 @@ SELECT
     AVG(CAST(r.NumGuests AS FLOAT)) AS AvgGuestsPerReservation,
     AVG(CAST(r.NumGuests AS FLOAT)) / t.Capacity * 100 AS UtilizationRate,
     COUNT(DISTINCT CASE WHEN r.Status = 'Completed' THEN r.ReservationID END) AS CompletedReservations,
-    COUNT(DISTINCT CASE WHEN r.Status = 'No-Show' THEN r.ReservationID END) AS NoShows
+    COUNT(DISTINCT CASE WHEN r.Status = 'Canceled' THEN r.ReservationID END) AS CanceledReservations
 FROM TABLES t
 LEFT JOIN RESERVATIONS r ON t.TableID = r.TableID
 GROUP BY t.TableNumber, t.Capacity;
@@ -458,6 +458,191 @@ JOIN SUPPLYORDERS so ON s.SupplierID = so.SupplierID
 GROUP BY s.Name, YEAR(so.OrderDate), MONTH(so.OrderDate);
 GO
 
+-- ============================================================================
+-- SECTION 6: MATERIALIZED AGGREGATES
+-- ============================================================================
+
+/*
+    Table occupancy per table per hour slot
+    A reservation counts toward the hour it starts in (Reservations, Guests and status counts)
+    and occupies its table for two hour slots (OccupiedSlots), matching the API's 120-minute
+    reservation length. Canceled reservations never occupy a table.
+*/
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'TableOccupancyHourly')
+CREATE TABLE TableOccupancyHourly (
+    TableID INT NOT NULL,
+    SlotStart DATETIME NOT NULL, -- Truncated to the hour
+    Reservations INT NOT NULL DEFAULT(0),
+    Completed INT NOT NULL DEFAULT(0),
+    Canceled INT NOT NULL DEFAULT(0),
+    Guests INT NOT NULL DEFAULT(0),
+    OccupiedSlots INT NOT NULL DEFAULT(0),
+    CONSTRAINT PK_TableOccupancyHourly PRIMARY KEY (SlotStart, TableID)
+);
+GO
+
+-- Older versions kept a NoShows column, but CK_RESERVATIONS_Status has no such status
+IF COL_LENGTH('TableOccupancyHourly', 'NoShows') IS NOT NULL
+BEGIN
+    DECLARE @DefaultName SYSNAME = (
+        SELECT dc.name FROM sys.default_constraints dc
+        JOIN sys.columns c ON c.object_id = dc.parent_object_id AND c.column_id = dc.parent_column_id
+        WHERE dc.parent_object_id = OBJECT_ID('TableOccupancyHourly') AND c.name = 'NoShows'
+    );
+    IF @DefaultName IS NOT NULL
+        EXEC ('ALTER TABLE TableOccupancyHourly DROP CONSTRAINT ' + QUOTENAME(@DefaultName));
+    ALTER TABLE TableOccupancyHourly DROP COLUMN NoShows;
+END;
+GO
+
+-- Rebuild the occupancy table from scratch (initial load, or after bulk changes with triggers disabled).
+-- Reads archived reservations too once archiveDB.sql has created RESERVATIONS_All; dynamic SQL
+-- because the view only exists on the archived layout.
+CREATE OR ALTER PROCEDURE sp_RebuildTableOccupancy
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    DECLARE @Source NVARCHAR(128) = CASE WHEN OBJECT_ID('RESERVATIONS_All') IS NOT NULL
+        THEN N'RESERVATIONS_All' ELSE N'RESERVATIONS' END;
+    DECLARE @Sql NVARCHAR(MAX) = N'
+    INSERT INTO TableOccupancyHourly (TableID, SlotStart, Reservations, Completed, Canceled, Guests, OccupiedSlots)
+    SELECT 
+        r.TableID,
+        DATEADD(HOUR, DATEDIFF(HOUR, 0, r.ReservationDateTime) + s.Offset, 0) AS SlotStart,
+        SUM(CASE WHEN s.Offset = 0 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN s.Offset = 0 AND r.Status = ''Completed'' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN s.Offset = 0 AND r.Status = ''Canceled'' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN s.Offset = 0 AND r.Status <> ''Canceled'' THEN r.NumGuests ELSE 0 END),
+        SUM(CASE WHEN r.Status <> ''Canceled'' THEN 1 ELSE 0 END)
+    FROM ' + @Source + N' r
+    CROSS JOIN (VALUES (0), (1)) AS s(Offset)
+    GROUP BY r.TableID, DATEADD(HOUR, DATEDIFF(HOUR, 0, r.ReservationDateTime) + s.Offset, 0);';
+    
+    BEGIN TRANSACTION;
+    TRUNCATE TABLE TableOccupancyHourly;
+    EXEC sp_executesql @Sql;
+    COMMIT TRANSACTION;
+END;
+GO
+
+-- Keep occupancy current by applying each reservation change as a +/- delta
+CREATE OR ALTER TRIGGER trg_MaintainTableOccupancy
+ON RESERVATIONS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    
+    -- Reservations moved to RESERVATIONS_Archive (archiveDB.sql) keep their occupancy history
+    IF CAST(SESSION_CONTEXT(N'archiving') AS INT) = 1
+        RETURN;
+    
+    WITH Changes AS (
+        SELECT TableID, ReservationDateTime, NumGuests, Status, 1 AS Sign FROM inserted
+        UNION ALL
+        SELECT TableID, ReservationDateTime, NumGuests, Status, -1 AS Sign FROM deleted
+    ),
+    Deltas AS (
+        SELECT 
+            c.TableID,
+            DATEADD(HOUR, DATEDIFF(HOUR, 0, c.ReservationDateTime) + s.Offset, 0) AS SlotStart,
+            SUM(CASE WHEN s.Offset = 0 THEN c.Sign ELSE 0 END) AS Reservations,
+            SUM(CASE WHEN s.Offset = 0 AND c.Status = 'Completed' THEN c.Sign ELSE 0 END) AS Completed,
+            SUM(CASE WHEN s.Offset = 0 AND c.Status = 'Canceled' THEN c.Sign ELSE 0 END) AS Canceled,
+            SUM(CASE WHEN s.Offset = 0 AND c.Status <> 'Canceled' THEN c.Sign * c.NumGuests ELSE 0 END) AS Guests,
+            SUM(CASE WHEN c.Status <> 'Canceled' THEN c.Sign ELSE 0 END) AS OccupiedSlots
+        FROM Changes c
+        CROSS JOIN (VALUES (0), (1)) AS s(Offset)
+        GROUP BY c.TableID, DATEADD(HOUR, DATEDIFF(HOUR, 0, c.ReservationDateTime) + s.Offset, 0)
+    )
+    MERGE TableOccupancyHourly AS t
+    USING Deltas AS d
+        ON t.TableID = d.TableID AND t.SlotStart = d.SlotStart
+    WHEN MATCHED THEN UPDATE SET
+        Reservations = t.Reservations + d.Reservations,
+        Completed = t.Completed + d.Completed,
+        Canceled = t.Canceled + d.Canceled,
+        Guests = t.Guests + d.Guests,
+        OccupiedSlots = t.OccupiedSlots + d.OccupiedSlots
+    WHEN NOT MATCHED THEN
+        INSERT (TableID, SlotStart, Reservations, Completed, Canceled, Guests, OccupiedSlots)
+        VALUES (d.TableID, d.SlotStart, d.Reservations, d.Completed, d.Canceled, d.Guests, d.OccupiedSlots);
+END;
+GO
+
+-- Initial load; on reruns the trigger has kept the table current
+IF NOT EXISTS (SELECT 1 FROM TableOccupancyHourly)
+    EXEC sp_RebuildTableOccupancy;
+GO
+
+-- ============================================================================
+-- SECTION 7: CHANGE POLLING
+-- ============================================================================
+
+/*
+    ORDERS.RowVer changes on every insert and update (including the order total
+    recalculation by trg_UpdateOrderTotal), so the API's live feed reads only rows
+    changed since its last poll. buildDB.sql creates it; this upgrades older databases.
+*/
+IF COL_LENGTH('ORDERS', 'RowVer') IS NULL
+    ALTER TABLE ORDERS ADD RowVer ROWVERSION;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_ORDERS_RowVer' AND object_id = OBJECT_ID('ORDERS'))
+    CREATE INDEX IX_ORDERS_RowVer ON ORDERS(RowVer);
+GO
+
+-- Partition switching (partitionDB.sql) needs the switch-out table to match ORDERS exactly
+IF OBJECT_ID('ORDERS_SwitchOut') IS NOT NULL AND COL_LENGTH('ORDERS_SwitchOut', 'RowVer') IS NULL
+BEGIN
+    ALTER TABLE ORDERS_SwitchOut ADD RowVer ROWVERSION;
+    EXEC ('CREATE INDEX IX_ORDERS_SwitchOut_RowVer ON ORDERS_SwitchOut(RowVer) ON ps_OrderMonth(OrderDateTime);');
+END;
+GO
+
+-- ============================================================================
+-- SECTION 8: CUSTOMER RFM SCORES
+-- ============================================================================
+
+/*
+    Recency, frequency and monetary scores (1-5, by quintile) and a segment for every
+    customer with paid orders. The API (customer_rfm.py) scores all customers at once in
+    NumPy and writes only the rows that changed. It resumes from the ORDERS row version
+    recorded in CustomerRFMWatermark, so restarts re-aggregate only customers whose
+    orders changed since the last write.
+*/
+IF OBJECT_ID('CustomerRFM') IS NULL
+    CREATE TABLE CustomerRFM (
+        CustomerID INT NOT NULL PRIMARY KEY,
+        LastOrder DATETIME NOT NULL,
+        Frequency INT NOT NULL,             -- Paid orders
+        Monetary DECIMAL(12, 2) NOT NULL,   -- Paid order totals
+        RecencyScore TINYINT NOT NULL,
+        FrequencyScore TINYINT NOT NULL,
+        MonetaryScore TINYINT NOT NULL,
+        Segment VARCHAR(30) NOT NULL,
+        ScoredAt DATETIME NOT NULL
+    );
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CustomerRFM_Segment' AND object_id = OBJECT_ID('CustomerRFM'))
+    CREATE INDEX IX_CustomerRFM_Segment ON CustomerRFM(Segment) INCLUDE (Monetary);
+GO
+
+-- One row; RowVer stays NULL until the first scores are written
+IF OBJECT_ID('CustomerRFMWatermark') IS NULL
+    CREATE TABLE CustomerRFMWatermark (
+        Id TINYINT NOT NULL PRIMARY KEY CHECK (Id = 1),
+        RowVer BIGINT NULL
+    );
+GO
+
+IF NOT EXISTS (SELECT 1 FROM CustomerRFMWatermark WHERE Id = 1)
+    INSERT INTO CustomerRFMWatermark (Id, RowVer) VALUES (1, NULL);
+GO
+
 PRINT 'Restaurant analytics objects created successfully!';
 PRINT 'Use sp_DailySalesSummary, sp_CustomerLoyaltyReport, sp_InventoryReorderAlert, sp_StaffPerformance, sp_MonthlyTrends, sp_MenuProfitability for insights.';
 GO
\ No newline at end of file
@@ -0,0 +1,269 @@
+/*
+    Optional hot/cold tiering of order history (migration)
+    Purpose: Move closed months of ORDERS, ORDERITEMS and RESERVATIONS into compact
+             columnstore archive tables, keep one summary row per archived month, and
+             expose hot and archived rows together through ORDERS_All, ORDERITEMS_All
+             and RESERVATIONS_All.
+
+    - EXEC sp_ArchiveClosedPeriods @KeepMonths = 24 moves every month older than the
+      window, one month per transaction
+    - On the partitioned layout (partitionDB.sql), run sp_SlideOrderWindow first; the
+      rows it leaves in ORDERS_SwitchOut/ORDERITEMS_SwitchOut are archived from there
+    - The API reads the _All views only when a requested range starts before the oldest
+      hot month (set ORDER_ARCHIVE=1 in app/.env)
+
+    Run after buildDB.sql and Analytics.sql on SQL Server 2016 SP1 or later. Safe to rerun.
+    Undo with unarchiveDB.sql.
+*/
+USE RestaurantDB;
+GO
+
+-- ============================================================================
+-- SECTION 1: ARCHIVE TABLES
+-- ============================================================================
+
+-- Clustered columnstore: archived months are read in bulk and compress far better than rowstore
+IF OBJECT_ID('ORDERS_Archive') IS NULL
+BEGIN
+    CREATE TABLE ORDERS_Archive (
+        OrderID INT NOT NULL,
+        CustomerID INT NOT NULL,
+        StaffID INT NOT NULL,
+        OrderType VARCHAR(20) NOT NULL,
+        TotalAmount DECIMAL(10,2) NOT NULL,
+        OrderDateTime DATETIME NOT NULL,
+        PaymentStatus VARCHAR(20) NOT NULL
+    );
+    CREATE CLUSTERED COLUMNSTORE INDEX CCI_ORDERS_Archive ON ORDERS_Archive;
+    -- Per-customer re-aggregation (RFM scores) seeks instead of scanning the archive
+    CREATE INDEX IX_ORDERS_Archive_CustomerID ON ORDERS_Archive(CustomerID);
+END;
+GO
+
+IF OBJECT_ID('ORDERITEMS_Archive') IS NULL
+BEGIN
+    CREATE TABLE ORDERITEMS_Archive (
+        OrderItemID INT NOT NULL,
+        OrderID INT NOT NULL,
+        MenuItemID INT NOT NULL,
+        Quantity INT NOT NULL,
+        PriceAtPurchase DECIMAL(10,2) NOT NULL,
+        OrderDateTime DATETIME NOT NULL -- Copied from the order so archived items can be read by month
+    );
+    CREATE CLUSTERED COLUMNSTORE INDEX CCI_ORDERITEMS_Archive ON ORDERITEMS_Archive;
+END;
+GO
+
+IF OBJECT_ID('RESERVATIONS_Archive') IS NULL
+BEGIN
+    CREATE TABLE RESERVATIONS_Archive (
+        ReservationID INT NOT NULL,
+        CustomerID INT NOT NULL,
+        TableID INT NOT NULL,
+        ReservationDateTime DATETIME NOT NULL,
+        NumGuests INT NOT NULL,
+        Status VARCHAR(20) NOT NULL
+    );
+    CREATE CLUSTERED COLUMNSTORE INDEX CCI_RESERVATIONS_Archive ON RESERVATIONS_Archive;
+END;
+GO
+
+-- One summary row per archived month; late rows archived later are added to their month
+IF OBJECT_ID('ArchivedPeriods') IS NULL
+    CREATE TABLE ArchivedPeriods (
+        PeriodStart DATE NOT NULL PRIMARY KEY,
+        PeriodEnd DATE NOT NULL,
+        Orders INT NOT NULL,
+        PaidOrders INT NOT NULL,
+        PaidRevenue DECIMAL(14,2) NOT NULL,
+        OrderItems INT NOT NULL,
+        ItemQuantity INT NOT NULL,
+        Reservations INT NOT NULL,
+        ReservedGuests INT NOT NULL,
+        ArchivedAt DATETIME NOT NULL DEFAULT(GETDATE())
+    );
+GO
+
+-- ============================================================================
+-- SECTION 2: UNIFIED VIEWS
+-- ============================================================================
+
+/*
+    Archived orders report a zero row version: older than any change poll, so pollers
+    (RowVer >= last seen) skip the archive branch, while snapshots (RowVer < upper bound)
+    include it.
+*/
+CREATE OR ALTER VIEW ORDERS_All AS
+SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus, RowVer
+FROM ORDERS
+UNION ALL
+SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus, CAST(0 AS BINARY(8))
+FROM ORDERS_Archive;
+GO
+
+CREATE OR ALTER VIEW ORDERITEMS_All AS
+SELECT OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase
+FROM ORDERITEMS
+UNION ALL
+SELECT OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase
+FROM ORDERITEMS_Archive;
+GO
+
+CREATE OR ALTER VIEW RESERVATIONS_All AS
+SELECT ReservationID, CustomerID, TableID, ReservationDateTime, NumGuests, Status
+FROM RESERVATIONS
+UNION ALL
+SELECT ReservationID, CustomerID, TableID, ReservationDateTime, NumGuests, Status
+FROM RESERVATIONS_Archive;
+GO
+
+-- ============================================================================
+-- SECTION 3: ARCHIVAL
+-- ============================================================================
+
+/*
+    Move every month before the @KeepMonths window from the hot tables to the archive.
+    Each month is staged with DELETE ... OUTPUT, summarized into ArchivedPeriods and
+    appended to the archive in one transaction. trg_MaintainTableOccupancy ignores these
+    deletes, so TableOccupancyHourly keeps the archived history.
+*/
+CREATE OR ALTER PROCEDURE sp_ArchiveClosedPeriods
+    @KeepMonths INT = 24
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @Cutoff DATETIME = DATEADD(MONTH, -@KeepMonths, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    DECLARE @Month DATETIME;
+    DECLARE @Next DATETIME;
+    DECLARE @SwitchedOut BIT;
+
+    CREATE TABLE #Orders (
+        OrderID INT NOT NULL, CustomerID INT NOT NULL, StaffID INT NOT NULL, OrderType VARCHAR(20) NOT NULL,
+        TotalAmount DECIMAL(10,2) NOT NULL, OrderDateTime DATETIME NOT NULL, PaymentStatus VARCHAR(20) NOT NULL
+    );
+    CREATE TABLE #Items (
+        OrderItemID INT NOT NULL, OrderID INT NOT NULL, MenuItemID INT NOT NULL, Quantity INT NOT NULL,
+        PriceAtPurchase DECIMAL(10,2) NOT NULL, OrderDateTime DATETIME NOT NULL
+    );
+    CREATE TABLE #Reservations (
+        ReservationID INT NOT NULL, CustomerID INT NOT NULL, TableID INT NOT NULL,
+        ReservationDateTime DATETIME NOT NULL, NumGuests INT NOT NULL, Status VARCHAR(20) NOT NULL
+    );
+
+    EXEC sp_set_session_context @key = N'archiving', @value = 1;
+
+    WHILE 1 = 1
+    BEGIN
+        -- Rows left in the switch-out tables by sp_SlideOrderWindow go first, all at once.
+        -- Dynamic SQL because the tables only exist on the partitioned layout.
+        SET @SwitchedOut = 0;
+        IF OBJECT_ID('ORDERS_SwitchOut') IS NOT NULL
+            EXEC sp_executesql
+                N'SET @Rows = CASE WHEN EXISTS (SELECT 1 FROM ORDERS_SwitchOut) OR EXISTS (SELECT 1 FROM ORDERITEMS_SwitchOut) THEN 1 ELSE 0 END',
+                N'@Rows BIT OUTPUT', @Rows = @SwitchedOut OUTPUT;
+
+        IF @SwitchedOut = 1
+        BEGIN
+            BEGIN TRANSACTION;
+            INSERT INTO #Orders
+            SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus FROM ORDERS_SwitchOut;
+            INSERT INTO #Items
+            SELECT OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime FROM ORDERITEMS_SwitchOut;
+            TRUNCATE TABLE ORDERITEMS_SwitchOut;
+            TRUNCATE TABLE ORDERS_SwitchOut;
+        END
+        ELSE
+        BEGIN
+            SELECT @Month = MIN(FirstMonth)
+            FROM (
+                SELECT MIN(OrderDateTime) FROM ORDERS WHERE OrderDateTime < @Cutoff
+                UNION ALL
+                SELECT MIN(ReservationDateTime) FROM RESERVATIONS WHERE ReservationDateTime < @Cutoff
+            ) AS oldest(FirstMonth);
+            IF @Month IS NULL
+                BREAK;
+            SET @Month = DATEFROMPARTS(YEAR(@Month), MONTH(@Month), 1);
+            SET @Next = DATEADD(MONTH, 1, @Month);
+
+            BEGIN TRANSACTION;
+
+            -- Items first (foreign key); all of an order's items leave with it
+            DELETE oi
+            OUTPUT deleted.OrderItemID, deleted.OrderID, deleted.MenuItemID, deleted.Quantity, deleted.PriceAtPurchase, o.OrderDateTime
+            INTO #Items
+            FROM ORDERITEMS oi
+            JOIN ORDERS o ON oi.OrderID = o.OrderID
+            WHERE o.OrderDateTime >= @Month AND o.OrderDateTime < @Next;
+
+            DELETE FROM ORDERS
+            OUTPUT deleted.OrderID, deleted.CustomerID, deleted.StaffID, deleted.OrderType,
+                deleted.TotalAmount, deleted.OrderDateTime, deleted.PaymentStatus
+            INTO #Orders
+            WHERE OrderDateTime >= @Month AND OrderDateTime < @Next;
+
+            DELETE FROM RESERVATIONS
+            OUTPUT deleted.ReservationID, deleted.CustomerID, deleted.TableID,
+                deleted.ReservationDateTime, deleted.NumGuests, deleted.Status
+            INTO #Reservations
+            WHERE ReservationDateTime >= @Month AND ReservationDateTime < @Next;
+        END;
+
+        WITH Periods AS (
+            SELECT DATEFROMPARTS(YEAR(OrderDateTime), MONTH(OrderDateTime), 1) AS PeriodStart,
+                1 AS Orders,
+                CASE WHEN PaymentStatus = 'Paid' THEN 1 ELSE 0 END AS PaidOrders,
+                CASE WHEN PaymentStatus = 'Paid' THEN TotalAmount ELSE 0 END AS PaidRevenue,
+                0 AS OrderItems, 0 AS ItemQuantity, 0 AS Reservations, 0 AS ReservedGuests
+            FROM #Orders
+            UNION ALL
+            SELECT DATEFROMPARTS(YEAR(OrderDateTime), MONTH(OrderDateTime), 1), 0, 0, 0, 1, Quantity, 0, 0
+            FROM #Items
+            UNION ALL
+            SELECT DATEFROMPARTS(YEAR(ReservationDateTime), MONTH(ReservationDateTime), 1), 0, 0, 0, 0, 0, 1, NumGuests
+            FROM #Reservations
+        ),
+        Summary AS (
+            SELECT PeriodStart, SUM(Orders) AS Orders, SUM(PaidOrders) AS PaidOrders, SUM(PaidRevenue) AS PaidRevenue,
+                SUM(OrderItems) AS OrderItems, SUM(ItemQuantity) AS ItemQuantity,
+                SUM(Reservations) AS Reservations, SUM(ReservedGuests) AS ReservedGuests
+            FROM Periods
+            GROUP BY PeriodStart
+        )
+        MERGE ArchivedPeriods AS t
+        USING Summary AS s ON t.PeriodStart = s.PeriodStart
+        WHEN MATCHED THEN UPDATE SET
+            Orders = t.Orders + s.Orders,
+            PaidOrders = t.PaidOrders + s.PaidOrders,
+            PaidRevenue = t.PaidRevenue + s.PaidRevenue,
+            OrderItems = t.OrderItems + s.OrderItems,
+            ItemQuantity = t.ItemQuantity + s.ItemQuantity,
+            Reservations = t.Reservations + s.Reservations,
+            ReservedGuests = t.ReservedGuests + s.ReservedGuests,
+            ArchivedAt = GETDATE()
+        WHEN NOT MATCHED THEN
+            INSERT (PeriodStart, PeriodEnd, Orders, PaidOrders, PaidRevenue, OrderItems, ItemQuantity, Reservations, ReservedGuests)
+            VALUES (s.PeriodStart, DATEADD(MONTH, 1, s.PeriodStart), s.Orders, s.PaidOrders, s.PaidRevenue,
+                s.OrderItems, s.ItemQuantity, s.Reservations, s.ReservedGuests);
+
+        INSERT INTO ORDERS_Archive SELECT * FROM #Orders;
+        INSERT INTO ORDERITEMS_Archive SELECT * FROM #Items;
+        INSERT INTO RESERVATIONS_Archive SELECT * FROM #Reservations;
+
+        COMMIT TRANSACTION;
+
+        TRUNCATE TABLE #Orders;
+        TRUNCATE TABLE #Items;
+        TRUNCATE TABLE #Reservations;
+    END;
+
+    EXEC sp_set_session_context @key = N'archiving', @value = NULL;
+
+    SELECT * FROM ArchivedPeriods ORDER BY PeriodStart;
+END;
+GO
+
+PRINT 'Archive tables, views and sp_ArchiveClosedPeriods are ready.';
+PRINT 'Run EXEC sp_ArchiveClosedPeriods @KeepMonths = 24; (monthly) and set ORDER_ARCHIVE=1 for the API.';
+GO
@@ -141,6 +141,7 @@ CREATE TABLE ORDERS (
     ---------------------------------------------------------------------
     OrderDateTime DATETIME NOT NULL DEFAULT(GETDATE()),
     PaymentStatus VARCHAR(20) NOT NULL,
+    RowVer ROWVERSION, -- Bumped on every insert/update so readers can poll for changed orders
     ---------------------------------------------------------------------
     CONSTRAINT FK_ORDERS_CUSTOMER FOREIGN KEY (CustomerID) REFERENCES CUSTOMERS(CustomerID),
     CONSTRAINT FK_ORDERS_STAFF FOREIGN KEY (StaffID) REFERENCES STAFF(StaffID),
@@ -187,6 +188,8 @@ CREATE INDEX IX_SUPPLYORDERITEMS_SupplyOrderID ON SUPPLYORDERITEMS(SupplyOrderID
 CREATE INDEX IX_SUPPLYORDERITEMS_InventoryID ON SUPPLYORDERITEMS(InventoryID);
 CREATE INDEX IX_ORDERS_CustomerID ON ORDERS(CustomerID);
 CREATE INDEX IX_ORDERS_StaffID ON ORDERS(StaffID);
+CREATE INDEX IX_ORDERS_OrderDateTime ON ORDERS(OrderDateTime); -- Lets incremental readers fetch only recent orders
+CREATE INDEX IX_ORDERS_RowVer ON ORDERS(RowVer); -- Change polling seeks past the last seen row version
 CREATE INDEX IX_ORDERITEMS_OrderID ON ORDERITEMS(OrderID);
 CREATE INDEX IX_ORDERITEMS_MenuItemID ON ORDERITEMS(MenuItemID);
 CREATE INDEX IX_RESERVATIONS_CustomerID ON RESERVATIONS(CustomerID);
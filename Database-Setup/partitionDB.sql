@@ -0,0 +1,305 @@
+/*
+    Optional physical design for large order volumes (migration)
+    Purpose: Partition ORDERS and ORDERITEMS by month on OrderDateTime and add nonclustered
+             columnstore indexes for the analytic columns used by the dashboard queries.
+
+    - ORDERITEMS gets its own OrderDateTime (copied from ORDERS) so both tables share one
+      partition scheme and every index is aligned, which allows sliding-window SWITCH
+    - Primary keys become (ID, OrderDateTime); the composite foreign key cascades date changes
+    - sp_AddOrderMonthPartitions / sp_SlideOrderWindow maintain the monthly boundaries
+
+    Run after buildDB.sql (and seedDB.sql) on SQL Server 2016 SP1 or later.
+    Undo with unpartitionDB.sql.
+*/
+USE RestaurantDB;
+GO
+
+IF EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_OrderMonth')
+BEGIN
+    RAISERROR('RestaurantDB is already partitioned; nothing to do.', 16, 1);
+    SET NOEXEC ON;
+END;
+GO
+
+-- ============================================================================
+-- SECTION 1: PARTITION FUNCTION AND SCHEME
+-- ============================================================================
+
+-- One boundary per month from the first order through three months ahead (RANGE RIGHT: boundary = first day of month)
+DECLARE @FirstMonth DATE = ISNULL(
+    (SELECT DATEFROMPARTS(YEAR(MIN(OrderDateTime)), MONTH(MIN(OrderDateTime)), 1) FROM ORDERS),
+    DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1)
+);
+DECLARE @LastMonth DATE = DATEADD(MONTH, 3, DATEFROMPARTS(
+    YEAR(ISNULL((SELECT MAX(OrderDateTime) FROM ORDERS), GETDATE())),
+    MONTH(ISNULL((SELECT MAX(OrderDateTime) FROM ORDERS), GETDATE())), 1));
+IF @LastMonth < DATEADD(MONTH, 3, GETDATE())
+    SET @LastMonth = DATEADD(MONTH, 3, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+
+DECLARE @Boundaries NVARCHAR(MAX) = N'';
+DECLARE @Month DATE = @FirstMonth;
+WHILE @Month <= @LastMonth
+BEGIN
+    SET @Boundaries += CASE WHEN @Boundaries = N'' THEN N'' ELSE N', ' END
+        + N'''' + CONVERT(NVARCHAR(10), @Month, 23) + N'''';
+    SET @Month = DATEADD(MONTH, 1, @Month);
+END;
+
+EXEC (N'CREATE PARTITION FUNCTION pf_OrderMonth (DATETIME) AS RANGE RIGHT FOR VALUES (' + @Boundaries + N');');
+GO
+
+CREATE PARTITION SCHEME ps_OrderMonth AS PARTITION pf_OrderMonth ALL TO ([PRIMARY]);
+GO
+
+-- ============================================================================
+-- SECTION 2: PROPAGATE THE ORDER DATE TO ORDERITEMS
+-- ============================================================================
+
+ALTER TABLE ORDERITEMS ADD OrderDateTime DATETIME NULL;
+GO
+
+UPDATE oi
+SET OrderDateTime = o.OrderDateTime
+FROM ORDERITEMS oi
+JOIN ORDERS o ON oi.OrderID = o.OrderID;
+GO
+
+ALTER TABLE ORDERITEMS ALTER COLUMN OrderDateTime DATETIME NOT NULL;
+GO
+
+-- Existing INSERT statements do not supply OrderDateTime; fill it in from the parent order
+CREATE OR ALTER TRIGGER trg_OrderItemsOrderDate
+ON ORDERITEMS
+INSTEAD OF INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    INSERT INTO ORDERITEMS (OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime)
+    SELECT i.OrderID, i.MenuItemID, i.Quantity, i.PriceAtPurchase, ISNULL(i.OrderDateTime, o.OrderDateTime)
+    FROM inserted i
+    LEFT JOIN ORDERS o ON i.OrderID = o.OrderID;
+END;
+GO
+
+-- ============================================================================
+-- SECTION 3: REBUILD KEYS AND INDEXES ON THE PARTITION SCHEME
+-- ============================================================================
+
+ALTER TABLE ORDERITEMS DROP CONSTRAINT FK_ORDERITEMS_ORDER;
+GO
+
+-- Primary keys were declared inline, so their names are system-generated
+DECLARE @Sql NVARCHAR(MAX) = N'';
+SELECT @Sql += N'ALTER TABLE ' + QUOTENAME(OBJECT_NAME(parent_object_id)) + N' DROP CONSTRAINT ' + QUOTENAME(name) + N'; '
+FROM sys.key_constraints
+WHERE type = 'PK' AND parent_object_id IN (OBJECT_ID('ORDERS'), OBJECT_ID('ORDERITEMS'));
+EXEC (@Sql);
+GO
+
+DROP INDEX IF EXISTS IX_ORDERS_OrderDateTime ON ORDERS; -- Superseded by the clustered index below
+GO
+
+-- Clustered on date so monthly scans touch contiguous pages in one partition
+CREATE CLUSTERED INDEX CX_ORDERS_OrderDateTime ON ORDERS(OrderDateTime, OrderID) ON ps_OrderMonth(OrderDateTime);
+ALTER TABLE ORDERS ADD CONSTRAINT PK_ORDERS PRIMARY KEY NONCLUSTERED (OrderID, OrderDateTime) ON ps_OrderMonth(OrderDateTime);
+
+CREATE CLUSTERED INDEX CX_ORDERITEMS_OrderDateTime ON ORDERITEMS(OrderDateTime, OrderID, OrderItemID) ON ps_OrderMonth(OrderDateTime);
+ALTER TABLE ORDERITEMS ADD CONSTRAINT PK_ORDERITEMS PRIMARY KEY NONCLUSTERED (OrderItemID, OrderDateTime) ON ps_OrderMonth(OrderDateTime);
+GO
+
+-- Re-create the foreign key lookups as partition-aligned indexes
+CREATE INDEX IX_ORDERS_CustomerID ON ORDERS(CustomerID) WITH (DROP_EXISTING = ON) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERS_StaffID ON ORDERS(StaffID) WITH (DROP_EXISTING = ON) ON ps_OrderMonth(OrderDateTime);
+GO
+
+-- Databases built before the change-polling column existed get it here, so ORDERS_SwitchOut always matches
+IF COL_LENGTH('ORDERS', 'RowVer') IS NULL
+    ALTER TABLE ORDERS ADD RowVer ROWVERSION;
+GO
+
+DROP INDEX IF EXISTS IX_ORDERS_RowVer ON ORDERS;
+CREATE INDEX IX_ORDERS_RowVer ON ORDERS(RowVer) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERITEMS_OrderID ON ORDERITEMS(OrderID) WITH (DROP_EXISTING = ON) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERITEMS_MenuItemID ON ORDERITEMS(MenuItemID) WITH (DROP_EXISTING = ON) ON ps_OrderMonth(OrderDateTime);
+GO
+
+-- Changing an order's date moves its items with it
+ALTER TABLE ORDERITEMS ADD CONSTRAINT FK_ORDERITEMS_ORDER
+    FOREIGN KEY (OrderID, OrderDateTime) REFERENCES ORDERS(OrderID, OrderDateTime)
+    ON UPDATE CASCADE;
+GO
+
+-- ============================================================================
+-- SECTION 4: NONCLUSTERED COLUMNSTORE INDEXES
+-- ============================================================================
+
+-- Covers every ORDERS column used by monthly_trends, weekday_analysis, staff_performance and customer_loyalty
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_ORDERS_Analytics
+ON ORDERS (OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus)
+ON ps_OrderMonth(OrderDateTime);
+
+-- Covers every ORDERITEMS column used by menu_item_performance, profit_analysis and top_menu_items_daily
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_ORDERITEMS_Analytics
+ON ORDERITEMS (OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime)
+ON ps_OrderMonth(OrderDateTime);
+GO
+
+-- ============================================================================
+-- SECTION 5: SLIDING WINDOW MAINTENANCE
+-- ============================================================================
+
+/*
+    Switch-out targets: identical structure and indexes on the same scheme so a partition
+    can be moved out with a metadata-only ALTER TABLE ... SWITCH PARTITION
+*/
+CREATE TABLE ORDERS_SwitchOut (
+    OrderID INT NOT NULL,
+    CustomerID INT NOT NULL,
+    StaffID INT NOT NULL,
+    OrderType VARCHAR(20) NOT NULL,
+    TotalAmount DECIMAL(10,2) NOT NULL,
+    OrderDateTime DATETIME NOT NULL,
+    PaymentStatus VARCHAR(20) NOT NULL,
+    RowVer ROWVERSION
+);
+CREATE CLUSTERED INDEX CX_ORDERS_SwitchOut ON ORDERS_SwitchOut(OrderDateTime, OrderID) ON ps_OrderMonth(OrderDateTime);
+ALTER TABLE ORDERS_SwitchOut ADD CONSTRAINT PK_ORDERS_SwitchOut PRIMARY KEY NONCLUSTERED (OrderID, OrderDateTime) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERS_SwitchOut_CustomerID ON ORDERS_SwitchOut(CustomerID) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERS_SwitchOut_StaffID ON ORDERS_SwitchOut(StaffID) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERS_SwitchOut_RowVer ON ORDERS_SwitchOut(RowVer) ON ps_OrderMonth(OrderDateTime);
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_ORDERS_SwitchOut
+ON ORDERS_SwitchOut (OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus)
+ON ps_OrderMonth(OrderDateTime);
+
+CREATE TABLE ORDERITEMS_SwitchOut (
+    OrderItemID INT NOT NULL,
+    OrderID INT NOT NULL,
+    MenuItemID INT NOT NULL,
+    Quantity INT NOT NULL,
+    PriceAtPurchase DECIMAL(10,2) NOT NULL,
+    OrderDateTime DATETIME NOT NULL
+);
+CREATE CLUSTERED INDEX CX_ORDERITEMS_SwitchOut ON ORDERITEMS_SwitchOut(OrderDateTime, OrderID, OrderItemID) ON ps_OrderMonth(OrderDateTime);
+ALTER TABLE ORDERITEMS_SwitchOut ADD CONSTRAINT PK_ORDERITEMS_SwitchOut PRIMARY KEY NONCLUSTERED (OrderItemID, OrderDateTime) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERITEMS_SwitchOut_OrderID ON ORDERITEMS_SwitchOut(OrderID) ON ps_OrderMonth(OrderDateTime);
+CREATE INDEX IX_ORDERITEMS_SwitchOut_MenuItemID ON ORDERITEMS_SwitchOut(MenuItemID) ON ps_OrderMonth(OrderDateTime);
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_ORDERITEMS_SwitchOut
+ON ORDERITEMS_SwitchOut (OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime)
+ON ps_OrderMonth(OrderDateTime);
+GO
+
+-- Make sure empty monthly partitions exist @MonthsAhead months past today (splitting empty partitions is metadata-only)
+CREATE OR ALTER PROCEDURE sp_AddOrderMonthPartitions
+    @MonthsAhead INT = 3
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @Target DATETIME = DATEADD(MONTH, @MonthsAhead, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    DECLARE @Last DATETIME = (
+        SELECT MAX(CAST(prv.value AS DATETIME))
+        FROM sys.partition_range_values prv
+        JOIN sys.partition_functions pf ON prv.function_id = pf.function_id
+        WHERE pf.name = 'pf_OrderMonth'
+    );
+
+    WHILE @Last < @Target
+    BEGIN
+        SET @Last = DATEADD(MONTH, 1, @Last);
+        ALTER PARTITION SCHEME ps_OrderMonth NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_OrderMonth() SPLIT RANGE (@Last);
+    END;
+END;
+GO
+
+/*
+    Slide the window: switch every month older than @KeepMonths out of ORDERS/ORDERITEMS
+    into the *_SwitchOut tables, then merge away the emptied boundaries.
+    With @Purge = 0 the switched-out rows stay in *_SwitchOut for archiving.
+*/
+CREATE OR ALTER PROCEDURE sp_SlideOrderWindow
+    @KeepMonths INT = 24,
+    @Purge BIT = 0
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @Cutoff DATETIME = DATEADD(MONTH, -@KeepMonths, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    DECLARE @Boundary DATETIME;
+    DECLARE @Partition INT;
+
+    IF EXISTS (SELECT 1 FROM ORDERS_SwitchOut) OR EXISTS (SELECT 1 FROM ORDERITEMS_SwitchOut)
+    BEGIN
+        RAISERROR('Switch-out tables still hold rows from a previous run; archive or truncate them first.', 16, 1);
+        RETURN;
+    END;
+
+    BEGIN TRANSACTION;
+
+    -- A partition referenced by a foreign key cannot be switched out
+    ALTER TABLE ORDERITEMS DROP CONSTRAINT FK_ORDERITEMS_ORDER;
+
+    DECLARE months CURSOR LOCAL FAST_FORWARD FOR
+        SELECT CAST(prv.value AS DATETIME)
+        FROM sys.partition_range_values prv
+        JOIN sys.partition_functions pf ON prv.function_id = pf.function_id
+        WHERE pf.name = 'pf_OrderMonth' AND CAST(prv.value AS DATETIME) <= @Cutoff
+        ORDER BY prv.boundary_id;
+    OPEN months;
+    FETCH NEXT FROM months INTO @Boundary;
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        -- Everything before this boundary lives in the partition to its left
+        SET @Partition = $PARTITION.pf_OrderMonth(DATEADD(DAY, -1, @Boundary));
+        ALTER TABLE ORDERITEMS SWITCH PARTITION @Partition TO ORDERITEMS_SwitchOut PARTITION @Partition;
+        ALTER TABLE ORDERS SWITCH PARTITION @Partition TO ORDERS_SwitchOut PARTITION @Partition;
+        FETCH NEXT FROM months INTO @Boundary;
+    END;
+    CLOSE months;
+    DEALLOCATE months;
+
+    -- Added unchecked so the switch transaction stays metadata-only; validated just below
+    ALTER TABLE ORDERITEMS WITH NOCHECK ADD CONSTRAINT FK_ORDERITEMS_ORDER
+        FOREIGN KEY (OrderID, OrderDateTime) REFERENCES ORDERS(OrderID, OrderDateTime)
+        ON UPDATE CASCADE;
+
+    COMMIT TRANSACTION;
+
+    -- An untrusted foreign key cannot be used by the optimizer to eliminate joins
+    ALTER TABLE ORDERITEMS WITH CHECK CHECK CONSTRAINT FK_ORDERITEMS_ORDER;
+
+    IF @Purge = 1
+    BEGIN
+        TRUNCATE TABLE ORDERITEMS_SwitchOut;
+        TRUNCATE TABLE ORDERS_SwitchOut;
+    END;
+
+    -- Merge emptied boundaries once the switch-out tables no longer need them
+    IF NOT EXISTS (SELECT 1 FROM ORDERS_SwitchOut) AND NOT EXISTS (SELECT 1 FROM ORDERITEMS_SwitchOut)
+    BEGIN
+        WHILE EXISTS (
+            SELECT 1
+            FROM sys.partition_range_values prv
+            JOIN sys.partition_functions pf ON prv.function_id = pf.function_id
+            WHERE pf.name = 'pf_OrderMonth' AND CAST(prv.value AS DATETIME) < @Cutoff
+        )
+        BEGIN
+            SELECT @Boundary = MIN(CAST(prv.value AS DATETIME))
+            FROM sys.partition_range_values prv
+            JOIN sys.partition_functions pf ON prv.function_id = pf.function_id
+            WHERE pf.name = 'pf_OrderMonth';
+            ALTER PARTITION FUNCTION pf_OrderMonth() MERGE RANGE (@Boundary);
+        END;
+    END;
+
+    EXEC sp_AddOrderMonthPartitions;
+END;
+GO
+
+SET NOEXEC OFF;
+GO
+
+PRINT 'ORDERS and ORDERITEMS are now partitioned by month with columnstore indexes.';
+PRINT 'Schedule EXEC sp_AddOrderMonthPartitions monthly; use sp_SlideOrderWindow to retire old months.';
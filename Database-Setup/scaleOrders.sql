@@ -0,0 +1,80 @@
+/*
+    Scale-up script for performance testing
+    Purpose: Multiply the seeded ORDERS/ORDERITEMS history to benchmark large-volume layouts
+             (e.g. before and after partitionDB.sql).
+
+    Every seeded order is copied @OrdersMultiplier times into each of the @YearsOfHistory
+    years before it. Copies are offset by a few minutes so daily and hourly patterns keep
+    their shape. With the default seed (~3,500 orders) and 10 x 20 this adds ~700,000 orders.
+
+    Run on a test copy of RestaurantDB only.
+*/
+USE RestaurantDB;
+GO
+
+SET NOCOUNT ON;
+
+DECLARE @YearsOfHistory INT = 10;
+DECLARE @OrdersMultiplier INT = 20;
+
+-- Snapshot of the seed so copies are not copied again
+IF OBJECT_ID('tempdb..#SeedOrders') IS NOT NULL DROP TABLE #SeedOrders;
+SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus
+INTO #SeedOrders
+FROM ORDERS;
+
+IF OBJECT_ID('tempdb..#SeedItems') IS NOT NULL DROP TABLE #SeedItems;
+SELECT OrderID, MenuItemID, Quantity, PriceAtPurchase
+INTO #SeedItems
+FROM ORDERITEMS;
+
+CREATE TABLE #OrderMap (SourceOrderID INT NOT NULL, NewOrderID INT NOT NULL);
+
+DECLARE @Year INT = 1;
+DECLARE @Copy INT;
+DECLARE @Started DATETIME2 = SYSDATETIME();
+
+WHILE @Year <= @YearsOfHistory
+BEGIN
+    SET @Copy = 1;
+    WHILE @Copy <= @OrdersMultiplier
+    BEGIN
+        TRUNCATE TABLE #OrderMap;
+
+        BEGIN TRANSACTION;
+
+        -- MERGE (rather than INSERT) can OUTPUT the source OrderID next to the new identity value
+        MERGE ORDERS AS target
+        USING (
+            SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount,
+                DATEADD(MINUTE, @Copy * 3, DATEADD(YEAR, -@Year, OrderDateTime)) AS OrderDateTime,
+                PaymentStatus
+            FROM #SeedOrders
+        ) AS src
+        ON 1 = 0
+        WHEN NOT MATCHED THEN
+            INSERT (CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus)
+            VALUES (src.CustomerID, src.StaffID, src.OrderType, src.TotalAmount, src.OrderDateTime, src.PaymentStatus)
+        OUTPUT src.OrderID, inserted.OrderID INTO #OrderMap (SourceOrderID, NewOrderID);
+
+        INSERT INTO ORDERITEMS (OrderID, MenuItemID, Quantity, PriceAtPurchase)
+        SELECT m.NewOrderID, si.MenuItemID, si.Quantity, si.PriceAtPurchase
+        FROM #SeedItems si
+        JOIN #OrderMap m ON si.OrderID = m.SourceOrderID;
+
+        COMMIT TRANSACTION;
+
+        SET @Copy += 1;
+    END;
+
+    PRINT 'Year -' + CAST(@Year AS VARCHAR(10)) + ' done after '
+        + CAST(DATEDIFF(SECOND, @Started, SYSDATETIME()) AS VARCHAR(20)) + ' s';
+    SET @Year += 1;
+END;
+
+SELECT
+    (SELECT COUNT_BIG(*) FROM ORDERS) AS TotalOrders,
+    (SELECT COUNT_BIG(*) FROM ORDERITEMS) AS TotalOrderItems,
+    (SELECT MIN(OrderDateTime) FROM ORDERS) AS FirstOrder,
+    (SELECT MAX(OrderDateTime) FROM ORDERS) AS LastOrder;
+GO
@@ -0,0 +1,69 @@
+/*
+    Roll back archiveDB.sql
+    Purpose: Move every archived order, order item and reservation back into the hot tables
+             (keeping their original IDs), then drop the archive tables, views and procedure.
+*/
+USE RestaurantDB;
+GO
+
+IF OBJECT_ID('ArchivedPeriods') IS NULL
+BEGIN
+    RAISERROR('RestaurantDB has no order archive; nothing to do.', 16, 1);
+    SET NOEXEC ON;
+END;
+GO
+
+SET XACT_ABORT ON;
+-- Restored reservations are already counted in TableOccupancyHourly
+EXEC sp_set_session_context @key = N'archiving', @value = 1;
+BEGIN TRANSACTION;
+
+SET IDENTITY_INSERT ORDERS ON;
+INSERT INTO ORDERS (OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus)
+SELECT OrderID, CustomerID, StaffID, OrderType, TotalAmount, OrderDateTime, PaymentStatus
+FROM ORDERS_Archive;
+SET IDENTITY_INSERT ORDERS OFF;
+
+IF COL_LENGTH('ORDERITEMS', 'OrderDateTime') IS NULL
+BEGIN
+    SET IDENTITY_INSERT ORDERITEMS ON;
+    INSERT INTO ORDERITEMS (OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase)
+    SELECT OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase
+    FROM ORDERITEMS_Archive;
+    SET IDENTITY_INSERT ORDERITEMS OFF;
+END
+ELSE
+    -- Partitioned layout: the INSTEAD OF trigger would drop the original OrderItemIDs
+    EXEC (N'
+        DISABLE TRIGGER trg_OrderItemsOrderDate ON ORDERITEMS;
+        SET IDENTITY_INSERT ORDERITEMS ON;
+        INSERT INTO ORDERITEMS (OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime)
+        SELECT OrderItemID, OrderID, MenuItemID, Quantity, PriceAtPurchase, OrderDateTime
+        FROM ORDERITEMS_Archive;
+        SET IDENTITY_INSERT ORDERITEMS OFF;
+        ENABLE TRIGGER trg_OrderItemsOrderDate ON ORDERITEMS;
+    ');
+
+SET IDENTITY_INSERT RESERVATIONS ON;
+INSERT INTO RESERVATIONS (ReservationID, CustomerID, TableID, ReservationDateTime, NumGuests, Status)
+SELECT ReservationID, CustomerID, TableID, ReservationDateTime, NumGuests, Status
+FROM RESERVATIONS_Archive;
+SET IDENTITY_INSERT RESERVATIONS OFF;
+
+COMMIT TRANSACTION;
+EXEC sp_set_session_context @key = N'archiving', @value = NULL;
+GO
+
+DROP PROCEDURE IF EXISTS sp_ArchiveClosedPeriods;
+DROP VIEW IF EXISTS ORDERS_All;
+DROP VIEW IF EXISTS ORDERITEMS_All;
+DROP VIEW IF EXISTS RESERVATIONS_All;
+DROP TABLE IF EXISTS ORDERITEMS_Archive;
+DROP TABLE IF EXISTS ORDERS_Archive;
+DROP TABLE IF EXISTS RESERVATIONS_Archive;
+DROP TABLE IF EXISTS ArchivedPeriods;
+GO
+
+SET NOEXEC OFF;
+PRINT 'Archived rows restored; archive objects removed. Set ORDER_ARCHIVE=0 for the API.';
+GO
@@ -0,0 +1,68 @@
+/*
+    Roll back partitionDB.sql
+    Purpose: Return ORDERS and ORDERITEMS to the rowstore layout created by buildDB.sql
+             (IDENTITY clustered primary keys, no partitioning, no columnstore).
+*/
+USE RestaurantDB;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_OrderMonth')
+BEGIN
+    RAISERROR('RestaurantDB is not partitioned; nothing to do.', 16, 1);
+    SET NOEXEC ON;
+END;
+GO
+
+IF EXISTS (SELECT 1 FROM ORDERS_SwitchOut) OR EXISTS (SELECT 1 FROM ORDERITEMS_SwitchOut)
+BEGIN
+    RAISERROR('Switch-out tables still hold rows; archive or truncate them before rolling back.', 16, 1);
+    SET NOEXEC ON;
+END;
+GO
+
+-- Sliding window objects
+DROP PROCEDURE IF EXISTS sp_SlideOrderWindow;
+DROP PROCEDURE IF EXISTS sp_AddOrderMonthPartitions;
+DROP TABLE IF EXISTS ORDERITEMS_SwitchOut;
+DROP TABLE IF EXISTS ORDERS_SwitchOut;
+GO
+
+-- Columnstore, keys and clustered indexes on the partition scheme
+DROP INDEX IF EXISTS NCCI_ORDERITEMS_Analytics ON ORDERITEMS;
+DROP INDEX IF EXISTS NCCI_ORDERS_Analytics ON ORDERS;
+ALTER TABLE ORDERITEMS DROP CONSTRAINT FK_ORDERITEMS_ORDER;
+ALTER TABLE ORDERITEMS DROP CONSTRAINT PK_ORDERITEMS;
+ALTER TABLE ORDERS DROP CONSTRAINT PK_ORDERS;
+DROP INDEX CX_ORDERITEMS_OrderDateTime ON ORDERITEMS;
+DROP INDEX CX_ORDERS_OrderDateTime ON ORDERS;
+GO
+
+-- Original rowstore layout
+ALTER TABLE ORDERS ADD CONSTRAINT PK_ORDERS PRIMARY KEY CLUSTERED (OrderID) ON [PRIMARY];
+ALTER TABLE ORDERITEMS ADD CONSTRAINT PK_ORDERITEMS PRIMARY KEY CLUSTERED (OrderItemID) ON [PRIMARY];
+GO
+
+CREATE INDEX IX_ORDERS_CustomerID ON ORDERS(CustomerID) WITH (DROP_EXISTING = ON) ON [PRIMARY];
+CREATE INDEX IX_ORDERS_StaffID ON ORDERS(StaffID) WITH (DROP_EXISTING = ON) ON [PRIMARY];
+CREATE INDEX IX_ORDERS_OrderDateTime ON ORDERS(OrderDateTime) ON [PRIMARY];
+CREATE INDEX IX_ORDERS_RowVer ON ORDERS(RowVer) WITH (DROP_EXISTING = ON) ON [PRIMARY];
+CREATE INDEX IX_ORDERITEMS_OrderID ON ORDERITEMS(OrderID) WITH (DROP_EXISTING = ON) ON [PRIMARY];
+CREATE INDEX IX_ORDERITEMS_MenuItemID ON ORDERITEMS(MenuItemID) WITH (DROP_EXISTING = ON) ON [PRIMARY];
+GO
+
+ALTER TABLE ORDERITEMS ADD CONSTRAINT FK_ORDERITEMS_ORDER FOREIGN KEY (OrderID) REFERENCES ORDERS(OrderID);
+GO
+
+-- ORDERITEMS no longer carries the order date
+DROP TRIGGER IF EXISTS trg_OrderItemsOrderDate;
+ALTER TABLE ORDERITEMS DROP COLUMN OrderDateTime;
+GO
+
+DROP PARTITION SCHEME ps_OrderMonth;
+DROP PARTITION FUNCTION pf_OrderMonth;
+GO
+
+SET NOEXEC OFF;
+GO
+
+PRINT 'ORDERS and ORDERITEMS restored to the buildDB.sql rowstore layout.';
@@ -0,0 +1,107 @@
+"""
+Routes queries over ORDERS, ORDERITEMS and RESERVATIONS to the archive-inclusive views only when they need archived months
+"""
+import re
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from config import ARCHIVE_CONFIG
+
+# How long the archive boundary is trusted before it is read again
+REFRESH_INTERVAL_SECONDS = 300
+
+# Hot table -> view over the hot table and its archive (archiveDB.sql)
+UNIFIED_VIEWS = {
+    'ORDERS': 'ORDERS_All',
+    'ORDERITEMS': 'ORDERITEMS_All',
+    'RESERVATIONS': 'RESERVATIONS_All',
+}
+
+# Whole upper-case table names only, so IX_ORDERS_RowVer, ORDERS_Archive and aliases
+# such as "AS Orders" are left alone
+TABLE_PATTERN = re.compile(r"\b(" + "|".join(UNIFIED_VIEWS) + r")\b")
+
+# Everything before this is archived; the hot tables hold every row from here on
+BOUNDARY_QUERY = "SELECT MAX(PeriodEnd) AS Boundary FROM ArchivedPeriods"
+
+PERIODS_QUERY = """
+    SELECT PeriodStart, PeriodEnd, Orders, PaidOrders, PaidRevenue, OrderItems, ItemQuantity,
+        Reservations, ReservedGuests, ArchivedAt
+    FROM ArchivedPeriods
+    ORDER BY PeriodStart
+"""
+
+
+def range_start(params):
+    """Earliest datetime a saved query's date parameters can reach, or None for all history"""
+    starts = []
+    for name, value in (params or {}).items():
+        try:
+            if name == 'year':
+                starts.append(datetime(int(value), 1, 1))
+            elif name in ('date', 'start_date'):
+                starts.append(pd.Timestamp(value).to_pydatetime())
+        except (TypeError, ValueError):
+            # The database rejects it anyway; reading everything is never wrong
+            return None
+    return min(starts) if starts else None
+
+
+def unify(sql):
+    """The same SQL over the archive-inclusive views"""
+    return TABLE_PATTERN.sub(lambda match: UNIFIED_VIEWS[match.group(1)], sql)
+
+
+class ArchiveCatalog:
+    """Knows where the archive ends and rewrites SQL that reaches past it"""
+
+    def __init__(self, fetch_dataframe):
+        self._fetch = fetch_dataframe
+        self._lock = threading.Lock()
+        self._boundary = None
+        self._checked_at = None
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        return ARCHIVE_CONFIG['enabled']
+
+    def boundary(self, force=False):
+        """First moment not archived, or None when nothing is (or the archive is off)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not force and self._checked_at and time.monotonic() - self._checked_at < REFRESH_INTERVAL_SECONDS:
+                return self._boundary
+            df, error = self._fetch(BOUNDARY_QUERY, None)
+            self._checked_at = time.monotonic()
+            self.last_error = error
+            if error:
+                # Without archive objects only the hot tables can be read
+                self._boundary = None
+            else:
+                value = df["Boundary"].iloc[0] if len(df) else None
+                self._boundary = None if pd.isna(value) else pd.Timestamp(value).to_pydatetime()
+            return self._boundary
+
+    def route(self, sql, start=None):
+        """sql unchanged when [start, now) is all hot, else rewritten to the unified views"""
+        boundary = self.boundary()
+        if boundary is None or (start is not None and pd.Timestamp(start) >= pd.Timestamp(boundary)):
+            return sql
+        return unify(sql)
+
+    def periods(self):
+        """Summary row per archived month; (DataFrame, error)"""
+        return self._fetch(PERIODS_QUERY, None)
+
+    def status(self):
+        boundary = self.boundary()
+        return {
+            "enabled": self.enabled,
+            "boundary": boundary.isoformat() if boundary else None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,146 @@
+"""
+Benchmark: latency of recent-range queries as order history grows, with every order in the
+hot tables versus the last 24 months hot and the rest archived
+
+SQLite stands in for SQL Server so the benchmark runs anywhere; the tables, views and routing
+mirror archiveDB.sql and archive.py.
+
+Run from the app directory:
+    python -m benchmarks.bench_archive
+"""
+import sqlite3
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import archive
+from config import ARCHIVE_CONFIG
+
+ORDERS_PER_DAY = 80
+HOT_MONTHS = 24
+HISTORY_YEARS = [2, 5, 10, 20]
+NOW = datetime(2025, 1, 1)
+RUNS = 15
+
+SCHEMA = """
+    CREATE TABLE ORDERS (OrderID INTEGER PRIMARY KEY, CustomerID INT, OrderType TEXT,
+        TotalAmount REAL, OrderDateTime TEXT, PaymentStatus TEXT);
+    CREATE INDEX IX_ORDERS_OrderDateTime ON ORDERS(OrderDateTime);
+    CREATE TABLE ORDERITEMS (OrderItemID INTEGER PRIMARY KEY, OrderID INT, MenuItemID INT,
+        Quantity INT, PriceAtPurchase REAL);
+    CREATE INDEX IX_ORDERITEMS_OrderID ON ORDERITEMS(OrderID);
+    CREATE TABLE ORDERS_Archive (OrderID INT, CustomerID INT, OrderType TEXT,
+        TotalAmount REAL, OrderDateTime TEXT, PaymentStatus TEXT);
+    CREATE TABLE ORDERITEMS_Archive (OrderItemID INT, OrderID INT, MenuItemID INT,
+        Quantity INT, PriceAtPurchase REAL);
+    CREATE TABLE ArchivedPeriods (PeriodStart TEXT, PeriodEnd TEXT);
+    CREATE VIEW ORDERS_All AS SELECT * FROM ORDERS UNION ALL SELECT * FROM ORDERS_Archive;
+    CREATE VIEW ORDERITEMS_All AS SELECT * FROM ORDERITEMS UNION ALL SELECT * FROM ORDERITEMS_Archive;
+"""
+
+# Last week's sales by menu item: an index range on OrderDateTime
+RANGE_QUERY = """
+    SELECT oi.MenuItemID, SUM(oi.Quantity) AS Quantity, SUM(oi.Quantity * oi.PriceAtPurchase) AS Revenue
+    FROM ORDERITEMS oi
+    JOIN ORDERS o ON oi.OrderID = o.OrderID
+    WHERE o.OrderDateTime >= :start AND o.OrderDateTime < :end
+    GROUP BY oi.MenuItemID
+"""
+
+# Unpaid orders this month: the month filter cannot use the index, so the table is scanned
+SCAN_QUERY = """
+    SELECT OrderType, COUNT(*) AS Orders, SUM(TotalAmount) AS Amount
+    FROM ORDERS
+    WHERE PaymentStatus <> 'Paid' AND substr(OrderDateTime, 1, 7) = :month
+    GROUP BY OrderType
+"""
+
+# Revenue per year over everything: reads the archive as well in the tiered layout
+HISTORY_QUERY = """
+    SELECT substr(OrderDateTime, 1, 4) AS Year, SUM(TotalAmount) AS Revenue
+    FROM ORDERS
+    WHERE PaymentStatus = 'Paid'
+    GROUP BY substr(OrderDateTime, 1, 4)
+"""
+
+
+def synthetic_history(rng, years):
+    """Orders and their line items, ORDERS_PER_DAY on average, ending at NOW"""
+    count = years * 365 * ORDERS_PER_DAY
+    minutes = np.sort(rng.integers(0, years * 365 * 24 * 60, count))
+    placed = pd.Timestamp(NOW) - pd.to_timedelta(years * 365 * 24 * 60 - minutes, unit='min')
+    orders = pd.DataFrame({
+        "OrderID": np.arange(1, count + 1),
+        "CustomerID": rng.integers(1, 5000, count),
+        "OrderType": rng.choice(['Dine-In', 'Takeout', 'Delivery'], count),
+        "TotalAmount": rng.gamma(4, 9, count).round(2),
+        "OrderDateTime": placed.strftime('%Y-%m-%d %H:%M:%S'),
+        "PaymentStatus": rng.choice(['Paid', 'Paid', 'Paid', 'Pending', 'Refunded'], count),
+    })
+    lines = rng.integers(1, 5, count)
+    items = pd.DataFrame({
+        "OrderItemID": np.arange(1, lines.sum() + 1),
+        "OrderID": np.repeat(orders["OrderID"].to_numpy(), lines),
+        "MenuItemID": rng.integers(1, 60, lines.sum()),
+        "Quantity": rng.integers(1, 4, lines.sum()),
+        "PriceAtPurchase": rng.uniform(4, 30, lines.sum()).round(2),
+    })
+    return orders, items
+
+
+def build(orders, items, tiered):
+    """In-memory database with everything hot, or only the last HOT_MONTHS hot"""
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(SCHEMA)
+    boundary = (pd.Timestamp(NOW) - pd.DateOffset(months=HOT_MONTHS)).strftime('%Y-%m-%d')
+    hot = orders["OrderDateTime"] >= boundary if tiered else np.ones(len(orders), dtype=bool)
+    hot_items = items["OrderID"].isin(orders.loc[hot, "OrderID"])
+    for table, df in (("ORDERS", orders[hot]), ("ORDERS_Archive", orders[~hot]),
+                      ("ORDERITEMS", items[hot_items]), ("ORDERITEMS_Archive", items[~hot_items])):
+        placeholders = ", ".join("?" * len(df.columns))
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", df.itertuples(index=False))
+    if tiered and (~hot).any():
+        conn.execute("INSERT INTO ArchivedPeriods VALUES (?, ?)", (orders["OrderDateTime"].min()[:10], boundary))
+    conn.commit()
+    return conn
+
+
+def timed(conn, catalog, query, params, start):
+    """Median milliseconds for the routed query"""
+    sql = catalog.route(query, start)
+    samples = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ARCHIVE_CONFIG['enabled'] = True
+    rng = np.random.default_rng(42)
+    week = NOW - timedelta(days=7)
+    print(f"{'history':>8} {'layout':>7} {'hot rows':>10} | {'last week':>9} {'month scan':>10} {'all years':>9}")
+    for years in HISTORY_YEARS:
+        orders, items = synthetic_history(rng, years)
+        for tiered in (False, True):
+            conn = build(orders, items, tiered)
+
+            def fetch(query, params):
+                return pd.read_sql_query(query, conn), None
+
+            catalog = archive.ArchiveCatalog(fetch)
+            hot_rows = conn.execute("SELECT COUNT(*) FROM ORDERS").fetchone()[0]
+            latest = timed(conn, catalog, RANGE_QUERY, {"start": str(week), "end": str(NOW)}, week)
+            scan = timed(conn, catalog, SCAN_QUERY, {"month": "2024-12"}, datetime(2024, 12, 1))
+            history = timed(conn, catalog, HISTORY_QUERY, {}, None)
+            print(f"{years:>6} y {'tiered' if tiered else 'single':>7} {hot_rows:>10,} | "
+                  f"{latest:>6.2f} ms {scan:>7.2f} ms {history:>6.0f} ms")
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
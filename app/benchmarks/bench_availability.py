@@ -0,0 +1,74 @@
+"""
+Benchmark: reservation availability lookups during a peak-hour booking burst
+
+Run from the app directory:
+    python -m benchmarks.bench_availability
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from reservation_availability import AvailabilityIndex, TABLES_QUERY
+
+NUM_TABLES = 40
+DAYS_AHEAD = 90
+RESERVATIONS_PER_DAY = 120
+BURST_REQUESTS = 20000
+
+
+def synthetic_fetch(tables, reservations):
+    """Stand-in for query_dataframe that serves pre-built frames"""
+    def fetch(query, params):
+        if query is TABLES_QUERY:
+            return tables, None
+        return reservations, None
+    return fetch
+
+
+def main():
+    rng = random.Random(42)
+    tables = pd.DataFrame({
+        "TableID": range(1, NUM_TABLES + 1),
+        "TableNumber": range(1, NUM_TABLES + 1),
+        "Capacity": [rng.choice([2, 2, 4, 4, 4, 6, 8]) for _ in range(NUM_TABLES)],
+    })
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for day in range(DAYS_AHEAD):
+        for _ in range(RESERVATIONS_PER_DAY):
+            start = today + timedelta(days=day, hours=rng.randint(12, 22), minutes=rng.choice([0, 15, 30, 45]))
+            rows.append((len(rows) + 1, rng.randint(1, NUM_TABLES), start))
+    reservations = pd.DataFrame(rows, columns=["ReservationID", "TableID", "ReservationDateTime"])
+
+    index = AvailabilityIndex(synthetic_fetch(tables, reservations))
+    t0 = time.perf_counter()
+    index.load()
+    print(f"Loaded {len(rows):,} active reservations in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    # Peak burst: Friday/Saturday evenings, mixed availability checks and bookings
+    next_id = len(rows) + 1
+    lookups = bookings = 0
+    latencies = []
+    for _ in range(BURST_REQUESTS):
+        start = today + timedelta(days=rng.randint(0, 13), hours=rng.choice([19, 20]), minutes=rng.choice([0, 30]))
+        guests = rng.choice([2, 2, 3, 4, 5, 6])
+        t0 = time.perf_counter()
+        table = index.best_fit(start, guests)
+        if table is not None and rng.random() < 0.3:
+            index.add(next_id, table["TableID"], start)
+            next_id += 1
+            bookings += 1
+        latencies.append(time.perf_counter() - t0)
+        lookups += 1
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{lookups:,} lookups, {bookings:,} bookings: p50 {p50:.1f} us, p99 {p99:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: co-occurrence counts from one streaming pass over order lines, incremental updates,
+and the self-join on OrderID the engine replaces
+
+Run from the app directory:
+    python -m benchmarks.bench_basket
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import market_basket
+from market_basket import MarketBasket, LINES_QUERY, PRIOR_ITEMS_QUERY, ITEMS_QUERY, UPPER_BOUND_QUERY
+
+ORDERS = 1_000_000
+MENU_ITEMS = 150
+NEW_LINES = [1_000, 10_000, 100_000]
+
+
+def synthetic_lines(rng, first_order, orders, first_line):
+    """1-6 lines per order from a skewed menu, in OrderItemID order"""
+    lines = rng.integers(1, 7, orders)
+    popularity = 1 / np.arange(1, MENU_ITEMS + 1)
+    return pd.DataFrame({
+        "OrderItemID": np.arange(first_line, first_line + lines.sum()),
+        "OrderID": np.repeat(np.arange(first_order, first_order + orders), lines),
+        "MenuItemID": rng.choice(MENU_ITEMS, lines.sum(), p=popularity / popularity.sum()) + 1,
+    })
+
+
+def main():
+    rng = np.random.default_rng(42)
+    table = [synthetic_lines(rng, 1, ORDERS, 1)]
+
+    def fetch(query, params):
+        lines = table[0]
+        if query is LINES_QUERY:
+            start = np.searchsorted(lines["OrderItemID"].to_numpy(), params["last_item_id"], side='right')
+            return lines.iloc[start:start + params["batch_rows"]], None
+        if query is PRIOR_ITEMS_QUERY:
+            ids = lines["OrderItemID"].to_numpy()
+            batch = (ids > params["last_item_id"]) & (ids <= params["batch_last_id"])
+            touched = lines["OrderID"].isin(lines.loc[batch, "OrderID"]) & (ids <= params["last_item_id"])
+            return lines.loc[touched, ["OrderID", "MenuItemID"]].drop_duplicates(), None
+        if query is UPPER_BOUND_QUERY:
+            # Every synthetic order is paid and never changes, so no order shows up as updated
+            return pd.DataFrame({"UpperBound": [1]}), None
+        if query is ITEMS_QUERY:
+            return pd.DataFrame({"MenuItemID": np.arange(1, MENU_ITEMS + 1),
+                                 "Item": [f"Item {i}" for i in range(1, MENU_ITEMS + 1)]}), None
+        return pd.DataFrame(), None
+
+    basket = MarketBasket(fetch)
+    t0 = time.perf_counter()
+    basket.refresh(force=True)
+    summary = basket.summary()
+    print(f"Streaming pass over {len(table[0]):,} lines ({market_basket.BATCH_ROWS:,} per batch): "
+          f"{(time.perf_counter() - t0) * 1000:.0f} ms, {summary['pairs']:,} pairs in {summary['matrix_bytes'] / 1024:.0f} KiB")
+
+    for count in NEW_LINES:
+        lines = table[0]
+        # New orders plus a few lines added to recent orders that were already counted
+        added = synthetic_lines(rng, int(lines["OrderID"].max()) + 1, count // 4, int(lines["OrderItemID"].max()) + 1)
+        late = count - len(added)
+        if late > 0:
+            added = pd.concat((added, pd.DataFrame({
+                "OrderItemID": np.arange(added["OrderItemID"].max() + 1, added["OrderItemID"].max() + 1 + late),
+                "OrderID": rng.integers(lines["OrderID"].max() - 1000, lines["OrderID"].max() + 1, late),
+                "MenuItemID": rng.integers(1, MENU_ITEMS + 1, late),
+            })))
+        table[0] = pd.concat((lines, added), ignore_index=True)
+        t0 = time.perf_counter()
+        basket.refresh(force=True)
+        print(f"Refresh with {len(added):>7,} new lines: {(time.perf_counter() - t0) * 1000:6.0f} ms")
+
+    t0 = time.perf_counter()
+    basket.pairs(limit=50)
+    print(f"Top 50 pairs by lift: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    # The SQL self-join, done in pandas on a tenth of the lines to keep memory bounded
+    sample = table[0][table[0]["OrderID"] <= ORDERS // 10].drop_duplicates(["OrderID", "MenuItemID"])
+    t0 = time.perf_counter()
+    joined = sample.merge(sample, on="OrderID")
+    joined = joined[joined["MenuItemID_x"] < joined["MenuItemID_y"]]
+    joined.groupby(["MenuItemID_x", "MenuItemID_y"]).size()
+    print(f"Self-join on {len(sample):,} lines (1/10 of the orders): {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
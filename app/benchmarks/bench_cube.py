@@ -0,0 +1,90 @@
+"""
+Benchmark: sales cube load, incremental append, memory and pivot latency on synthetic line items
+
+Run from the app directory:
+    python -m benchmarks.bench_cube
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from sales_cube import SalesCube, ITEMS_QUERY, STAFF_QUERY, UPPER_BOUND_QUERY, LINES_QUERY
+
+LINE_ITEMS = 2_000_000
+NUM_ITEMS = 60
+NUM_STAFF = 40
+REPEATS = 20
+
+PIVOTS = [
+    (["category", "order_type", "weekday"], ["revenue", "orders"], {}),
+    (["staff", "hour"], ["revenue", "avg_ticket"], {"payment_status": {"Paid"}}),
+    (["month"], ["revenue", "quantity", "orders"], {"order_type": {"Delivery"}}),
+    (["item"], ["revenue"], {"category": {"Category 1", "Category 2"}}),
+    (["date", "item"], ["quantity"], {}),
+]
+
+
+def synthetic_lines(rng, first_id, count):
+    """About three line items per order; order-level columns are shared by an order's lines"""
+    order_ids = first_id // 3 + np.arange(count) // 3
+    orders = np.unique(order_ids)
+    per_line = np.searchsorted(orders, order_ids)
+    when = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 24 * 60, len(orders)), unit='min')
+    return pd.DataFrame({
+        "OrderItemID": np.arange(first_id, first_id + count),
+        "OrderID": order_ids,
+        "MenuItemID": rng.integers(1, NUM_ITEMS + 1, count),
+        "Quantity": rng.integers(1, 4, count),
+        "Revenue": rng.uniform(3, 40, count).round(2),
+        "StaffID": rng.integers(1, NUM_STAFF + 1, len(orders))[per_line],
+        "OrderType": rng.choice(["Dine-In", "Takeout", "Delivery"], len(orders))[per_line],
+        "PaymentStatus": rng.choice(["Paid", "Paid", "Paid", "Unpaid", "Refunded"], len(orders))[per_line],
+        "OrderDateTime": when[per_line],
+    })
+
+
+def main():
+    rng = np.random.default_rng(42)
+    items = pd.DataFrame({
+        "MenuItemID": range(1, NUM_ITEMS + 1),
+        "Item": [f"Item {i}" for i in range(1, NUM_ITEMS + 1)],
+        "Category": [f"Category {i % 6}" for i in range(1, NUM_ITEMS + 1)],
+    })
+    staff = pd.DataFrame({"StaffID": range(1, NUM_STAFF + 1),
+                          "StaffName": [f"Staff {i}" for i in range(1, NUM_STAFF + 1)]})
+    batches = [synthetic_lines(rng, 1, LINE_ITEMS), synthetic_lines(rng, LINE_ITEMS + 1, 500)]
+
+    def fetch(query, params):
+        if query is ITEMS_QUERY:
+            return items, None
+        if query is STAFF_QUERY:
+            return staff, None
+        if query is UPPER_BOUND_QUERY:
+            return pd.DataFrame({"UpperBound": [1]}), None
+        if query is LINES_QUERY:
+            return (batches.pop(0) if batches else synthetic_lines(rng, 0, 0)), None
+        return pd.DataFrame(), None
+
+    cube = SalesCube(fetch)
+    t0 = time.perf_counter()
+    cube.refresh(force=True)
+    print(f"Loaded {LINE_ITEMS:,} line items in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    t0 = time.perf_counter()
+    cube.refresh(force=True)
+    print(f"Appended 500 line items in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    memory = cube.memory()
+    print(f"Memory: {memory['bytes'] / 2**20:.1f} MiB, {memory['bytes_per_line']} bytes per line item")
+
+    for by, measures, filters in PIVOTS:
+        timings = []
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            df, _ = cube.query(by, measures, filters)
+            timings.append(time.perf_counter() - t0)
+        print(f"{' x '.join(by):>28} {','.join(measures):>24}: {len(df):>7,} groups, "
+              f"median {sorted(timings)[REPEATS // 2] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: peak memory and throughput of streamed exports versus building the CSV in memory
+
+Run from the app directory:
+    python -m benchmarks.bench_exports
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pandas as pd
+
+import export_jobs
+from config import EXPORT_CONFIG
+
+ROWS = 500_000
+
+DESCRIPTION = [
+    ("OrderItemID", int, None, 10, 10, 0, False),
+    ("OrderID", int, None, 10, 10, 0, False),
+    ("MenuItemID", int, None, 10, 10, 0, False),
+    ("Quantity", int, None, 10, 10, 0, False),
+    ("PriceAtPurchase", Decimal, None, 10, 10, 2, False),
+    ("OrderDateTime", datetime, None, 23, 23, 3, False),
+]
+
+
+class SyntheticCursor:
+    """Stand-in for a pyodbc cursor over ORDERITEMS joined to ORDERS"""
+
+    description = DESCRIPTION
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._next = 0
+        self.connection = self
+
+    def fetchmany(self, size):
+        start, end = self._next, min(self._next + size, self._rows)
+        self._next = end
+        base = datetime(2024, 1, 1)
+        return [
+            (i, i // 3, i % 60 + 1, i % 3 + 1, Decimal(f"{5 + i % 30}.99"), base + timedelta(minutes=i // 3))
+            for i in range(start, end)
+        ]
+
+    def close(self):
+        pass
+
+
+def in_memory_csv(rows):
+    """The old path: every row as JSON records, then a DataFrame, then one CSV string"""
+    cursor = SyntheticCursor(rows)
+    columns = [column[0] for column in DESCRIPTION]
+    records = [dict(zip(columns, row)) for row in cursor.fetchmany(rows)]
+    payload = json.dumps(records, default=str)
+    df = pd.DataFrame(json.loads(payload))
+    return len(df.to_csv(index=False))
+
+
+def measure(label, run):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {ROWS / elapsed:>9,.0f} rows/s, peak {peak / 2**20:6.1f} MiB, output {size / 2**20:6.1f} MiB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        EXPORT_CONFIG['directory'] = directory
+        jobs = export_jobs.ExportJobs(lambda query, params, timeout: (SyntheticCursor(ROWS), None), None)
+
+        def streamed(fmt):
+            def run():
+                job = jobs.submit("SELECT ...", fmt=fmt, estimate=False)
+                while jobs.get(job["id"])["status"] not in export_jobs.FINISHED_STATUSES:
+                    time.sleep(0.01)
+                job = jobs.get(job["id"])
+                if job["status"] != 'completed':
+                    raise RuntimeError(job["error"])
+                return os.path.getsize(jobs.path(job["id"]))
+            return run
+
+        measure("in-memory CSV", lambda: in_memory_csv(ROWS))
+        measure("streamed CSV (gzip)", streamed('csv'))
+        try:
+            measure("streamed Parquet", streamed('parquet'))
+        except RuntimeError as e:
+            print(f"{'streamed Parquet':>22}: skipped ({e})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: RFM scoring of every customer at once, and incremental refreshes with a few changed customers
+
+Run from the app directory:
+    python -m benchmarks.bench_rfm
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import customer_rfm
+from customer_rfm import RfmScorer, UPPER_BOUND_QUERY, WATERMARK_QUERY, TOTALS_QUERY, CHANGED_TOTALS_QUERY
+
+CUSTOMERS = 1_000_000
+CHANGED = [100, 1_000, 10_000]
+
+
+def synthetic_totals(rng, customer_ids):
+    """Per-customer paid-order aggregates with a long-tailed order count"""
+    frequency = rng.geometric(0.15, len(customer_ids))
+    return pd.DataFrame({
+        "CustomerID": customer_ids,
+        "LastOrder": pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 24 * 60, len(customer_ids)), unit='min'),
+        "Frequency": frequency,
+        "Monetary": (frequency * rng.gamma(4, 9, len(customer_ids))).round(2),
+    })
+
+
+def main():
+    rng = np.random.default_rng(42)
+    upper = [1]
+    changed_ids = []
+    written = []
+
+    def fetch(query, params):
+        if query is UPPER_BOUND_QUERY:
+            return pd.DataFrame({"UpperBound": [upper[0]]}), None
+        if query is WATERMARK_QUERY:
+            return pd.DataFrame({"RowVer": [None]}), None
+        if query is TOTALS_QUERY:
+            return synthetic_totals(rng, np.arange(1, CUSTOMERS + 1)), None
+        if query is CHANGED_TOTALS_QUERY:
+            return synthetic_totals(rng, changed_ids[-1]), None
+        return pd.DataFrame(), None
+
+    def execute_many(steps):
+        written.append(sum(len(rows) for statement, rows in steps if statement is customer_rfm.INSERT_SCORE_STATEMENT))
+        return None
+
+    scorer = RfmScorer(fetch, execute_many)
+    t0 = time.perf_counter()
+    scorer.refresh(force=True)
+    print(f"Scored {CUSTOMERS:,} customers in {(time.perf_counter() - t0) * 1000:.0f} ms "
+          f"(including building {written[-1]:,} rows to persist)")
+
+    for count in CHANGED:
+        # Mostly existing customers plus a few first-time buyers
+        changed_ids.append(np.concatenate((
+            rng.choice(CUSTOMERS, count - count // 10, replace=False) + 1,
+            np.arange(CUSTOMERS + 1, CUSTOMERS + 1 + count // 10),
+        )))
+        upper[0] += 1
+        t0 = time.perf_counter()
+        scorer.refresh(force=True)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"Refresh with {count:>6,} changed customers: {elapsed:6.0f} ms, {written[-1]:>7,} rows rewritten")
+
+    t0 = time.perf_counter()
+    scorer.segments()
+    print(f"Segment summary: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: /api/timeseries payload and server time for one month versus years of history
+
+Run from the app directory:
+    python -m benchmarks.bench_timeseries
+"""
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from timeseries import GRANULARITIES, bucket_range, build_series
+
+POINTS = 500
+RANGES = [
+    ("1 month", datetime(2025, 1, 1), datetime(2025, 2, 1)),
+    ("1 year", datetime(2024, 1, 1), datetime(2025, 1, 1)),
+    ("5 years", datetime(2020, 1, 1), datetime(2025, 1, 1)),
+    ("20 years", datetime(2005, 1, 1), datetime(2025, 1, 1)),
+]
+
+
+def synthetic_fetch(rng):
+    """Stand-in for query_dataframe returning one aggregated row per bucket"""
+    def fetch(query, params):
+        granularity = next(name for name, (bucket, _) in GRANULARITIES.items() if bucket in query)
+        buckets = bucket_range(params["start"], params["end"], granularity)
+        orders = rng.poisson(20, len(buckets))
+        return pd.DataFrame({
+            "Bucket": buckets,
+            "Orders": orders,
+            "Revenue": orders * rng.normal(35, 8, len(buckets)),
+        }), None
+    return fetch
+
+
+def main():
+    fetch = synthetic_fetch(np.random.default_rng(42))
+    for label, start, end in RANGES:
+        for method in ("lttb", "minmax"):
+            t0 = time.perf_counter()
+            result, _ = build_series(fetch, start, end, "revenue", POINTS, method=method)
+            elapsed = (time.perf_counter() - t0) * 1000
+            payload = len(json.dumps(result["data"]))
+            print(f"{label:>8} {method:>6}: {result['buckets']:>6,} {result['granularity']} buckets -> "
+                  f"{result['row_count']} points, {payload / 1024:.1f} KiB, {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
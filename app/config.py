@@ -16,14 +16,105 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', ''),
 }
 
-def get_connection_string():
-    """Generate pyodbc connection string"""
+def parse_locations(value):
+    """Parse "Name=server/database,Name2=server2/database2" into location settings"""
+    locations = {}
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        name, _, target = entry.partition('=')
+        server, _, database = target.partition('/')
+        locations[name.strip()] = {
+            'server': server.strip() or DB_CONFIG['server'],
+            'database': database.strip() or DB_CONFIG['database'],
+        }
+    return locations
+
+# Location databases for scatter-gather queries; each is built from buildDB.sql and
+# shares the driver and credentials above
+LOCATIONS = parse_locations(os.getenv('DB_LOCATIONS', ''))
+
+# Seconds to wait for each location before returning partial results
+SHARD_TIMEOUT_SECONDS = int(os.getenv('SHARD_TIMEOUT_SECONDS', '15'))
+
+# Query profiling (plan capture and regression detection)
+PROFILING_CONFIG = {
+    # Profile every dashboard query, not only requests with ?profile=1
+    'enabled': os.getenv('QUERY_PROFILING', '0') == '1',
+    'baseline_path': os.getenv('PLAN_BASELINE_PATH', 'plan_baseline.json'),
+    # Flag a regression when logical reads grow by more than this fraction
+    'reads_threshold': float(os.getenv('PLAN_READS_THRESHOLD', '0.25')),
+}
+
+# Background precomputation of parameterless dashboard queries
+CACHE_CONFIG = {
+    'enabled': os.getenv('QUERY_CACHE', '1') == '1',
+    # How often to check the data-change watermark
+    'poll_seconds': int(os.getenv('QUERY_CACHE_POLL_SECONDS', '30')),
+    # Refresh at least this often even if the watermark has not moved (catches updates)
+    'max_age_seconds': int(os.getenv('QUERY_CACHE_MAX_AGE_SECONDS', '900')),
+    # Connections opened at startup so the ODBC pool is warm
+    'warm_connections': int(os.getenv('QUERY_CACHE_WARM_CONNECTIONS', '4')),
+}
+
+# Limits for /api/custom-query, checked against the estimated plan before running
+CUSTOM_QUERY_CONFIG = {
+    # Reject statements whose estimated subtree cost exceeds this
+    'max_cost': float(os.getenv('CUSTOM_QUERY_MAX_COST', '50')),
+    # Cap the rows returned when the optimizer expects more than this
+    'max_rows': int(os.getenv('CUSTOM_QUERY_MAX_ROWS', '10000')),
+    'timeout_seconds': int(os.getenv('CUSTOM_QUERY_TIMEOUT_SECONDS', '30')),
+    # Parsed statements and plan estimates remembered per fingerprint
+    'cache_size': int(os.getenv('CUSTOM_QUERY_CACHE_SIZE', '256')),
+}
+
+# Live feed of today's orders pushed to dashboard clients over server-sent events
+LIVE_CONFIG = {
+    'enabled': os.getenv('LIVE_FEED', '1') == '1',
+    # How often to poll ORDERS for rows changed since the last row version
+    'poll_seconds': float(os.getenv('LIVE_FEED_POLL_SECONDS', '2')),
+    # Idle streams send a comment this often so proxies keep the connection open
+    'heartbeat_seconds': int(os.getenv('LIVE_FEED_HEARTBEAT_SECONDS', '15')),
+    # Recent deltas kept for clients that fall behind; older gaps get a fresh snapshot
+    'history': int(os.getenv('LIVE_FEED_HISTORY', '100')),
+}
+
+# Server-side binning and downsampling for /api/timeseries
+TIMESERIES_CONFIG = {
+    # Points returned when the client does not ask for a number
+    'default_points': int(os.getenv('TIMESERIES_DEFAULT_POINTS', '500')),
+    'max_points': int(os.getenv('TIMESERIES_MAX_POINTS', '2000')),
+    # Upper bound on buckets aggregated by SQL for an explicitly requested granularity
+    'max_buckets': int(os.getenv('TIMESERIES_MAX_BUCKETS', '20000')),
+}
+
+# Background exports of large result sets (/api/exports)
+EXPORT_CONFIG = {
+    'directory': os.getenv('EXPORT_DIRECTORY', 'exports'),
+    # Finished exports (and their files) are deleted this long after they finish
+    'ttl_seconds': int(os.getenv('EXPORT_TTL_SECONDS', '3600')),
+    # Rows fetched from the cursor and written per chunk; bounds memory per export
+    'chunk_rows': int(os.getenv('EXPORT_CHUNK_ROWS', '50000')),
+    # Exports running at once; further jobs wait in the queue
+    'max_running': int(os.getenv('EXPORT_MAX_RUNNING', '2')),
+    'timeout_seconds': int(os.getenv('EXPORT_TIMEOUT_SECONDS', '3600')),
+    'csv_compression_level': int(os.getenv('EXPORT_CSV_COMPRESSION_LEVEL', '6')),
+    'parquet_compression': os.getenv('EXPORT_PARQUET_COMPRESSION', 'zstd'),
+}
+
+# Hot/cold tiering of order history (Database-Setup/archiveDB.sql)
+ARCHIVE_CONFIG = {
+    # Read ORDERS_All/ORDERITEMS_All/RESERVATIONS_All when a range reaches archived months
+    'enabled': os.getenv('ORDER_ARCHIVE', '0') == '1',
+}
+
+def get_connection_string(location=None):
+    """Generate pyodbc connection string, optionally for a named location"""
+    target = LOCATIONS[location] if location else DB_CONFIG
     if DB_CONFIG['username'] and DB_CONFIG['password']:
         # SQL Server Authentication
         return (
             f"DRIVER={{{DB_CONFIG['driver']}}};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
+            f"SERVER={target['server']};"
+            f"DATABASE={target['database']};"
             f"UID={DB_CONFIG['username']};"
             f"PWD={DB_CONFIG['password']}"
         )
@@ -31,7 +122,7 @@ def get_connection_string():
         # Windows Authentication
         return (
             f"DRIVER={{{DB_CONFIG['driver']}}};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
+            f"SERVER={target['server']};"
+            f"DATABASE={target['database']};"
             f"Trusted_Connection=yes"
         )
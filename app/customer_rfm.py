@@ -0,0 +1,362 @@
+"""
+Recency, frequency and monetary (RFM) scores for every customer with paid orders
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Scores run from 1 to QUANTILES; 5 gives quintiles
+QUANTILES = 5
+
+# Minimum number of seconds between two incremental refreshes
+REFRESH_INTERVAL_SECONDS = 300
+
+# Segment by recency score (rows, 1-5) and frequency score (columns, 1-5)
+SEGMENT_GRID = [
+    ['Hibernating', 'Hibernating', 'At Risk', 'At Risk', "Can't Lose Them"],
+    ['Hibernating', 'Hibernating', 'At Risk', 'At Risk', "Can't Lose Them"],
+    ['About to Sleep', 'About to Sleep', 'Need Attention', 'Loyal Customers', 'Loyal Customers'],
+    ['Promising', 'Potential Loyalists', 'Potential Loyalists', 'Loyal Customers', 'Loyal Customers'],
+    ['New Customers', 'Potential Loyalists', 'Potential Loyalists', 'Champions', 'Champions'],
+]
+SEGMENTS = ['Champions', 'Loyal Customers', 'Potential Loyalists', 'New Customers', 'Promising',
+            'Need Attention', 'About to Sleep', 'At Risk', "Can't Lose Them", 'Hibernating']
+SEGMENT_CODES = np.array([[SEGMENTS.index(name) for name in row] for row in SEGMENT_GRID], dtype=np.int8)
+
+UPPER_BOUND_QUERY = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) AS UpperBound"
+
+WATERMARK_QUERY = "SELECT RowVer FROM CustomerRFMWatermark"
+
+PERSISTED_QUERY = "SELECT CustomerID, LastOrder, Frequency, Monetary FROM CustomerRFM"
+
+# Full aggregation, used once when nothing has been persisted yet
+TOTALS_QUERY = """
+    SELECT CustomerID, MAX(OrderDateTime) AS LastOrder, COUNT(*) AS Frequency, SUM(TotalAmount) AS Monetary
+    FROM ORDERS
+    WHERE PaymentStatus = 'Paid' AND CustomerID IS NOT NULL
+        AND RowVer < CAST(:upper AS BINARY(8))
+    GROUP BY CustomerID
+"""
+
+# Customers with orders inserted or updated since the last refresh, re-aggregated from
+# their own orders (IX_ORDERS_RowVer, then IX_ORDERS_CustomerID). Frequency 0 means the
+# customer no longer has paid orders, e.g. after a refund.
+CHANGED_TOTALS_QUERY = """
+    SELECT c.CustomerID, MAX(o.OrderDateTime) AS LastOrder, COUNT(o.OrderID) AS Frequency,
+        COALESCE(SUM(o.TotalAmount), 0) AS Monetary
+    FROM (
+        SELECT DISTINCT CustomerID
+        FROM ORDERS
+        WHERE RowVer >= CAST(:since AS BINARY(8))
+            AND RowVer < CAST(:upper AS BINARY(8))
+            AND CustomerID IS NOT NULL
+    ) c
+    LEFT JOIN ORDERS o ON o.CustomerID = c.CustomerID AND o.PaymentStatus = 'Paid'
+    GROUP BY c.CustomerID
+"""
+
+DELETE_SCORE_STATEMENT = "DELETE FROM CustomerRFM WHERE CustomerID = :customer_id"
+
+INSERT_SCORE_STATEMENT = """
+    INSERT INTO CustomerRFM (CustomerID, LastOrder, Frequency, Monetary,
+        RecencyScore, FrequencyScore, MonetaryScore, Segment, ScoredAt)
+    VALUES (:customer_id, :last_order, :frequency, :monetary,
+        :recency_score, :frequency_score, :monetary_score, :segment, :scored_at)
+"""
+
+# Analytics.sql creates the single watermark row with a NULL RowVer (nothing persisted yet)
+SAVE_WATERMARK_STATEMENT = "UPDATE CustomerRFMWatermark SET RowVer = :row_version WHERE Id = 1"
+
+# Names for a page of segment members; ids are passed as one comma-separated string
+CUSTOMER_NAMES_QUERY = """
+    SELECT c.CustomerID, c.FirstName + ' ' + c.LastName AS CustomerName, c.Email
+    FROM CUSTOMERS c
+    JOIN STRING_SPLIT(:customer_ids, ',') ids ON c.CustomerID = CAST(ids.value AS INT)
+"""
+
+FIELDS = ['customer_id', 'last_order', 'frequency', 'monetary', 'recency', 'frequency_score', 'monetary_score', 'segment']
+
+
+def quantile_scores(values):
+    """1..QUANTILES by the share of values at or below each value; ties share a score"""
+    if not len(values):
+        return np.zeros(0, dtype=np.int8)
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    # Every value in a run of equal values counts the whole run as at or below it
+    run_ends = np.flatnonzero(np.append(ordered[1:] != ordered[:-1], True))
+    at_or_below = np.empty(len(values))
+    at_or_below[order] = np.repeat(run_ends + 1, np.diff(run_ends, prepend=-1)) / len(values)
+    return np.clip(np.ceil(at_or_below * QUANTILES), 1, QUANTILES).astype(np.int8)
+
+
+def empty_state():
+    return {
+        'customer_id': np.zeros(0, dtype=np.int64),
+        'last_order': np.zeros(0, dtype='datetime64[s]'),
+        'frequency': np.zeros(0, dtype=np.int32),
+        'monetary': np.zeros(0, dtype=np.float64),
+        'recency': np.zeros(0, dtype=np.int8),
+        'frequency_score': np.zeros(0, dtype=np.int8),
+        'monetary_score': np.zeros(0, dtype=np.int8),
+        'segment': np.zeros(0, dtype=np.int8),
+    }
+
+
+def totals_state(df):
+    """Aggregates from a query result, sorted by CustomerID"""
+    df = df.sort_values('CustomerID')
+    return {
+        'customer_id': df['CustomerID'].to_numpy(dtype=np.int64),
+        'last_order': pd.to_datetime(df['LastOrder']).to_numpy().astype('datetime64[s]'),
+        'frequency': df['Frequency'].to_numpy(dtype=np.int32),
+        'monetary': pd.to_numeric(df['Monetary']).fillna(0).to_numpy(dtype=np.float64).round(2),
+    }
+
+
+class RfmScorer:
+    """Per-customer aggregates in NumPy arrays, rescored together and persisted when they change"""
+
+    def __init__(self, fetch_dataframe, execute_many):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        # execute_many([(statement, [params, ...]), ...]) -> error, all in one transaction
+        self._fetch = fetch_dataframe
+        self._execute_many = execute_many
+        self._lock = threading.Lock()
+        self._state = None
+        # What CustomerRFM holds; a failed write is retried by diffing against it next time
+        self._persisted = None
+        self._since = None
+        self._last_refresh = 0.0
+        self.scored_at = None
+        self.last_error = None
+
+    @property
+    def loaded(self):
+        return self._state is not None
+
+    def _upper_bound(self):
+        df, error = self._fetch(UPPER_BOUND_QUERY, None)
+        if error:
+            return None, error
+        return int(df["UpperBound"].iloc[0]), None
+
+    def refresh(self, force=False):
+        """Re-aggregate customers with changed orders, rescore everyone and persist; returns an error or None"""
+        with self._lock:
+            if not force and time.time() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return None
+
+            upper, error = self._upper_bound()
+            if error:
+                return error
+
+            state, since = self._state, self._since
+            if state is None:
+                state, since, error = self._load(upper)
+                if error:
+                    return error
+            if since is not None and upper > since:
+                changed, error = self._fetch(CHANGED_TOTALS_QUERY, {"since": since, "upper": upper})
+                if error:
+                    return error
+                if not changed.empty:
+                    state = self._merge(state, totals_state(changed))
+
+            state = self._score(state)
+            self._state = state
+            self._since = upper
+            self._last_refresh = time.time()
+            self.scored_at = datetime.now().isoformat(timespec='seconds')
+
+            error = self._persist(state, upper)
+            self.last_error = error
+            return error
+
+    def _load(self, upper):
+        """(state, since, error) from CustomerRFM when it has been filled, else from ORDERS"""
+        watermark, error = self._fetch(WATERMARK_QUERY, None)
+        if error:
+            return None, None, error
+        if watermark.empty:
+            return None, None, "CustomerRFMWatermark is empty; run Analytics.sql"
+        since = watermark['RowVer'].iloc[0]
+        if pd.notna(since):
+            df, error = self._fetch(PERSISTED_QUERY, None)
+            if error:
+                return None, None, error
+            state = self._score(totals_state(df))
+            self._persisted = dict(state, row_version=int(since))
+            return state, int(since), None
+
+        df, error = self._fetch(TOTALS_QUERY, {"upper": upper})
+        if error:
+            return None, None, error
+        self._persisted = empty_state()
+        return totals_state(df), None, None
+
+    def _merge(self, state, changed):
+        """Replace changed customers' aggregates and drop those without paid orders"""
+        keep = ~np.isin(state['customer_id'], changed['customer_id'])
+        merged = {name: np.concatenate((state[name][keep], changed[name])) for name in changed}
+        order = np.argsort(merged['customer_id'], kind='stable')
+        order = order[merged['frequency'][order] > 0]
+        return {name: values[order] for name, values in merged.items()}
+
+    def _score(self, state):
+        """Quantile scores and segments for every customer in one vectorized pass"""
+        recency = quantile_scores(state['last_order'].astype(np.int64))
+        frequency = quantile_scores(state['frequency'])
+        return dict(
+            state,
+            recency=recency,
+            frequency_score=frequency,
+            monetary_score=quantile_scores(state['monetary']),
+            segment=SEGMENT_CODES[recency - 1, frequency - 1] if len(recency) else np.zeros(0, dtype=np.int8),
+        )
+
+    def _persist(self, state, upper):
+        """Write rows that differ from what CustomerRFM holds, plus the new watermark"""
+        old = self._persisted
+        ids = state['customer_id']
+        position = np.searchsorted(old['customer_id'], ids)
+        position = np.minimum(position, max(len(old['customer_id']) - 1, 0))
+        existed = np.zeros(len(ids), dtype=bool)
+        differs = np.zeros(len(ids), dtype=bool)
+        if len(old['customer_id']):
+            existed = old['customer_id'][position] == ids
+            for name in FIELDS[1:]:
+                differs |= old[name][position] != state[name]
+        changed = ~existed | differs
+        removed = old['customer_id'][~np.isin(old['customer_id'], ids)]
+        if not changed.any() and not len(removed) and upper == old.get('row_version'):
+            return None
+
+        rows = np.flatnonzero(changed)
+        scored_at = datetime.now().replace(microsecond=0)
+        # Rows are replaced rather than updated in place: plain DELETE and INSERT batch well
+        replaced = ids[changed & existed]
+        deletes = [{"customer_id": customer_id} for customer_id in np.concatenate((removed, replaced)).tolist()]
+        inserts = [
+            {
+                "customer_id": customer_id,
+                "last_order": last_order,
+                "frequency": frequency,
+                "monetary": monetary,
+                "recency_score": recency,
+                "frequency_score": frequency_score,
+                "monetary_score": monetary_score,
+                "segment": SEGMENTS[segment],
+                "scored_at": scored_at,
+            }
+            for customer_id, last_order, frequency, monetary, recency, frequency_score, monetary_score, segment in zip(
+                ids[rows].tolist(),
+                state['last_order'][rows].astype('datetime64[us]').tolist(),
+                state['frequency'][rows].tolist(),
+                state['monetary'][rows].tolist(),
+                state['recency'][rows].tolist(),
+                state['frequency_score'][rows].tolist(),
+                state['monetary_score'][rows].tolist(),
+                state['segment'][rows].tolist(),
+            )
+        ]
+        error = self._execute_many([
+            (DELETE_SCORE_STATEMENT, deletes),
+            (INSERT_SCORE_STATEMENT, inserts),
+            (SAVE_WATERMARK_STATEMENT, [{"row_version": upper}]),
+        ])
+        if not error:
+            self._persisted = dict(state, row_version=upper)
+        return error
+
+    def customer(self, customer_id, now=None):
+        """Scores and aggregates for one customer, or None without paid orders"""
+        now = np.datetime64(now or datetime.now(), 's')
+        with self._lock:
+            state = self._state
+        if state is None:
+            return None
+        position = np.searchsorted(state['customer_id'], customer_id)
+        if position >= len(state['customer_id']) or state['customer_id'][position] != customer_id:
+            return None
+        recency, frequency, monetary = (int(state[name][position]) for name in ('recency', 'frequency_score', 'monetary_score'))
+        return {
+            "customer_id": int(customer_id),
+            "segment": SEGMENTS[state['segment'][position]],
+            "rfm": f"{recency}{frequency}{monetary}",
+            "recency_score": recency,
+            "frequency_score": frequency,
+            "monetary_score": monetary,
+            "last_order": state['last_order'][position].astype(datetime).isoformat(),
+            "recency_days": int((now - state['last_order'][position]) // np.timedelta64(1, 'D')),
+            "frequency": int(state['frequency'][position]),
+            "monetary": float(state['monetary'][position]),
+        }
+
+    def segments(self, now=None):
+        """Size and averages per segment, plus customer counts on the recency x frequency grid"""
+        now = np.datetime64(now or datetime.now(), 's')
+        with self._lock:
+            state = self._state
+        if state is None:
+            return None
+        codes = state['segment'].astype(np.intp)
+        counts = np.bincount(codes, minlength=len(SEGMENTS))
+        days = (now - state['last_order']) // np.timedelta64(1, 'D')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averages = {
+                name: np.bincount(codes, weights=values, minlength=len(SEGMENTS)) / counts
+                for name, values in (('recency_days', days), ('frequency', state['frequency']), ('monetary', state['monetary']))
+            }
+        monetary = np.bincount(codes, weights=state['monetary'], minlength=len(SEGMENTS))
+        total = max(len(codes), 1)
+        grid = np.zeros((QUANTILES, QUANTILES), dtype=np.int64)
+        np.add.at(grid, (state['recency'].astype(np.intp) - 1, state['frequency_score'].astype(np.intp) - 1), 1)
+        return {
+            "customers": len(codes),
+            "segments": [
+                {
+                    "segment": name,
+                    "customers": int(counts[i]),
+                    "share": round(float(counts[i]) / total, 4),
+                    "avg_recency_days": round(float(averages['recency_days'][i]), 1) if counts[i] else None,
+                    "avg_frequency": round(float(averages['frequency'][i]), 2) if counts[i] else None,
+                    "avg_monetary": round(float(averages['monetary'][i]), 2) if counts[i] else None,
+                    "total_monetary": round(float(monetary[i]), 2),
+                }
+                for i, name in enumerate(SEGMENTS)
+            ],
+            # grid[r - 1][f - 1] = customers with recency score r and frequency score f
+            "grid": grid.tolist(),
+        }
+
+    def members(self, segment, limit=None):
+        """Customers in a segment, highest spend first; returns (DataFrame, error)"""
+        with self._lock:
+            state = self._state
+        if state is None:
+            return None, "RFM scores are not loaded"
+        rows = np.flatnonzero(state['segment'] == SEGMENTS.index(segment))
+        rows = rows[np.argsort(-state['monetary'][rows], kind='stable')][:limit]
+        df = pd.DataFrame({
+            "CustomerID": state['customer_id'][rows],
+            "LastOrder": pd.to_datetime(state['last_order'][rows]).strftime('%Y-%m-%dT%H:%M:%S'),
+            "Frequency": state['frequency'][rows],
+            "Monetary": state['monetary'][rows],
+            "RecencyScore": state['recency'][rows],
+            "FrequencyScore": state['frequency_score'][rows],
+            "MonetaryScore": state['monetary_score'][rows],
+        })
+        if df.empty:
+            return df, None
+
+        names, error = self._fetch(CUSTOMER_NAMES_QUERY, {"customer_ids": ",".join(map(str, df['CustomerID']))})
+        if error:
+            return None, error
+        names['CustomerID'] = names['CustomerID'].astype(np.int64)
+        df = df.merge(names, on='CustomerID', how='left')
+        return df[['CustomerID', 'CustomerName', 'Email', 'LastOrder', 'Frequency', 'Monetary',
+                   'RecencyScore', 'FrequencyScore', 'MonetaryScore']], None
@@ -0,0 +1,318 @@
+"""
+Background export of large result sets, streamed from the cursor to compressed CSV or Parquet files
+"""
+import csv
+import gzip
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from datetime import time as time_of_day
+from decimal import Decimal
+
+from config import EXPORT_CONFIG
+
+FORMATS = {
+    'csv': {"extension": ".csv.gz", "mimetype": "application/gzip"},
+    'parquet': {"extension": ".parquet", "mimetype": "application/vnd.apache.parquet"},
+}
+
+FINISHED_STATUSES = {'completed', 'failed', 'cancelled'}
+
+# How often the janitor looks for expired exports
+COLLECT_INTERVAL_SECONDS = 60
+
+# Export files and their partial downloads; anything else in the directory is left alone
+EXPORT_FILE_PATTERN = re.compile(r'^[0-9a-f]{32}\.(csv\.gz|parquet)(\.part)?$')
+
+
+def safe_name(name):
+    """File-name-safe download name"""
+    return re.sub(r'[^\w.-]+', '_', name or '').strip('._')[:64] or 'export'
+
+
+def csv_value(value):
+    """Binary columns (rowversion, varbinary) are written as hex"""
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value
+
+
+class CsvWriter:
+    """Gzip-compressed CSV, written one chunk of rows at a time"""
+
+    def __init__(self, path, description):
+        self._file = gzip.open(path, 'wt', newline='', encoding='utf-8',
+                               compresslevel=EXPORT_CONFIG['csv_compression_level'])
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([column[0] for column in description])
+        self._binary = any(column[1] in (bytes, bytearray) for column in description)
+
+    def write(self, rows):
+        if self._binary:
+            rows = ([csv_value(value) for value in row] for row in rows)
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Parquet with one row group per chunk; the schema comes from the cursor description"""
+
+    def __init__(self, path, description):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow is required for Parquet exports")
+        self._pa = pa
+        self._schema = pa.schema([
+            pa.field(column[0], self._arrow_type(column)) for column in description
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=EXPORT_CONFIG['parquet_compression'])
+
+    def _arrow_type(self, column):
+        pa = self._pa
+        type_code, precision, scale = column[1], column[4], column[5]
+        if type_code is bool:
+            return pa.bool_()
+        if type_code is int:
+            return pa.int64()
+        if type_code is float:
+            return pa.float64()
+        if type_code is Decimal:
+            return pa.decimal128(precision or 38, scale or 0)
+        if type_code is datetime:
+            return pa.timestamp('us')
+        if type_code is date:
+            return pa.date32()
+        if type_code is time_of_day:
+            return pa.time64('us')
+        if type_code in (bytes, bytearray):
+            return pa.binary()
+        return pa.string()
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        arrays = [self._pa.array(values, type=field.type) for values, field in zip(columns, self._schema)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'parquet': ParquetWriter}
+
+
+class ExportJobs:
+    """Runs exports on a fixed pool of background threads and tracks their progress until they expire"""
+
+    def __init__(self, open_cursor, estimate_plan):
+        # open_cursor(query, params, timeout) -> (pyodbc cursor, error); the caller closes its connection
+        # estimate_plan(sql) -> ({"estimated_rows", ...}, error)
+        self._open_cursor = open_cursor
+        self._estimate = estimate_plan
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._cancel = {}
+        # Queued exports wait in the pool's queue, not on threads of their own
+        self._pool = ThreadPoolExecutor(max_workers=EXPORT_CONFIG['max_running'], thread_name_prefix="export")
+        self._thread = None
+        self._stop = threading.Event()
+        self.directory = os.path.abspath(EXPORT_CONFIG['directory'])
+
+    def submit(self, query, params=None, fmt='csv', name=None, estimate=True):
+        """Queue an export and return its status; estimate=False skips the row estimate used for progress"""
+        self.collect()
+        os.makedirs(self.directory, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "format": fmt,
+            "file_name": safe_name(name) + FORMATS[fmt]["extension"],
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+            "rows": 0,
+            "bytes": 0,
+            "estimated_rows": None,
+            "progress": None,
+            "elapsed_seconds": 0.0,
+            "rows_per_second": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._cancel[job_id] = threading.Event()
+        self._pool.submit(self._run, job_id, query, params, estimate)
+        return dict(job)
+
+    def get(self, job_id):
+        """Status of one export, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        """Status of every export that has not expired, newest first"""
+        with self._lock:
+            return sorted((dict(job) for job in self._jobs.values()), key=lambda job: job["created_at"], reverse=True)
+
+    def path(self, job_id):
+        """File of a completed export, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] != 'completed':
+                return None
+        return self._file_path(job_id, job["format"])
+
+    def cancel(self, job_id):
+        """Stop a queued or running export, or delete a finished one; returns False if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            self._cancel[job_id].set()
+            if job["status"] in FINISHED_STATUSES:
+                self._remove_locked(job_id)
+        return True
+
+    def _file_path(self, job_id, fmt):
+        return os.path.join(self.directory, job_id + FORMATS[fmt]["extension"])
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _run(self, job_id, query, params, estimate):
+        cancelled = self._cancel[job_id]
+        if cancelled.is_set():
+            self._finish(job_id, "cancelled")
+            return
+        started = time.perf_counter()
+        self._update(job_id, status="running", started_at=datetime.now().isoformat(timespec='seconds'))
+        try:
+            self._export(job_id, query, params, estimate, started, cancelled)
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+
+    def _export(self, job_id, query, params, estimate, started, cancelled):
+        fmt = self._jobs[job_id]["format"]
+        if estimate:
+            # Only for progress; exports are not gated on cost like /api/custom-query
+            plan, error = self._estimate(query)
+            if not error:
+                self._update(job_id, estimated_rows=int(plan["estimated_rows"]))
+
+        cursor, error = self._open_cursor(query, params, EXPORT_CONFIG['timeout_seconds'])
+        if error:
+            self._finish(job_id, "failed", error=error)
+            return
+
+        final_path = self._file_path(job_id, fmt)
+        part_path = final_path + ".part"
+        writer = None
+        rows = 0
+        try:
+            writer = WRITERS[fmt](part_path, cursor.description)
+            while not cancelled.is_set():
+                chunk = cursor.fetchmany(EXPORT_CONFIG['chunk_rows'])
+                if not chunk:
+                    break
+                writer.write(chunk)
+                rows += len(chunk)
+                self._update(job_id, **self._progress(job_id, rows, os.path.getsize(part_path), started))
+            writer.close()
+            writer = None
+        finally:
+            if writer:
+                writer.close()
+            cursor.connection.close()
+
+        if cancelled.is_set():
+            os.remove(part_path)
+            self._finish(job_id, "cancelled")
+            return
+        # Downloads only ever see complete files
+        os.replace(part_path, final_path)
+        self._update(job_id, **self._progress(job_id, rows, os.path.getsize(final_path), started))
+        self._finish(job_id, "completed", progress=1.0)
+
+    def _progress(self, job_id, rows, size, started):
+        elapsed = time.perf_counter() - started
+        estimated = self._jobs[job_id]["estimated_rows"]
+        return {
+            "rows": rows,
+            "bytes": size,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(rows / elapsed) if elapsed > 0 else None,
+            # The optimizer's estimate can be low; running jobs never report completion
+            "progress": round(min(rows / estimated, 0.99), 3) if estimated else None,
+        }
+
+    def _finish(self, job_id, status, **changes):
+        now = datetime.now()
+        expires = datetime.fromtimestamp(now.timestamp() + EXPORT_CONFIG['ttl_seconds'])
+        self._update(
+            job_id, status=status,
+            finished_at=now.isoformat(timespec='seconds'),
+            expires_at=expires.isoformat(timespec='seconds'),
+            **changes
+        )
+        if status != 'completed':
+            part_path = self._file_path(job_id, self._jobs[job_id]["format"]) + ".part"
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _remove_locked(self, job_id):
+        job = self._jobs.pop(job_id)
+        self._cancel.pop(job_id, None)
+        path = self._file_path(job_id, job["format"])
+        if os.path.exists(path):
+            os.remove(path)
+
+    def collect(self, now=None):
+        """Delete exports past their expiry, and files no job owns (e.g. from before a restart)"""
+        now = now or datetime.now()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["expires_at"] and job["expires_at"] <= now.isoformat(timespec='seconds')]
+            for job_id in expired:
+                self._remove_locked(job_id)
+            known = set(self._jobs)
+
+        if not os.path.isdir(self.directory):
+            return len(expired)
+        cutoff = now.timestamp() - EXPORT_CONFIG['ttl_seconds']
+        for entry in os.scandir(self.directory):
+            if not EXPORT_FILE_PATTERN.match(entry.name):
+                continue
+            job_id = entry.name.split('.', 1)[0]
+            if job_id not in known and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        return len(expired)
+
+    def _collect_loop(self):
+        while not self._stop.wait(COLLECT_INTERVAL_SECONDS):
+            try:
+                self.collect()
+            except OSError as e:
+                print(f"Export cleanup failed: {e}")
+
+    def start(self):
+        """Start the expiry janitor (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._collect_loop, name="export-janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for event in list(self._cancel.values()):
+            event.set()
@@ -1,55 +1,209 @@
 """
 Flask API Backend for Restaurant Analytics
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, send_file
 from flask_cors import CORS
 import pyodbc
+import json
+import re
+import threading
 import pandas as pd
-from config import get_connection_string
+from config import (
+    get_connection_string, PROFILING_CONFIG, CACHE_CONFIG, CUSTOM_QUERY_CONFIG,
+    LIVE_CONFIG, TIMESERIES_CONFIG, EXPORT_CONFIG, LOCATIONS, SHARD_TIMEOUT_SECONDS
+)
 from queries import QUERIES
+from inventory_forecast import InventoryForecaster, VELOCITY_WINDOWS
+from reservation_availability import AvailabilityIndex, ACTIVE_STATUSES, RESERVATION_STATUSES, SLOT_MINUTES
+from query_profiler import ProfileStore, run_profiled, summarize_plans
+from query_cache import QueryCache
+from sql_guard import SqlGuard, normalize
+from scatter_gather import ScatterGather
+from live_revenue import LiveRevenue
+from export_jobs import ExportJobs, FORMATS
+from customer_rfm import RfmScorer, SEGMENTS
+from sales_cube import SalesCube, DIMENSIONS, MEASURES
+from market_basket import MarketBasket, SORTS as BASKET_SORTS
+from archive import ArchiveCatalog, range_start
+from timeseries import METRICS, GRANULARITIES, DOWNSAMPLING_METHODS, bucket_count, build_series
+from datetime import datetime
+import os
 
 app = Flask(__name__)
 CORS(app)
 
-def get_db_connection():
+def get_db_connection(location=None):
     """Create database connection"""
     try:
-        conn = pyodbc.connect(get_connection_string())
+        conn = pyodbc.connect(get_connection_string(location))
         return conn
     except Exception as e:
         print(f"Database connection error: {e}")
         return None
 
+def bind_params(query, params=None):
+    """Replace named parameters with ? placeholders for pyodbc"""
+    sql = query
+    param_values = []
+    
+    if params:
+        # Bind one value per placeholder occurrence, in the order they appear
+        names = sorted(params, key=len, reverse=True)
+        pattern = re.compile(r":(" + "|".join(re.escape(name) for name in names) + r")\b")
+        
+        def placeholder(match):
+            param_values.append(params[match.group(1)])
+            return "?"
+        
+        sql = pattern.sub(placeholder, query)
+    
+    return sql, param_values
+
+def query_dataframe(query, params=None, row_limit=None, timeout=None, location=None):
+    """Execute a query and return results as a pandas DataFrame"""
+    conn = get_db_connection(location)
+    if not conn:
+        return None, "Database connection failed"
+    
+    try:
+        if timeout:
+            conn.timeout = timeout
+        if row_limit:
+            # Makes the server stop producing rows once the limit is reached
+            conn.execute(f"SET ROWCOUNT {int(row_limit)}")
+        sql, param_values = bind_params(query, params)
+        df = pd.read_sql_query(sql, conn, params=param_values if param_values else None)
+        conn.close()
+        return df, None
+    except Exception as e:
+        conn.close()
+        return None, str(e)
+
+def history_dataframe(query, params=None):
+    """query_dataframe over archived months as well as the hot tables"""
+    return query_dataframe(archive_catalog.route(query), params)
+
+def open_cursor(query, params=None, timeout=None):
+    """Execute a query and return its cursor for fetching in chunks; close cursor.connection when done"""
+    conn = get_db_connection()
+    if not conn:
+        return None, "Database connection failed"
+    
+    try:
+        if timeout:
+            conn.timeout = timeout
+        sql, param_values = bind_params(query, params)
+        cursor = conn.cursor()
+        cursor.execute(sql, param_values)
+        return cursor, None
+    except Exception as e:
+        conn.close()
+        return None, str(e)
+
 def execute_query(query, params=None):
     """Execute a query and return results as a list of dictionaries"""
+    if PROFILING_CONFIG['enabled']:
+        results, _, error = execute_profiled_query(query, params)
+        return results, error
+    
+    # Saved queries read archived months only when their date parameters reach them
+    df, error = query_dataframe(archive_catalog.route(query, range_start(params)), params)
+    if error:
+        return None, error
+    return df.to_dict(orient='records'), None
+
+def execute_profiled_query(query, params=None):
+    """Execute a query capturing IO/TIME statistics and the actual plan"""
+    conn = get_db_connection()
+    if not conn:
+        return None, None, "Database connection failed"
+    
+    try:
+        sql, param_values = bind_params(archive_catalog.route(query, range_start(params)), params)
+        df, profile = run_profiled(conn, sql, param_values)
+        conn.close()
+    except Exception as e:
+        conn.close()
+        return None, None, str(e)
+    
+    label = QUERY_LABELS.get(query, "adhoc")
+    profile = profile_store.record(label, profile)
+    return df.to_dict(orient='records'), profile, None
+
+def estimate_query_plan(query):
+    """Fetch the estimated plan without running the query; returns (summary, error)"""
     conn = get_db_connection()
     if not conn:
         return None, "Database connection failed"
     
     try:
-        # Replace named parameters with ? placeholders for pyodbc
-        sql = query
-        param_values = []
-        
-        if params:
-            for key, value in params.items():
-                sql = sql.replace(f":{key}", "?")
-                param_values.append(value)
-        
-        df = pd.read_sql_query(sql, conn, params=param_values if param_values else None)
+        cursor = conn.cursor()
+        # SHOWPLAN_XML must be the only statement in its batch
+        cursor.execute("SET SHOWPLAN_XML ON")
+        cursor.execute(query)
+        plans = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SET SHOWPLAN_XML OFF")
         conn.close()
-        return df.to_dict(orient='records'), None
+        return summarize_plans(plans), None
     except Exception as e:
         conn.close()
         return None, str(e)
 
+def execute_write(query, params=None):
+    """Execute a data-modifying statement, commit, and return its first output row"""
+    conn = get_db_connection()
+    if not conn:
+        return None, "Database connection failed"
+    
+    try:
+        sql, param_values = bind_params(query, params)
+        cursor = conn.cursor()
+        cursor.execute(sql, param_values)
+        row = cursor.fetchone() if cursor.description else None
+        conn.commit()
+        conn.close()
+        return row, None
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return None, str(e)
+
+def execute_many(steps):
+    """Run each (statement, rows of parameters) step in one transaction; returns an error or None"""
+    conn = get_db_connection()
+    if not conn:
+        return "Database connection failed"
+    
+    try:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        for query, rows in steps:
+            if not rows:
+                continue
+            # Binding each name to itself gives the statement's parameter order
+            sql, names = bind_params(query, {name: name for name in rows[0]})
+            cursor.executemany(sql, [[row[name] for name in names] for row in rows])
+        conn.commit()
+        conn.close()
+        return None
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return str(e)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     conn = get_db_connection()
     if conn:
         conn.close()
-        return jsonify({"status": "healthy", "database": "connected"})
+        return jsonify({
+            "status": "healthy",
+            "database": "connected",
+            "cache": query_cache.status(),
+            "live": {"version": live_revenue.version, "as_of": live_revenue.as_of, "last_error": live_revenue.last_error},
+            "archive": archive_catalog.status()
+        })
     return jsonify({"status": "unhealthy", "database": "disconnected"}), 500
 
 @app.route('/api/queries', methods=['GET'])
@@ -82,17 +236,81 @@ def run_query(query_id):
         else:
             return jsonify({"error": f"Missing required parameter: {param}"}), 400
     
-    results, error = execute_query(query_info["query"], params)
+    if request.args.get('locations'):
+        return run_query_across_locations(query_id, query_info, params)
+    
+    profile = None
+    as_of = None
+    if request.args.get('profile') == '1':
+        results, profile, error = execute_profiled_query(query_info["query"], params)
+    elif CACHE_CONFIG['enabled'] and query_id in query_cache.query_ids:
+        # Served from the background snapshot; never blocks on the database
+        results, as_of = query_cache.get(query_id)
+        if results is None:
+            return jsonify({"error": "Results are still being precomputed, retry shortly"}), 503, {"Retry-After": "5"}
+        error = None
+    else:
+        results, error = execute_query(query_info["query"], params)
     
     if error:
         return jsonify({"error": error}), 500
     
-    return jsonify({
+    response = {
         "query_id": query_id,
         "name": query_info["name"],
         "description": query_info["description"],
         "data": results,
         "row_count": len(results)
+    }
+    if as_of:
+        response["as_of"] = as_of
+    if profile:
+        response["profile"] = profile
+    return jsonify(response)
+
+def run_query_across_locations(query_id, query_info, params):
+    """Fan a named query out to location databases and merge the results"""
+    requested = request.args.get('locations')
+    if requested == 'all':
+        locations = list(LOCATIONS)
+    else:
+        locations = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in locations if name not in LOCATIONS]
+    if unknown or not locations:
+        return jsonify({"error": f"Unknown locations: {unknown}", "available": list(LOCATIONS)}), 400
+    
+    df, missing, errors = scatter_gather.run(query_id, params, locations)
+    if len(missing) == len(locations):
+        return jsonify({"error": "No location responded", "errors": errors}), 504
+    
+    return jsonify({
+        "query_id": query_id,
+        "name": query_info["name"],
+        "description": query_info["description"],
+        "locations": [name for name in locations if name not in missing],
+        "missing_locations": missing,
+        "partial": bool(missing),
+        "errors": errors,
+        "data": df.to_dict(orient='records'),
+        "row_count": len(df)
+    })
+
+@app.route('/api/locations', methods=['GET'])
+def list_locations():
+    """List the location databases available for multi-location queries"""
+    return jsonify([
+        {"name": name, "server": target["server"], "database": target["database"]}
+        for name, target in LOCATIONS.items()
+    ])
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """Latest captured plan profiles with regressions against the baseline"""
+    profiles = profile_store.snapshot()
+    return jsonify({
+        "profiling_enabled": PROFILING_CONFIG['enabled'],
+        "data": [dict(profile, query_id=key) for key, profile in profiles.items()],
+        "regressed": sorted(key for key, profile in profiles.items() if profile["regressions"])
     })
 
 @app.route('/api/custom-query', methods=['POST'])
@@ -105,27 +323,113 @@ def custom_query():
     
     query = data['query'].strip()
     
-    # Basic security: only allow SELECT statements
-    if not query.upper().startswith('SELECT'):
-        return jsonify({"error": "Only SELECT queries are allowed"}), 403
-    
-    # Block dangerous keywords
-    dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'TRUNCATE', 'ALTER', 'CREATE', 'EXEC', 'EXECUTE']
-    query_upper = query.upper()
-    for keyword in dangerous_keywords:
-        if keyword in query_upper:
-            return jsonify({"error": f"Query contains forbidden keyword: {keyword}"}), 403
+    # Tokenize and validate the statement, then gate it on its estimated plan
+    decision, error = sql_guard.check(query)
+    if error:
+        status = 400 if decision["action"] == "estimate_failed" else 403
+        return jsonify({"error": error, "estimate": decision}), status
     
-    results, error = execute_query(query)
+    df, error = query_dataframe(
+        query,
+        row_limit=decision["row_limit"],
+        timeout=CUSTOM_QUERY_CONFIG['timeout_seconds']
+    )
     
     if error:
         return jsonify({"error": error}), 500
     
+    # rowversion and other binary columns are not JSON serializable
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda value: isinstance(value, bytes)).any():
+            df[column] = df[column].map(lambda value: "0x" + value.hex() if isinstance(value, bytes) else value)
+    
     return jsonify({
-        "data": results,
-        "row_count": len(results)
+        "data": df.to_dict(orient='records'),
+        "row_count": len(df),
+        "truncated": decision["row_limit"] is not None and len(df) >= decision["row_limit"],
+        "estimate": decision
     })
 
+@app.route('/api/exports', methods=['POST'])
+def create_export():
+    """Start a background export of a custom query or named query to a compressed file"""
+    data = request.get_json()
+    
+    if not data or ('query' not in data and 'query_id' not in data):
+        return jsonify({"error": "query or query_id is required"}), 400
+    
+    fmt = data.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {list(FORMATS)}"}), 400
+    
+    if 'query_id' in data:
+        if data['query_id'] not in QUERIES:
+            return jsonify({"error": "Query not found"}), 404
+        query_info = QUERIES[data['query_id']]
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({"error": "params must be an object"}), 400
+        missing = [param for param in query_info["params"] if param not in params]
+        if missing:
+            return jsonify({"error": f"Missing required parameters: {missing}"}), 400
+        params = {param: params[param] for param in query_info["params"]}
+        # Ranges that reach archived months read the hot and archive tables together
+        query = archive_catalog.route(query_info["query"], range_start(params))
+        name = data.get('name') or data['query_id']
+    else:
+        # Same read-only validation as /api/custom-query; exports are meant for large scans,
+        # so the cost limit does not apply, only the export concurrency limit
+        query = data['query'].strip()
+        _, _, error = normalize(query)
+        if error:
+            return jsonify({"error": error}), 400
+        params = None
+        name = data.get('name') or 'query_results'
+    
+    # Named queries use :name parameters, which the plan estimate cannot bind
+    job = export_jobs.submit(query, params, fmt, name, estimate=params is None)
+    return jsonify(job), 202, {"Location": f"/api/exports/{job['id']}"}
+
+@app.route('/api/exports', methods=['GET'])
+def list_exports():
+    """Queued, running and finished exports that have not expired"""
+    jobs = export_jobs.list()
+    return jsonify({"data": jobs, "row_count": len(jobs), "ttl_seconds": EXPORT_CONFIG['ttl_seconds']})
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+def export_status(job_id):
+    """Progress of one export"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Export not found or expired"}), 404
+    return jsonify(job)
+
+@app.route('/api/exports/<job_id>', methods=['DELETE'])
+def delete_export(job_id):
+    """Cancel a running export or delete a finished one"""
+    if not export_jobs.cancel(job_id):
+        return jsonify({"error": "Export not found or expired"}), 404
+    return jsonify({"id": job_id, "deleted": True})
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+def download_export(job_id):
+    """Serve a finished export; supports Range requests so large downloads can resume"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Export not found or expired"}), 404
+    path = export_jobs.path(job_id)
+    if path is None:
+        return jsonify({"error": f"Export is {job['status']}", "status": job}), 409
+    
+    return send_file(
+        path,
+        mimetype=FORMATS[job["format"]]["mimetype"],
+        as_attachment=True,
+        download_name=job["file_name"],
+        conditional=True,
+        max_age=0
+    )
+
 @app.route('/api/dashboard/summary', methods=['GET'])
 def dashboard_summary():
     """Get summary statistics for dashboard"""
@@ -160,7 +464,519 @@ def dashboard_summary():
     
     return jsonify(summaries)
 
+def format_sse(event):
+    """Encode an event for a text/event-stream response"""
+    return f"id: {event['version']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@app.route('/api/live', methods=['GET'])
+def live_summary():
+    """Today's running revenue, orders per hour and order-type mix"""
+    if not LIVE_CONFIG['enabled']:
+        return jsonify({"error": "Live feed is disabled"}), 404
+    
+    snapshot = live_revenue.snapshot()
+    if snapshot["date"] is None:
+        return jsonify({"error": "Live totals are still loading, retry shortly"}), 503, {"Retry-After": "5"}
+    return jsonify(snapshot)
+
+@app.route('/api/stream/live', methods=['GET'])
+def live_stream():
+    """Stream today's totals, then a delta whenever orders change, as server-sent events"""
+    if not LIVE_CONFIG['enabled']:
+        return jsonify({"error": "Live feed is disabled"}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    
+    def events():
+        snapshot = live_revenue.snapshot()
+        version = last_event_id
+        # Fresh clients, and clients from before a server restart, start from a snapshot
+        if version is None or version > snapshot["version"]:
+            version = snapshot["version"]
+            yield format_sse(snapshot)
+        while True:
+            pending = live_revenue.events_since(version, LIVE_CONFIG['heartbeat_seconds'])
+            if not pending:
+                yield ": keep-alive\n\n"
+                continue
+            for event in pending:
+                yield format_sse(event)
+            version = pending[-1]["version"]
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/api/timeseries', methods=['GET'])
+def timeseries():
+    """Revenue, order count or average ticket between start and end, downsampled to a point budget"""
+    metric = request.args.get('metric', 'revenue')
+    if metric not in METRICS:
+        return jsonify({"error": f"metric must be one of {list(METRICS)}"}), 400
+    
+    start = parse_iso_datetime(request.args.get('start'))
+    end = parse_iso_datetime(request.args.get('end'))
+    if start is None or end is None or end <= start:
+        return jsonify({"error": "start and end (ISO 8601, end after start) are required"}), 400
+    
+    points = request.args.get('points', TIMESERIES_CONFIG['default_points'], type=int)
+    if not 3 <= points <= TIMESERIES_CONFIG['max_points']:
+        return jsonify({"error": f"points must be between 3 and {TIMESERIES_CONFIG['max_points']}"}), 400
+    
+    granularity = request.args.get('granularity', 'auto')
+    if granularity != 'auto' and granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be 'auto' or one of {list(GRANULARITIES)}"}), 400
+    if granularity != 'auto' and bucket_count(start, end, granularity) > TIMESERIES_CONFIG['max_buckets']:
+        return jsonify({"error": f"Too many {granularity} buckets for this range; use a coarser granularity"}), 400
+    
+    method = request.args.get('method', DOWNSAMPLING_METHODS[0])
+    if method not in DOWNSAMPLING_METHODS:
+        return jsonify({"error": f"method must be one of {DOWNSAMPLING_METHODS}"}), 400
+    
+    # Ranges inside the hot window never touch the archive
+    result, error = build_series(
+        lambda query, params: query_dataframe(archive_catalog.route(query, start), params),
+        start, end, metric, points,
+        granularity=None if granularity == 'auto' else granularity,
+        method=method
+    )
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify(dict(result, start=start.isoformat(), end=end.isoformat()))
+
+@app.route('/api/cube', methods=['GET'])
+def sales_cube_query():
+    """Slice and dice order line items by any combination of dimensions"""
+    by = [name for name in request.args.get('by', '').split(',') if name]
+    measures = [name for name in request.args.get('measures', 'revenue,quantity,orders').split(',') if name]
+    unknown = [name for name in by if name not in DIMENSIONS] + [name for name in measures if name not in MEASURES]
+    if unknown or not measures or len(set(by)) != len(by):
+        return jsonify({
+            "error": f"Unknown or repeated dimensions/measures: {unknown or by}",
+            "dimensions": DIMENSIONS,
+            "measures": MEASURES
+        }), 400
+    
+    # Any dimension can be filtered with a comma-separated list of labels, e.g. order_type=Dine-In,Takeout
+    filters = {name: set(request.args[name].split(',')) for name in DIMENSIONS if request.args.get(name)}
+    start = parse_iso_datetime(request.args.get('start')) if request.args.get('start') else None
+    end = parse_iso_datetime(request.args.get('end')) if request.args.get('end') else None
+    if (request.args.get('start') and start is None) or (request.args.get('end') and end is None):
+        return jsonify({"error": "start and end must be ISO 8601 dates"}), 400
+    
+    sort = request.args.get('sort')
+    if sort and sort not in measures:
+        return jsonify({"error": "sort must be one of the requested measures"}), 400
+    
+    df, error = sales_cube.query(by, measures, filters, start, end, sort=sort, limit=request.args.get('limit', type=int))
+    
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify({
+        "by": by,
+        "measures": measures,
+        "filters": {name: sorted(values) for name, values in filters.items()},
+        "memory": sales_cube.memory(),
+        "data": df.to_dict(orient='records'),
+        "row_count": len(df)
+    })
+
+def ensure_rfm_scores():
+    """Refresh RFM scores if due; an error only matters when nothing has been scored yet"""
+    error = rfm_scores.refresh()
+    if error and not rfm_scores.loaded:
+        return error
+    return None
+
+@app.route('/api/rfm/segments', methods=['GET'])
+def rfm_segments():
+    """Customers, share and averages per RFM segment from the precomputed scores"""
+    error = ensure_rfm_scores()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify(dict(rfm_scores.segments(), scored_at=rfm_scores.scored_at))
+
+@app.route('/api/rfm/segments/<segment>', methods=['GET'])
+def rfm_segment_members(segment):
+    """Customers in one RFM segment, highest spend first"""
+    if segment not in SEGMENTS:
+        return jsonify({"error": f"segment must be one of {SEGMENTS}"}), 404
+    
+    error = ensure_rfm_scores()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    df, error = rfm_scores.members(segment, limit=request.args.get('limit', 100, type=int))
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify({
+        "segment": segment,
+        "scored_at": rfm_scores.scored_at,
+        "data": df.to_dict(orient='records'),
+        "row_count": len(df)
+    })
+
+@app.route('/api/rfm/customers/<int:customer_id>', methods=['GET'])
+def rfm_customer(customer_id):
+    """One customer's RFM scores and segment"""
+    error = ensure_rfm_scores()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    scores = rfm_scores.customer(customer_id)
+    if scores is None:
+        return jsonify({"error": "Customer not found or has no paid orders"}), 404
+    return jsonify(dict(scores, scored_at=rfm_scores.scored_at))
+
+def ensure_market_basket():
+    """Count new line items if due; an error only matters when nothing has been counted yet"""
+    error = market_basket.refresh()
+    if error and not market_basket.loaded:
+        return error
+    return None
+
+@app.route('/api/basket/pairs', methods=['GET'])
+def basket_pairs():
+    """Menu items most often ordered together, with support, confidence and lift"""
+    sort = request.args.get('sort', 'lift')
+    if sort not in BASKET_SORTS:
+        return jsonify({"error": f"sort must be one of {BASKET_SORTS}"}), 400
+    
+    error = ensure_market_basket()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    df = market_basket.pairs(
+        sort=sort,
+        min_orders=request.args.get('min_orders', 10, type=int),
+        limit=request.args.get('limit', 50, type=int)
+    )
+    return jsonify(dict(market_basket.summary(), data=df.to_dict(orient='records'), row_count=len(df)))
+
+@app.route('/api/basket/items/<int:menu_item_id>', methods=['GET'])
+def basket_companions(menu_item_id):
+    """Items ordered with one menu item, by attach rate"""
+    error = ensure_market_basket()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    df = market_basket.companions(
+        menu_item_id,
+        min_orders=request.args.get('min_orders', 1, type=int),
+        limit=request.args.get('limit', 20, type=int)
+    )
+    if df is None:
+        return jsonify({"error": "Menu item not found in any order"}), 404
+    return jsonify(dict(market_basket.summary(), menu_item_id=menu_item_id, data=df.to_dict(orient='records'), row_count=len(df)))
+
+@app.route('/api/archive', methods=['GET'])
+def archive_periods():
+    """Archived months with their summary totals, and where the hot tables begin"""
+    status = archive_catalog.status()
+    if status["boundary"] is None:
+        return jsonify(dict(status, data=[], row_count=0))
+    
+    df, error = archive_catalog.periods()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify(dict(status, data=df.to_dict(orient='records'), row_count=len(df)))
+
+@app.route('/api/inventory/forecast', methods=['GET'])
+def inventory_forecast():
+    """Project days to stockout per ingredient from recent consumption velocity"""
+    window = request.args.get('window', VELOCITY_WINDOWS[0], type=int)
+    if window not in VELOCITY_WINDOWS:
+        return jsonify({"error": f"window must be one of {VELOCITY_WINDOWS}"}), 400
+    
+    df, as_of, error = inventory_forecaster.forecast(window)
+    
+    if error:
+        return jsonify({"error": error}), 500
+    
+    return jsonify({
+        "as_of": as_of,
+        "window": window,
+        "data": df.to_dict(orient='records'),
+        "row_count": len(df)
+    })
+
+def parse_iso_datetime(value):
+    """Parse an ISO 8601 timestamp as naive local time, or return None"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # The database stores local times without an offset
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def ensure_availability_index():
+    """Load the reservation index on first use, and reload it when stale"""
+    if availability_index.loaded and not availability_index.stale:
+        return None
+    error = availability_index.load()
+    # A failed reload keeps serving the last index; the database still rejects overlaps
+    if error and not availability_index.loaded:
+        return error
+    return None
+
+@app.route('/api/reservations/availability', methods=['GET'])
+def reservation_availability():
+    """Tables free at a given time for a party size, plus the best-fit table"""
+    start = parse_iso_datetime(request.args.get('datetime'))
+    guests = request.args.get('guests', type=int)
+    if start is None or not guests or guests < 1:
+        return jsonify({"error": "datetime (ISO 8601) and guests (>= 1) are required"}), 400
+    
+    error = ensure_availability_index()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    tables = availability_index.available_tables(start, guests)
+    return jsonify({
+        "datetime": start.isoformat(),
+        "guests": guests,
+        "best_fit": tables[0] if tables else None,
+        "data": tables,
+        "row_count": len(tables)
+    })
+
+@app.route('/api/reservations', methods=['POST'])
+def create_reservation():
+    """Book a table; picks the best-fit table when none is given"""
+    data = request.get_json()
+    
+    if not isinstance(data, dict) or 'customer_id' not in data or 'guests' not in data:
+        return jsonify({"error": "customer_id, guests and datetime are required"}), 400
+    
+    try:
+        customer_id = int(data['customer_id'])
+        guests = int(data['guests'])
+        table_id = int(data['table_id']) if data.get('table_id') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "customer_id, guests and table_id must be integers"}), 400
+    if guests < 1:
+        return jsonify({"error": "guests must be at least 1"}), 400
+    
+    start = parse_iso_datetime(data.get('datetime'))
+    if start is None:
+        return jsonify({"error": "datetime must be ISO 8601"}), 400
+    
+    status = data.get('status', 'Pending')
+    if status not in ACTIVE_STATUSES:
+        return jsonify({"error": f"status must be one of {list(ACTIVE_STATUSES)}"}), 400
+    
+    error = ensure_availability_index()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    # Hold the index lock so two requests cannot book the same slot
+    with availability_index.lock:
+        if table_id:
+            table = availability_index.table(table_id)
+            if table is None:
+                return jsonify({"error": "Table not found"}), 404
+            if table["Capacity"] < guests:
+                return jsonify({"error": "Table is too small for the party"}), 409
+            if not availability_index.is_free(table_id, start):
+                return jsonify({"error": "Table is not available at that time"}), 409
+        else:
+            table = availability_index.best_fit(start, guests)
+            if table is None:
+                return jsonify({"error": "No table available for that party size and time"}), 409
+            table_id = table["TableID"]
+        
+        # The index only knows this process's bookings, so the insert rechecks the slot in the
+        # database; UPDLOCK, HOLDLOCK keeps a concurrent booking out until the commit.
+        # RESERVATIONS has triggers, so OUTPUT must go INTO a table variable (Msg 334)
+        row, error = execute_write("""
+            SET NOCOUNT ON;
+            DECLARE @ids TABLE (ReservationID INT);
+            INSERT INTO RESERVATIONS (CustomerID, TableID, ReservationDateTime, NumGuests, Status)
+            OUTPUT INSERTED.ReservationID INTO @ids
+            SELECT :customer_id, :table_id, :start, :guests, :status
+            WHERE NOT EXISTS (
+                SELECT 1 FROM RESERVATIONS WITH (UPDLOCK, HOLDLOCK)
+                WHERE TableID = :table_id
+                    AND Status IN ('Pending', 'Confirmed')
+                    AND ReservationDateTime > DATEADD(MINUTE, -:slot_minutes, :start)
+                    AND ReservationDateTime < DATEADD(MINUTE, :slot_minutes, :start)
+            );
+            SELECT ReservationID FROM @ids;
+        """, {
+            "customer_id": customer_id,
+            "table_id": table_id,
+            "start": start,
+            "guests": guests,
+            "status": status,
+            "slot_minutes": SLOT_MINUTES
+        })
+        if error:
+            return jsonify({"error": error}), 500
+        if row is None:
+            # Booked by another process since the index was loaded
+            availability_index.load()
+            return jsonify({"error": "Table is not available at that time"}), 409
+        
+        reservation_id = int(row[0])
+        availability_index.add(reservation_id, table_id, start)
+    
+    return jsonify({
+        "reservation_id": reservation_id,
+        "table_id": table_id,
+        "datetime": start.isoformat(),
+        "status": status
+    }), 201
+
+@app.route('/api/reservations/<int:reservation_id>', methods=['PATCH'])
+def update_reservation_status(reservation_id):
+    """Change a reservation's status and keep the availability index in sync"""
+    data = request.get_json()
+    
+    if not isinstance(data, dict) or 'status' not in data:
+        return jsonify({"error": "status is required"}), 400
+    
+    status = data['status']
+    if status not in RESERVATION_STATUSES:
+        return jsonify({"error": f"status must be one of {list(RESERVATION_STATUSES)}"}), 400
+    
+    error = ensure_availability_index()
+    if error:
+        return jsonify({"error": error}), 500
+    
+    # Same lock as booking, so reactivating a reservation cannot double-book its table
+    with availability_index.lock:
+        if status in ACTIVE_STATUSES and not availability_index.contains(reservation_id):
+            current, error = query_dataframe("""
+                SELECT TableID, ReservationDateTime
+                FROM RESERVATIONS
+                WHERE ReservationID = :reservation_id
+            """, {"reservation_id": reservation_id})
+            if error:
+                return jsonify({"error": error}), 500
+            if current.empty:
+                return jsonify({"error": "Reservation not found"}), 404
+            table_id = int(current['TableID'].iloc[0])
+            start = pd.Timestamp(current['ReservationDateTime'].iloc[0]).to_pydatetime()
+            if not availability_index.is_free(table_id, start):
+                return jsonify({"error": "Table is no longer available at that time"}), 409
+        
+        # An active status is only written if no other active reservation overlaps in the database
+        row, error = execute_write("""
+            SET NOCOUNT ON;
+            DECLARE @updated TABLE (TableID INT, ReservationDateTime DATETIME);
+            UPDATE r SET Status = :status
+            OUTPUT INSERTED.TableID, INSERTED.ReservationDateTime INTO @updated
+            FROM RESERVATIONS r
+            WHERE r.ReservationID = :reservation_id
+                AND (:status NOT IN ('Pending', 'Confirmed') OR NOT EXISTS (
+                    SELECT 1 FROM RESERVATIONS o WITH (UPDLOCK, HOLDLOCK)
+                    WHERE o.TableID = r.TableID
+                        AND o.ReservationID <> r.ReservationID
+                        AND o.Status IN ('Pending', 'Confirmed')
+                        AND o.ReservationDateTime > DATEADD(MINUTE, -:slot_minutes, r.ReservationDateTime)
+                        AND o.ReservationDateTime < DATEADD(MINUTE, :slot_minutes, r.ReservationDateTime)
+                ));
+            SELECT TableID, ReservationDateTime FROM @updated;
+        """, {"status": status, "reservation_id": reservation_id, "slot_minutes": SLOT_MINUTES})
+        
+        if error:
+            return jsonify({"error": error}), 500
+        if row is None and status not in ACTIVE_STATUSES:
+            return jsonify({"error": "Reservation not found"}), 404
+        if row is None:
+            exists, error = query_dataframe(
+                "SELECT 1 AS Found FROM RESERVATIONS WHERE ReservationID = :reservation_id",
+                {"reservation_id": reservation_id}
+            )
+            if error:
+                return jsonify({"error": error}), 500
+            if exists.empty:
+                return jsonify({"error": "Reservation not found"}), 404
+            availability_index.load()
+            return jsonify({"error": "Table is no longer available at that time"}), 409
+        
+        if status in ACTIVE_STATUSES:
+            availability_index.add(reservation_id, int(row[0]), row[1])
+        else:
+            availability_index.remove(reservation_id)
+    
+    return jsonify({"reservation_id": reservation_id, "status": status})
+
+# Profiles are keyed by QUERIES id; anything else is recorded as ad hoc
+QUERY_LABELS = {info["query"]: key for key, info in QUERIES.items()}
+profile_store = ProfileStore()
+
+def warm_connection_pool(size):
+    """Open and release connections so the ODBC driver manager pools them"""
+    connections = [get_db_connection() for _ in range(size)]
+    for conn in connections:
+        if conn:
+            conn.close()
+
+# Workers start once per process, however the app is served
+workers_lock = threading.Lock()
+workers_started = False
+
+@app.before_request
+def ensure_background_workers():
+    """Start the background workers on the first request (flask run, gunicorn, any WSGI server)"""
+    global workers_started
+    if workers_started:
+        return
+    with workers_lock:
+        if workers_started:
+            return
+        workers_started = True
+    # Initial loads can take a while; the first request does not wait for them
+    threading.Thread(target=start_background_workers, name="start-workers", daemon=True).start()
+
+def start_background_workers():
+    """Warm connections and start in-process indexes and precomputation"""
+    warm_connection_pool(CACHE_CONFIG['warm_connections'])
+    error = availability_index.load()
+    if error:
+        print(f"Reservation index not loaded yet: {error}")
+    error = sales_cube.refresh(force=True)
+    if error:
+        print(f"Sales cube not loaded yet: {error}")
+    error = rfm_scores.refresh(force=True)
+    if error:
+        print(f"RFM scores not loaded yet: {error}")
+    error = market_basket.refresh(force=True)
+    if error:
+        print(f"Market basket not loaded yet: {error}")
+    if CACHE_CONFIG['enabled']:
+        query_cache.start()
+    if LIVE_CONFIG['enabled']:
+        live_revenue.start()
+    export_jobs.start()
+
+# Background engines share the API's database access
+inventory_forecaster = InventoryForecaster(query_dataframe)
+availability_index = AvailabilityIndex(query_dataframe)
+query_cache = QueryCache(execute_query, QUERIES)
+sql_guard = SqlGuard(estimate_query_plan)
+scatter_gather = ScatterGather(query_dataframe, LOCATIONS, SHARD_TIMEOUT_SECONDS)
+live_revenue = LiveRevenue(query_dataframe)
+archive_catalog = ArchiveCatalog(query_dataframe)
+sales_cube = SalesCube(history_dataframe)
+rfm_scores = RfmScorer(history_dataframe, execute_many)
+market_basket = MarketBasket(history_dataframe)
+export_jobs = ExportJobs(open_cursor, estimate_query_plan)
+
 if __name__ == '__main__':
     print("Starting Flask API server...")
+    # With the debug reloader, only the serving child process runs workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        workers_started = True
+        start_background_workers()
     print("API available at: http://localhost:5000")
     app.run(debug=True, port=5000)
@@ -0,0 +1,148 @@
+"""
+Inventory depletion forecasting from recipe usage and sales velocity
+"""
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# Sliding windows (in days) used to measure consumption velocity
+VELOCITY_WINDOWS = [7, 14, 28]
+
+# Minimum number of seconds between two incremental refreshes
+REFRESH_INTERVAL_SECONDS = 300
+
+# Items projected to run out within this many days are flagged for reorder
+REORDER_HORIZON_DAYS = 7
+
+# Stockout dates further out than this are not projected (slow movers would overflow dates)
+PROJECTION_HORIZON_DAYS = 365
+
+LAST_USAGE_DATE_QUERY = """
+    SELECT CAST(MAX(OrderDateTime) AS DATE) AS LastUsageDate
+    FROM ORDERS
+"""
+
+DAILY_USAGE_QUERY = """
+    SELECT
+        CAST(o.OrderDateTime AS DATE) AS UsageDate,
+        ri.InventoryID,
+        SUM(oi.Quantity * ri.QuantityRequired) AS QuantityUsed
+    FROM ORDERITEMS oi
+    JOIN ORDERS o ON oi.OrderID = o.OrderID
+    JOIN RECIPE_INGREDIENTS ri ON oi.MenuItemID = ri.MenuItemID
+    WHERE o.OrderDateTime >= :since
+    GROUP BY CAST(o.OrderDateTime AS DATE), ri.InventoryID
+"""
+
+STOCK_QUERY = """
+    SELECT InventoryID, Name AS Item, Quantity AS CurrentStock, Unit, ReorderLevel
+    FROM INVENTORYITEMS
+"""
+
+
+class InventoryForecaster:
+    """Keeps daily ingredient usage in memory and projects days to stockout"""
+
+    def __init__(self, fetch_dataframe):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self._lock = threading.Lock()
+        # Daily usage: index = day, columns = InventoryID
+        self._daily = pd.DataFrame(index=pd.DatetimeIndex([]), dtype=float)
+        self._last_refresh = 0.0
+
+    def refresh(self, force=False):
+        """Pull daily usage for days not yet aggregated; returns an error or None"""
+        with self._lock:
+            if not force and time.time() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return None
+
+            if self._daily.empty:
+                df, error = self._fetch(LAST_USAGE_DATE_QUERY, None)
+                if error:
+                    return error
+                last_day = df['LastUsageDate'].iloc[0] if not df.empty else None
+                if last_day is None or pd.isna(last_day):
+                    self._last_refresh = time.time()
+                    return None
+                since = pd.Timestamp(last_day) - timedelta(days=max(VELOCITY_WINDOWS) - 1)
+            else:
+                # The most recent day may have been partial, so it is reloaded
+                since = self._daily.index.max()
+
+            df, error = self._fetch(DAILY_USAGE_QUERY, {"since": since.strftime("%Y-%m-%d")})
+            if error:
+                return error
+
+            if not df.empty:
+                df['UsageDate'] = pd.to_datetime(df['UsageDate'])
+                df['QuantityUsed'] = df['QuantityUsed'].astype(float)
+                new_days = df.pivot_table(
+                    index='UsageDate', columns='InventoryID',
+                    values='QuantityUsed', aggfunc='sum'
+                ).astype(float)
+                kept = self._daily[self._daily.index < since]
+                daily = pd.concat([kept, new_days]).fillna(0.0).sort_index()
+                # Only the longest window is ever needed
+                cutoff = daily.index.max() - timedelta(days=max(VELOCITY_WINDOWS) - 1)
+                self._daily = daily[daily.index >= cutoff]
+
+            self._last_refresh = time.time()
+            return None
+
+    def forecast(self, window=VELOCITY_WINDOWS[0]):
+        """Return per-ingredient velocity and projected stockout as a DataFrame"""
+        error = self.refresh()
+        if error:
+            return None, None, error
+
+        stock, error = self._fetch(STOCK_QUERY, None)
+        if error:
+            return None, None, error
+
+        with self._lock:
+            daily = self._daily.copy()
+
+        if daily.empty:
+            as_of = pd.Timestamp.today().normalize()
+        else:
+            as_of = daily.index.max()
+        horizon = pd.date_range(end=as_of, periods=max(VELOCITY_WINDOWS), freq='D')
+        usage = daily.reindex(index=horizon, columns=stock['InventoryID'], fill_value=0.0)
+        usage = usage.fillna(0.0).to_numpy()
+
+        # Sum each trailing window in one pass via a reversed cumulative sum
+        trailing = np.cumsum(usage[::-1], axis=0)
+        for w in VELOCITY_WINDOWS:
+            stock[f'Velocity{w}d'] = np.round(trailing[w - 1] / w, 3)
+
+        velocity = stock[f'Velocity{window}d'].to_numpy()
+        on_hand = stock['CurrentStock'].to_numpy(dtype=float)
+        above_reorder = (on_hand - stock['ReorderLevel'].to_numpy(dtype=float)).clip(min=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_left = np.where(velocity > 0, on_hand / velocity, np.nan)
+            days_to_reorder = np.where(velocity > 0, above_reorder / velocity, np.nan)
+
+        stock['DaysToStockout'] = np.round(days_left, 1)
+        stock['DaysToReorderLevel'] = np.round(days_to_reorder, 1)
+        stock['ProjectedStockoutDate'] = [
+            (as_of + timedelta(days=int(d))).strftime('%Y-%m-%d') if d <= PROJECTION_HORIZON_DAYS else None
+            for d in days_left
+        ]
+        stock['ForecastStatus'] = np.select(
+            [
+                on_hand <= 0,
+                on_hand <= stock['ReorderLevel'].to_numpy(),
+                days_left <= REORDER_HORIZON_DAYS,
+            ],
+            ['OUT OF STOCK', 'BELOW REORDER LEVEL', 'REORDER SOON'],
+            default='OK'
+        )
+
+        stock = stock.sort_values('DaysToStockout', na_position='last')
+        # NaN is not valid JSON
+        stock = stock.astype(object).where(stock.notna(), None)
+        return stock, as_of.strftime('%Y-%m-%d'), None
@@ -0,0 +1,215 @@
+"""
+Live aggregates for today's orders, maintained from ORDERS.RowVer change polling
+"""
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from config import LIVE_CONFIG
+
+ORDER_TYPES = ['Dine-In', 'Takeout', 'Delivery']
+
+# Rows at or above MIN_ACTIVE_ROWVERSION() may belong to uncommitted transactions;
+# they are picked up by the next poll
+UPPER_BOUND_QUERY = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) AS UpperBound"
+
+TODAY_QUERY = """
+    SELECT OrderID, OrderType, TotalAmount, OrderDateTime, PaymentStatus,
+        CAST(RowVer AS BIGINT) AS RowVer
+    FROM ORDERS
+    WHERE OrderDateTime >= :day_start AND OrderDateTime < :day_end
+        AND RowVer < CAST(:upper AS BINARY(8))
+"""
+
+# Seeks IX_ORDERS_RowVer, so each poll reads only orders inserted or updated since the last one
+CHANGES_QUERY = """
+    SELECT OrderID, OrderType, TotalAmount, OrderDateTime, PaymentStatus,
+        CAST(RowVer AS BIGINT) AS RowVer
+    FROM ORDERS
+    WHERE RowVer >= CAST(:since AS BINARY(8))
+        AND RowVer < CAST(:upper AS BINARY(8))
+"""
+
+
+class LiveRevenue:
+    """Running totals for today's orders, updated by applying changed rows as deltas
+
+    Deleted orders are not seen by row-version polling; they drop out at the next day rollover.
+    """
+
+    def __init__(self, fetch_dataframe):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self._condition = threading.Condition()
+        self._orders = {}  # OrderID -> (hour, order type, amount, paid)
+        self._day = None
+        self._since = None
+        self._revenue = 0.0
+        self._paid_orders = 0
+        self._hourly = [0] * 24
+        self._types = dict.fromkeys(ORDER_TYPES, 0)
+        self._events = deque(maxlen=LIVE_CONFIG['history'])
+        self.version = 0
+        self.as_of = None
+        self.last_error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _upper_bound(self):
+        df, error = self._fetch(UPPER_BOUND_QUERY, None)
+        if error:
+            raise RuntimeError(error)
+        return int(df["UpperBound"].iloc[0])
+
+    def _apply(self, entry, sign):
+        hour, order_type, amount, paid = entry
+        self._hourly[hour] += sign
+        self._types[order_type] = self._types.get(order_type, 0) + sign
+        if paid:
+            self._revenue += sign * amount
+            self._paid_orders += sign
+
+    def _snapshot_locked(self):
+        return {
+            "type": "snapshot",
+            "version": self.version,
+            "as_of": self.as_of,
+            "date": self._day.isoformat() if self._day else None,
+            "revenue": round(self._revenue, 2),
+            "paid_orders": self._paid_orders,
+            "orders": len(self._orders),
+            "orders_per_hour": list(self._hourly),
+            "order_types": dict(self._types),
+        }
+
+    def snapshot(self):
+        """Current totals for today"""
+        with self._condition:
+            return self._snapshot_locked()
+
+    def reload(self, now=None):
+        """Rebuild today's totals from scratch (startup and day rollover)"""
+        now = now or datetime.now()
+        day = now.date()
+        upper = self._upper_bound()
+        day_start = datetime.combine(day, datetime.min.time())
+        df, error = self._fetch(TODAY_QUERY, {
+            "day_start": day_start,
+            "day_end": day_start + timedelta(days=1),
+            "upper": upper,
+        })
+        if error:
+            raise RuntimeError(error)
+
+        with self._condition:
+            self._day = day
+            self._since = upper
+            self._orders = {}
+            self._revenue = 0.0
+            self._paid_orders = 0
+            self._hourly = [0] * 24
+            self._types = dict.fromkeys(ORDER_TYPES, 0)
+            for row in df.itertuples(index=False):
+                entry = (row.OrderDateTime.hour, row.OrderType, float(row.TotalAmount), row.PaymentStatus == 'Paid')
+                self._orders[int(row.OrderID)] = entry
+                self._apply(entry, 1)
+            self.version += 1
+            self.as_of = now.isoformat(timespec='seconds')
+            self._events.clear()
+            self._events.append(self._snapshot_locked())
+            self._condition.notify_all()
+
+    def poll(self, now=None):
+        """Apply orders changed since the last poll; returns the delta event or None"""
+        now = now or datetime.now()
+        if self._day != now.date():
+            self.reload(now)
+            return None
+
+        upper = self._upper_bound()
+        if upper <= self._since:
+            return None
+        df, error = self._fetch(CHANGES_QUERY, {"since": self._since, "upper": upper})
+        if error:
+            raise RuntimeError(error)
+
+        with self._condition:
+            self._since = upper
+            if df.empty:
+                return None
+
+            revenue_before = self._revenue
+            hours = set()
+            types = set()
+            changed = 0
+            for row in df.itertuples(index=False):
+                order_id = int(row.OrderID)
+                old = self._orders.pop(order_id, None)
+                if old:
+                    self._apply(old, -1)
+                    hours.add(old[0])
+                    types.add(old[1])
+                if row.OrderDateTime.date() == self._day:
+                    entry = (row.OrderDateTime.hour, row.OrderType, float(row.TotalAmount), row.PaymentStatus == 'Paid')
+                    self._orders[order_id] = entry
+                    self._apply(entry, 1)
+                    hours.add(entry[0])
+                    types.add(entry[1])
+                if old or row.OrderDateTime.date() == self._day:
+                    changed += 1
+            if not changed:
+                return None
+
+            # Deltas carry new values for the changed keys only, so applying one twice is harmless
+            self.version += 1
+            self.as_of = now.isoformat(timespec='seconds')
+            event = {
+                "type": "delta",
+                "version": self.version,
+                "as_of": self.as_of,
+                "changed_orders": changed,
+                "revenue": round(self._revenue, 2),
+                "revenue_change": round(self._revenue - revenue_before, 2),
+                "paid_orders": self._paid_orders,
+                "orders": len(self._orders),
+                "orders_per_hour": {hour: self._hourly[hour] for hour in sorted(hours)},
+                "order_types": {order_type: self._types[order_type] for order_type in sorted(types)},
+            }
+            self._events.append(event)
+            self._condition.notify_all()
+            return event
+
+    def events_since(self, version, timeout):
+        """Wait up to timeout for events after version; a snapshot replaces a gap in history"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version or self._stop.is_set(), timeout)
+            if self.version <= version:
+                return []
+            pending = [event for event in self._events if event["version"] > version]
+            if not pending or pending[0]["version"] != version + 1:
+                return [self._snapshot_locked()]
+            return pending
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._day is None:
+                    self.reload()
+                else:
+                    self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(LIVE_CONFIG['poll_seconds'])
+
+    def start(self):
+        """Start the background poller (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-revenue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
@@ -0,0 +1,333 @@
+"""
+Market-basket co-occurrence: how often menu items are ordered together, with support, confidence and lift
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Minimum number of seconds between two incremental refreshes
+REFRESH_INTERVAL_SECONDS = 60
+
+# Line items read per round trip; the first load streams the whole table in batches this size
+BATCH_ROWS = 200_000
+
+SORTS = ['lift', 'support', 'confidence', 'orders']
+
+UPPER_BOUND_QUERY = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) AS UpperBound"
+
+# Next batch of paid line items in insertion order; a seek on the ORDERITEMS primary key.
+# Baskets count paid orders only, like menu_item_performance and top_menu_items_daily.
+LINES_QUERY = """
+    SELECT TOP (:batch_rows) oi.OrderItemID, oi.OrderID, oi.MenuItemID
+    FROM ORDERITEMS oi
+    JOIN ORDERS o ON oi.OrderID = o.OrderID
+    WHERE oi.OrderItemID > :last_item_id
+        AND o.PaymentStatus = 'Paid'
+    ORDER BY oi.OrderItemID
+"""
+
+# Earlier items of paid orders that gained lines in the batch (IX on ORDERITEMS.OrderID)
+PRIOR_ITEMS_QUERY = """
+    SELECT DISTINCT oi.OrderID, oi.MenuItemID
+    FROM ORDERITEMS oi
+    JOIN ORDERS o ON oi.OrderID = o.OrderID
+    WHERE oi.OrderID IN (
+            SELECT OrderID FROM ORDERITEMS
+            WHERE OrderItemID > :last_item_id AND OrderItemID <= :batch_last_id
+        )
+        AND oi.OrderItemID <= :last_item_id
+        AND o.PaymentStatus = 'Paid'
+"""
+
+# Already read items of orders updated since the last refresh, so orders paid or refunded
+# after their lines were read are added or taken out (seeks IX_ORDERS_RowVer)
+CHANGED_ITEMS_QUERY = """
+    SELECT DISTINCT oi.OrderID, oi.MenuItemID, o.PaymentStatus
+    FROM ORDERS o
+    JOIN ORDERITEMS oi ON oi.OrderID = o.OrderID
+    WHERE o.RowVer >= CAST(:since AS BINARY(8))
+        AND o.RowVer < CAST(:upper AS BINARY(8))
+        AND oi.OrderItemID <= :last_item_id
+"""
+
+ITEMS_QUERY = "SELECT MenuItemID, Name AS Item FROM MENUITEMS"
+
+
+def pair_keys(first, second):
+    """One int64 key per unordered pair of MenuItemIDs, smaller ID in the high half"""
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    return (low.astype(np.int64) << 32) | high.astype(np.int64)
+
+
+def unpack_keys(keys):
+    return (keys >> 32).astype(np.int64), (keys & 0xFFFFFFFF).astype(np.int64)
+
+
+def basket_pairs(order_ids, item_ids, is_new):
+    """Pair keys gained by the baskets: every pair of distinct items in an order with at least one new item.
+
+    Rows must be sorted by order and hold each (order, item) once. Baskets are small, so pairing
+    row i with row i + d for d = 1, 2, ... until no order is that long stays linear in the rows.
+    """
+    keys = []
+    for d in range(1, len(order_ids)):
+        same = order_ids[d:] == order_ids[:-d]
+        if not same.any():
+            break
+        same &= is_new[d:] | is_new[:-d]
+        keys.append(pair_keys(item_ids[:-d][same], item_ids[d:][same]))
+    return np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+
+
+class SparseCounts:
+    """Counts by int64 key, kept as sorted key and count arrays (a COO sparse matrix for pairs)"""
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, keys, weight=1):
+        """Count each key once per occurrence (weight=-1 takes them out again)"""
+        if not len(keys):
+            return
+        merged, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        weights = np.concatenate((self.counts, np.full(len(keys), weight, dtype=np.int64)))
+        counts = np.bincount(inverse, weights=weights, minlength=len(merged)).astype(np.int64)
+        keep = counts != 0
+        # Readers take both arrays under the owner's lock, so they never see a mismatched pair
+        self.keys, self.counts = merged[keep], counts[keep]
+
+    def snapshot(self):
+        """A copy sharing the current arrays; add() replaces rather than modifies them"""
+        copy = SparseCounts()
+        copy.keys, copy.counts = self.keys, self.counts
+        return copy
+
+    def lookup(self, keys):
+        """Counts for keys, 0 where a key was never seen"""
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.counts[positions], 0)
+
+
+class MarketBasket:
+    """Item and item-pair basket counts, updated from new line items without rereading old orders"""
+
+    def __init__(self, fetch_dataframe):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self._lock = threading.Lock()
+        self._items = SparseCounts()   # MenuItemID -> orders containing it
+        self._pairs = SparseCounts()   # pair key -> orders containing both items
+        self._orders = 0
+        self._counted = np.zeros(0, dtype=np.int64)   # sorted IDs of the orders in the counts
+        self._last_item_id = 0
+        self._max_order_id = 0
+        self._since = None
+        self._names = {}
+        self._last_refresh = 0.0
+        self.loaded = False
+        self.updated_at = None
+
+    def refresh(self, force=False):
+        """Count line items added since the last refresh, batch by batch; returns an error or None"""
+        with self._lock:
+            if not force and time.time() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return None
+
+            upper, error = self._upper_bound()
+            if error:
+                return error
+            # Before new lines, so a refunded order's later lines are never taken out uncounted
+            if self._since is not None and upper > self._since:
+                error = self._apply_order_changes(upper)
+                if error:
+                    return error
+
+            while True:
+                lines, error = self._fetch(LINES_QUERY, {"batch_rows": BATCH_ROWS, "last_item_id": self._last_item_id})
+                if error:
+                    return error
+                if lines.empty:
+                    break
+                error = self._add_batch(lines)
+                if error:
+                    return error
+                if len(lines) < BATCH_ROWS:
+                    break
+
+            if not self._names or set(self._items.keys.tolist()) - set(self._names):
+                items, error = self._fetch(ITEMS_QUERY, None)
+                if error:
+                    return error
+                self._names = dict(zip(items['MenuItemID'].astype(int), items['Item']))
+
+            self._since = upper
+            self.loaded = True
+            self._last_refresh = time.time()
+            self.updated_at = datetime.now().isoformat(timespec='seconds')
+            return None
+
+    def _upper_bound(self):
+        df, error = self._fetch(UPPER_BOUND_QUERY, None)
+        if error:
+            return None, error
+        return int(df['UpperBound'].iloc[0]), None
+
+    def _apply_order_changes(self, upper):
+        """Add orders that became paid and take out orders no longer paid, from their counted lines"""
+        changed, error = self._fetch(CHANGED_ITEMS_QUERY, {
+            "since": self._since, "upper": upper, "last_item_id": self._last_item_id
+        })
+        if error:
+            return error
+        if changed.empty:
+            return None
+
+        order_ids = changed['OrderID'].to_numpy(dtype=np.int64)
+        paid = changed['PaymentStatus'].to_numpy(dtype=str) == 'Paid'
+        counted = np.isin(order_ids, self._counted)
+        for weight, rows in ((1, paid & ~counted), (-1, ~paid & counted)):
+            if not rows.any():
+                continue
+            baskets = pd.DataFrame({"OrderID": order_ids[rows], "MenuItemID": changed['MenuItemID'].to_numpy(dtype=np.int64)[rows]})
+            baskets = baskets.drop_duplicates().sort_values('OrderID', kind='stable')
+            basket_orders = baskets['OrderID'].to_numpy()
+            basket_items = baskets['MenuItemID'].to_numpy()
+            self._items.add(basket_items, weight)
+            self._pairs.add(basket_pairs(basket_orders, basket_items, np.ones(len(baskets), dtype=bool)), weight)
+            orders = np.unique(basket_orders)
+            self._orders += weight * len(orders)
+            if weight > 0:
+                self._count_orders(orders)
+            else:
+                self._counted = np.setdiff1d(self._counted, orders, assume_unique=True)
+        return None
+
+    def _count_orders(self, order_ids):
+        """Add sorted, not yet counted order IDs to the counted set"""
+        if not len(order_ids):
+            return
+        if not len(self._counted) or order_ids[0] > self._counted[-1]:
+            # New orders arrive in ID order, so the streaming pass only ever appends
+            self._counted = np.concatenate((self._counted, order_ids))
+        else:
+            self._counted = np.union1d(self._counted, order_ids)
+
+    def _add_batch(self, lines):
+        order_ids = lines['OrderID'].to_numpy(dtype=np.int64)
+        item_ids = lines['MenuItemID'].to_numpy(dtype=np.int64)
+        batch_last_id = int(lines['OrderItemID'].max())
+
+        # Orders that may already have counted lines: only those at or below the highest order seen
+        prior = None
+        if (order_ids <= self._max_order_id).any():
+            prior, error = self._fetch(PRIOR_ITEMS_QUERY, {
+                "last_item_id": self._last_item_id, "batch_last_id": batch_last_id
+            })
+            if error:
+                return error
+
+        new = pd.DataFrame({"OrderID": order_ids, "MenuItemID": item_ids, "New": True}).drop_duplicates(['OrderID', 'MenuItemID'])
+        if prior is not None and not prior.empty:
+            prior_orders = prior['OrderID'].to_numpy(dtype=np.int64)
+            old = pd.DataFrame({
+                "OrderID": prior_orders,
+                "MenuItemID": prior['MenuItemID'].to_numpy(dtype=np.int64),
+                # Earlier lines of an order paid since the last change check were never counted
+                "New": ~np.isin(prior_orders, self._counted)
+            })
+            # Old rows come first, so a repeated item keeps its counted row
+            baskets = pd.concat((old, new)).drop_duplicates(['OrderID', 'MenuItemID'])
+        else:
+            baskets = new
+        baskets = baskets.sort_values('OrderID', kind='stable')
+        batch_orders = np.unique(order_ids)
+        added = batch_orders[~np.isin(batch_orders, self._counted)]
+        self._orders += len(added)
+        self._count_orders(added)
+
+        basket_orders = baskets['OrderID'].to_numpy()
+        basket_items = baskets['MenuItemID'].to_numpy()
+        is_new = baskets['New'].to_numpy(dtype=bool)
+        self._items.add(basket_items[is_new])
+        self._pairs.add(basket_pairs(basket_orders, basket_items, is_new))
+
+        self._last_item_id = batch_last_id
+        self._max_order_id = max(self._max_order_id, int(order_ids.max()))
+        return None
+
+    def _snapshot(self):
+        """Counts as of the last completed batch; readers compute on this, never on the live arrays"""
+        with self._lock:
+            return {
+                "items": self._items.snapshot(),
+                "pairs": self._pairs.snapshot(),
+                "orders": self._orders,
+                "names": self._names,
+                "updated_at": self.updated_at,
+            }
+
+    def _rules(self, state, first, second, together):
+        """Support, both confidences and lift for item pairs (first, second) seen together"""
+        first_orders = state['items'].lookup(first)
+        second_orders = state['items'].lookup(second)
+        names = state['names']
+        orders = state['orders']
+        df = pd.DataFrame({
+            "item_id": first,
+            "item": [names.get(int(item_id), f"Item {item_id}") for item_id in first],
+            "with_item_id": second,
+            "with_item": [names.get(int(item_id), f"Item {item_id}") for item_id in second],
+            "orders": together,
+            "support": together / orders,
+            # Attach rate: share of orders with the first item that also have the second
+            "confidence": together / first_orders,
+            "reverse_confidence": together / second_orders,
+            "lift": together * orders / (first_orders * second_orders),
+        })
+        return df.round({"support": 5, "confidence": 4, "reverse_confidence": 4, "lift": 3})
+
+    def pairs(self, sort='lift', min_orders=1, limit=None):
+        """Item pairs ordered together at least min_orders times, best first; DataFrame"""
+        state = self._snapshot()
+        counts = state['pairs'].counts
+        keep = counts >= min_orders
+        first, second = unpack_keys(state['pairs'].keys[keep])
+        together = counts[keep]
+        # Lead with the less common item, so confidence is the stronger direction of the pair
+        flip = state['items'].lookup(second) < state['items'].lookup(first)
+        first, second = np.where(flip, second, first), np.where(flip, first, second)
+        df = self._rules(state, first, second, together)
+        df = df.sort_values([sort] if sort == 'orders' else [sort, 'orders'], ascending=False, kind='stable')
+        return df.head(limit) if limit else df
+
+    def companions(self, menu_item_id, min_orders=1, limit=None):
+        """Items ordered with one item, by attach rate; None if the item was never ordered"""
+        state = self._snapshot()
+        if not state['items'].lookup(np.array([menu_item_id], dtype=np.int64))[0]:
+            return None
+        first, second = unpack_keys(state['pairs'].keys)
+        counts = state['pairs'].counts
+        involved = ((first == menu_item_id) | (second == menu_item_id)) & (counts >= min_orders)
+        other = np.where(first[involved] == menu_item_id, second[involved], first[involved])
+        df = self._rules(state, np.full(len(other), menu_item_id, dtype=np.int64), other, counts[involved])
+        df = df.sort_values(['confidence', 'lift'], ascending=False, kind='stable')
+        return df.head(limit) if limit else df
+
+    def summary(self):
+        state = self._snapshot()
+        return {
+            "orders": state['orders'],
+            "items": len(state['items']),
+            "pairs": len(state['pairs']),
+            "matrix_bytes": int(state['pairs'].keys.nbytes + state['pairs'].counts.nbytes),
+            "updated_at": state['updated_at'],
+        }
@@ -114,7 +114,8 @@ QUERIES = {
                 SUM(CASE WHEN OrderType = 'Takeout' THEN 1 ELSE 0 END) AS TakeoutOrders,
                 SUM(CASE WHEN OrderType = 'Delivery' THEN 1 ELSE 0 END) AS DeliveryOrders
             FROM ORDERS
-            WHERE YEAR(OrderDateTime) = :year
+            WHERE OrderDateTime >= DATEFROMPARTS(:year, 1, 1)
+                AND OrderDateTime < DATEFROMPARTS(:year + 1, 1, 1)
                 AND PaymentStatus = 'Paid'
             GROUP BY MONTH(OrderDateTime), DATENAME(MONTH, OrderDateTime)
             ORDER BY MONTH(OrderDateTime)
@@ -218,7 +219,7 @@ QUERIES = {
                 AVG(CAST(r.NumGuests AS FLOAT)) AS AvgGuestsPerReservation,
                 AVG(CAST(r.NumGuests AS FLOAT)) / t.Capacity * 100 AS UtilizationRate,
                 COUNT(DISTINCT CASE WHEN r.Status = 'Completed' THEN r.ReservationID END) AS CompletedReservations,
-                COUNT(DISTINCT CASE WHEN r.Status = 'No-Show' THEN r.ReservationID END) AS NoShows
+                COUNT(DISTINCT CASE WHEN r.Status = 'Canceled' THEN r.ReservationID END) AS CanceledReservations
             FROM TABLES t
             LEFT JOIN RESERVATIONS r ON t.TableID = r.TableID
             GROUP BY t.TableNumber, t.Capacity
@@ -226,6 +227,69 @@ QUERIES = {
         "params": []
     },
     
+    "table_utilization_range": {
+        "name": "Table Utilization (Date Range)",
+        "description": "Seatings, turnover and occupancy per table between two dates, from precomputed hourly occupancy",
+        "query": """
+            SELECT 
+                t.TableNumber,
+                t.Capacity,
+                ISNULL(SUM(h.Reservations), 0) AS TotalReservations,
+                ISNULL(SUM(h.Completed), 0) AS CompletedReservations,
+                ISNULL(SUM(h.Canceled), 0) AS Canceled,
+                CAST(SUM(h.Guests) AS FLOAT) / NULLIF(SUM(h.Reservations - h.Canceled), 0) AS AvgGuestsPerReservation,
+                CAST(SUM(h.Guests) AS FLOAT) / NULLIF(SUM(h.Reservations - h.Canceled) * t.Capacity, 0) * 100 AS UtilizationRate,
+                ISNULL(SUM(h.OccupiedSlots), 0) AS OccupiedHours,
+                CAST(ISNULL(SUM(h.Reservations - h.Canceled), 0) AS FLOAT)
+                    / (DATEDIFF(DAY, :start_date, :end_date) + 1) AS TurnoverPerDay
+            FROM TABLES t
+            LEFT JOIN TableOccupancyHourly h ON t.TableID = h.TableID
+                AND h.SlotStart >= :start_date
+                AND h.SlotStart < DATEADD(DAY, 1, CAST(:end_date AS DATE))
+            GROUP BY t.TableNumber, t.Capacity
+            ORDER BY t.TableNumber
+        """,
+        "params": ["start_date", "end_date"]
+    },
+    
+    "table_occupancy_heatmap": {
+        "name": "Table Occupancy Heatmap",
+        "description": "Average share of tables occupied by weekday and hour between two dates",
+        "query": """
+            WITH Slots AS (
+                SELECT 
+                    DATENAME(WEEKDAY, SlotStart) AS DayOfWeek,
+                    DATEPART(WEEKDAY, SlotStart) AS DayNumber,
+                    DATEPART(HOUR, SlotStart) AS Hour,
+                    SUM(OccupiedSlots) AS OccupiedTableHours,
+                    -- Same weekday for every slot in the group: 0 = the weekday of start_date
+                    MIN(DATEDIFF(DAY, :start_date, SlotStart) % 7) AS WeekdayOffset
+                FROM TableOccupancyHourly
+                WHERE SlotStart >= :start_date
+                    AND SlotStart < DATEADD(DAY, 1, CAST(:end_date AS DATE))
+                GROUP BY DATENAME(WEEKDAY, SlotStart), DATEPART(WEEKDAY, SlotStart), DATEPART(HOUR, SlotStart)
+            ),
+            -- Every occurrence of the weekday in the range counts, including days without bookings
+            Calendar AS (
+                SELECT *,
+                    (DATEDIFF(DAY, :start_date, :end_date) + 1) / 7
+                        + CASE WHEN WeekdayOffset < (DATEDIFF(DAY, :start_date, :end_date) + 1) % 7 THEN 1 ELSE 0 END AS Days
+                FROM Slots
+            )
+            SELECT 
+                DayOfWeek,
+                DayNumber,
+                Hour,
+                OccupiedTableHours,
+                Days,
+                CAST(OccupiedTableHours AS FLOAT) / NULLIF(Days, 0) AS AvgOccupiedTables,
+                CAST(OccupiedTableHours AS FLOAT) / NULLIF(Days * (SELECT COUNT(*) FROM TABLES), 0) * 100 AS OccupancyRate
+            FROM Calendar
+            ORDER BY DayNumber, Hour
+        """,
+        "params": ["start_date", "end_date"]
+    },
+    
     "customer_retention": {
         "name": "Customer Retention Rate",
         "description": "Monthly customer retention metrics",
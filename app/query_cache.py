@@ -0,0 +1,108 @@
+"""
+Background precomputation of parameterless dashboard queries
+"""
+import threading
+import time
+from datetime import datetime
+
+from config import CACHE_CONFIG
+
+# Cheap change detector: every lookup is a seek on a clustered primary key or on
+# IX_ORDERS_RowVer, which moves on in-place order updates such as payment status changes
+WATERMARK_QUERY = """
+    SELECT
+        (SELECT MAX(OrderID) FROM ORDERS) AS MaxOrderID,
+        (SELECT CAST(MAX(RowVer) AS BIGINT) FROM ORDERS) AS MaxOrderRowVer,
+        (SELECT MAX(OrderItemID) FROM ORDERITEMS) AS MaxOrderItemID,
+        (SELECT MAX(ReservationID) FROM RESERVATIONS) AS MaxReservationID,
+        (SELECT MAX(CustomerID) FROM CUSTOMERS) AS MaxCustomerID,
+        (SELECT MAX(StaffID) FROM STAFF) AS MaxStaffID,
+        (SELECT MAX(MenuItemID) FROM MENUITEMS) AS MaxMenuItemID
+"""
+
+
+class QueryCache:
+    """Keeps a consistent snapshot of every parameterless query, refreshed in the background"""
+
+    def __init__(self, execute_query, queries):
+        # execute_query(query, params) -> (records, error)
+        self._execute = execute_query
+        self._queries = {key: info for key, info in queries.items() if not info["params"]}
+        self._snapshot = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_error = None
+
+    @property
+    def query_ids(self):
+        return list(self._queries)
+
+    def get(self, query_id):
+        """Return (records, as_of) from the current snapshot, or (None, None)"""
+        snapshot = self._snapshot
+        if snapshot is None or query_id not in snapshot["results"]:
+            return None, None
+        return snapshot["results"][query_id], snapshot["as_of"]
+
+    def status(self):
+        """Snapshot age and watermark, for health reporting"""
+        snapshot = self._snapshot
+        return {
+            "warm": snapshot is not None,
+            "as_of": snapshot["as_of"] if snapshot else None,
+            "watermark": snapshot["watermark"] if snapshot else None,
+            "queries": self.query_ids,
+            "last_error": self.last_error,
+        }
+
+    def _watermark(self):
+        records, error = self._execute(WATERMARK_QUERY, None)
+        if error:
+            raise RuntimeError(error)
+        return records[0] if records else {}
+
+    def refresh(self, watermark=None):
+        """Recompute every query, then swap the whole snapshot in at once"""
+        if watermark is None:
+            watermark = self._watermark()
+        as_of = datetime.now().isoformat(timespec='seconds')
+        results = {}
+        for query_id, info in self._queries.items():
+            records, error = self._execute(info["query"], None)
+            if error:
+                raise RuntimeError(f"{query_id}: {error}")
+            results[query_id] = records
+        self._snapshot = {
+            "as_of": as_of,
+            "watermark": watermark,
+            "refreshed_at": time.time(),
+            "results": results,
+        }
+
+    def refresh_if_stale(self):
+        """Refresh when the watermark moved or the snapshot exceeded its max age"""
+        watermark = self._watermark()
+        snapshot = self._snapshot
+        if (snapshot is None
+                or snapshot["watermark"] != watermark
+                or time.time() - snapshot["refreshed_at"] >= CACHE_CONFIG['max_age_seconds']):
+            self.refresh(watermark)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_if_stale()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(CACHE_CONFIG['poll_seconds'])
+
+    def start(self):
+        """Start the background refresher (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="query-cache", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
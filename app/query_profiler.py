@@ -0,0 +1,263 @@
+"""
+Query plan capture and regression detection for dashboard queries
+
+Run every entry in QUERIES and diff against a saved baseline:
+    python query_profiler.py                  # compare against plan_baseline.json
+    python query_profiler.py --save-baseline  # record the current plans as the baseline
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+from config import PROFILING_CONFIG
+
+SHOWPLAN_NS = '{http://schemas.microsoft.com/sqlserver/2004/07/showplan}'
+
+# Sample values used by the CLI for parameterized queries
+DEFAULT_PARAMS = {
+    "date": "2025-12-01",
+    "year": "2025",
+    "start_date": "2025-01-01",
+    "end_date": "2025-12-31",
+}
+
+# Read increases smaller than this are treated as noise
+MIN_READS_DELTA = 50
+
+IO_PATTERN = re.compile(r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+)")
+EXEC_TIME_PATTERN = re.compile(r"Execution Times:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+COMPILE_TIME_PATTERN = re.compile(r"parse and compile time:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+
+
+def run_profiled(conn, sql, param_values=None):
+    """Execute sql with STATISTICS IO/TIME/XML on; returns (DataFrame, profile)"""
+    cursor = conn.cursor()
+    cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON; SET STATISTICS XML ON;")
+    try:
+        cursor.execute(sql, param_values or [])
+        df = None
+        plans = []
+        messages = list(cursor.messages)
+        while True:
+            if cursor.description:
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+                if len(columns) == 1 and 'Showplan' in columns[0]:
+                    plans.extend(row[0] for row in rows)
+                elif df is None:
+                    df = pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+            if not cursor.nextset():
+                break
+            messages.extend(cursor.messages)
+    finally:
+        cursor.execute("SET STATISTICS XML OFF; SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
+        cursor.close()
+
+    profile = parse_statistics(message for _, message in messages)
+    profile.update(summarize_plans(plans))
+    return df if df is not None else pd.DataFrame(), profile
+
+
+def parse_statistics(messages):
+    """Pull logical reads and CPU/elapsed times out of STATISTICS IO/TIME messages"""
+    reads = {}
+    cpu_ms = elapsed_ms = compile_ms = 0
+    for message in messages:
+        for table, _, logical in IO_PATTERN.findall(message):
+            reads[table] = reads.get(table, 0) + int(logical)
+        for cpu, elapsed in EXEC_TIME_PATTERN.findall(message):
+            cpu_ms += int(cpu)
+            elapsed_ms += int(elapsed)
+        for _, elapsed in COMPILE_TIME_PATTERN.findall(message):
+            compile_ms += int(elapsed)
+    return {
+        "logical_reads": sum(reads.values()),
+        "reads_by_table": reads,
+        "cpu_ms": cpu_ms,
+        "elapsed_ms": elapsed_ms,
+        "compile_ms": compile_ms,
+    }
+
+
+def _child_ops(element):
+    """RelOp elements directly beneath element, skipping wrapper nodes"""
+    for child in element:
+        if child.tag == SHOWPLAN_NS + 'RelOp':
+            yield child
+        else:
+            yield from _child_ops(child)
+
+
+def _own_objects(element):
+    """Table.Index names referenced by an operator itself, not its inputs"""
+    for child in element:
+        if child.tag == SHOWPLAN_NS + 'RelOp':
+            continue
+        if child.tag == SHOWPLAN_NS + 'Object':
+            name = child.get('Table', '').strip('[]')
+            if child.get('Index'):
+                name += '.' + child.get('Index').strip('[]')
+            yield name
+        else:
+            yield from _own_objects(child)
+
+
+def _shape(relop):
+    """Canonical operator tree, ignoring costs and row counts"""
+    label = relop.get('PhysicalOp')
+    objects = sorted(set(_own_objects(relop)))
+    if objects:
+        label += '[' + ','.join(objects) + ']'
+    children = [_shape(child) for child in _child_ops(relop)]
+    if children:
+        label += '(' + ','.join(children) + ')'
+    return label
+
+
+def summarize_plans(plans):
+    """Fingerprint the plan shape and total the optimizer's estimates"""
+    shapes = []
+    subtree_cost = 0.0
+    est_rows = 0.0
+    for plan_xml in plans:
+        root = ET.fromstring(plan_xml)
+        for stmt in root.iter(SHOWPLAN_NS + 'StmtSimple'):
+            subtree_cost += float(stmt.get('StatementSubTreeCost', 0))
+            est_rows += float(stmt.get('StatementEstRows', 0))
+            shapes.extend(_shape(relop) for relop in _child_ops(stmt))
+    shape = ';'.join(shapes)
+    return {
+        "fingerprint": hashlib.sha1(shape.encode()).hexdigest()[:12] if shape else None,
+        "plan_shape": shape,
+        "subtree_cost": round(subtree_cost, 4),
+        "estimated_rows": round(est_rows, 1),
+    }
+
+
+def compare_profiles(baseline, current, reads_threshold=None):
+    """List regressions of current against baseline (plan shape and logical reads)"""
+    if reads_threshold is None:
+        reads_threshold = PROFILING_CONFIG['reads_threshold']
+    regressions = []
+    if not baseline:
+        return regressions
+    if baseline.get('fingerprint') and current.get('fingerprint') != baseline['fingerprint']:
+        regressions.append({
+            "type": "plan_changed",
+            "baseline": baseline['fingerprint'],
+            "current": current.get('fingerprint'),
+        })
+    base_reads = baseline.get('logical_reads', 0)
+    reads = current.get('logical_reads', 0)
+    if reads - base_reads >= MIN_READS_DELTA and reads > base_reads * (1 + reads_threshold):
+        regressions.append({
+            "type": "logical_reads",
+            "baseline": base_reads,
+            "current": reads,
+            "change_pct": round((reads - base_reads) / base_reads * 100, 1) if base_reads else None,
+        })
+    return regressions
+
+
+def load_baseline(path=None):
+    """Read saved profiles keyed by query id, or {} if there is no baseline yet"""
+    path = path or PROFILING_CONFIG['baseline_path']
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(profiles, path=None):
+    """Write profiles keyed by query id as the new baseline"""
+    path = path or PROFILING_CONFIG['baseline_path']
+    with open(path, 'w') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+
+
+class ProfileStore:
+    """Latest profile per query, checked against the saved baseline as it arrives"""
+
+    def __init__(self, baseline=None):
+        self._lock = threading.Lock()
+        self._baseline = baseline if baseline is not None else load_baseline()
+        self._profiles = {}
+
+    def record(self, label, profile):
+        """Store a profile and return it annotated with any regressions"""
+        profile = dict(profile, regressions=compare_profiles(self._baseline.get(label), profile))
+        with self._lock:
+            self._profiles[label] = profile
+        return profile
+
+    def snapshot(self):
+        """All recorded profiles keyed by query id"""
+        with self._lock:
+            return dict(self._profiles)
+
+
+def main(argv=None):
+    from flask_api import get_db_connection, bind_params
+    from queries import QUERIES
+
+    parser = argparse.ArgumentParser(description="Profile all QUERIES and diff against a saved baseline")
+    parser.add_argument('--baseline', default=PROFILING_CONFIG['baseline_path'], help="Baseline JSON path")
+    parser.add_argument('--save-baseline', action='store_true', help="Save current profiles as the baseline")
+    parser.add_argument('--threshold', type=float, default=PROFILING_CONFIG['reads_threshold'],
+                        help="Allowed fractional increase in logical reads")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help="Override a sample query parameter")
+    args = parser.parse_args(argv)
+
+    sample_params = dict(DEFAULT_PARAMS)
+    sample_params.update(p.split('=', 1) for p in args.param)
+
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed")
+        return 2
+
+    baseline = load_baseline(args.baseline)
+    profiles = {}
+    regressed = 0
+    print(f"{'Query':<28} {'Plan':<13} {'Reads':>9} {'CPU ms':>7} {'Elapsed':>8}  Status")
+    for query_id, info in QUERIES.items():
+        params = {name: sample_params[name] for name in info["params"]}
+        sql, values = bind_params(info["query"], params)
+        try:
+            _, profile = run_profiled(conn, sql, values)
+        except Exception as e:
+            print(f"{query_id:<28} ERROR: {e}")
+            regressed += 1
+            continue
+        profiles[query_id] = profile
+        regressions = compare_profiles(baseline.get(query_id), profile, args.threshold)
+        if not baseline.get(query_id):
+            status = "new"
+        elif regressions:
+            status = "REGRESSED: " + ", ".join(
+                f"{r['type']} {r['baseline']} -> {r['current']}" for r in regressions
+            )
+            regressed += 1
+        else:
+            status = "ok"
+        print(f"{query_id:<28} {profile['fingerprint'] or '-':<13} {profile['logical_reads']:>9} "
+              f"{profile['cpu_ms']:>7} {profile['elapsed_ms']:>8}  {status}")
+    conn.close()
+
+    if args.save_baseline:
+        save_baseline(profiles, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+In-memory interval index of active reservations for fast table availability lookups
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Reservations only store a start time; each one holds its table for this long
+SLOT_MINUTES = 120
+
+# Reservations written by other API processes or directly in SQL are picked up by a reload this often
+RELOAD_INTERVAL_SECONDS = 60
+
+# Only these statuses occupy a table
+ACTIVE_STATUSES = ('Pending', 'Confirmed')
+
+# Every status allowed by CK_RESERVATIONS_Status
+RESERVATION_STATUSES = ('Pending', 'Confirmed', 'Completed', 'Canceled')
+
+TABLES_QUERY = """
+    SELECT TableID, TableNumber, Capacity
+    FROM TABLES
+"""
+
+ACTIVE_RESERVATIONS_QUERY = """
+    SELECT ReservationID, TableID, ReservationDateTime
+    FROM RESERVATIONS
+    WHERE Status IN ('Pending', 'Confirmed')
+        AND ReservationDateTime >= :since
+"""
+
+
+class AvailabilityIndex:
+    """Per-table sorted start times of active reservations"""
+
+    def __init__(self, fetch_dataframe, slot_minutes=SLOT_MINUTES):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self._slot = timedelta(minutes=slot_minutes)
+        # Writers hold this around check-and-insert so a slot cannot be double-booked
+        self.lock = threading.RLock()
+        self._tables = {}        # TableID -> {"TableID", "TableNumber", "Capacity"}
+        self._by_capacity = []   # sorted (Capacity, TableNumber, TableID)
+        self._starts = {}        # TableID -> sorted list of start datetimes
+        self._reservations = {}  # ReservationID -> (TableID, start)
+        self._loaded_at = 0.0
+        self.loaded = False
+
+    @property
+    def stale(self):
+        """True when the index has not been reloaded within RELOAD_INTERVAL_SECONDS"""
+        return time.time() - self._loaded_at >= RELOAD_INTERVAL_SECONDS
+
+    def load(self):
+        """(Re)build the index from the database; returns an error or None"""
+        tables, error = self._fetch(TABLES_QUERY, None)
+        if error:
+            return error
+        # Reservations that started before now - slot can no longer block anything
+        since = (datetime.now() - self._slot).strftime('%Y-%m-%d %H:%M:%S')
+        active, error = self._fetch(ACTIVE_RESERVATIONS_QUERY, {"since": since})
+        if error:
+            return error
+
+        starts = {int(t): [] for t in tables['TableID']}
+        reservations = {}
+        active = active.sort_values('ReservationDateTime')
+        for reservation_id, table_id, start in active.itertuples(index=False):
+            start = pd.Timestamp(start).to_pydatetime()
+            starts.setdefault(int(table_id), []).append(start)
+            reservations[int(reservation_id)] = (int(table_id), start)
+
+        with self.lock:
+            self._tables = {
+                int(row.TableID): {
+                    "TableID": int(row.TableID),
+                    "TableNumber": int(row.TableNumber),
+                    "Capacity": int(row.Capacity),
+                }
+                for row in tables.itertuples(index=False)
+            }
+            self._by_capacity = sorted(
+                (t["Capacity"], t["TableNumber"], t["TableID"]) for t in self._tables.values()
+            )
+            self._starts = starts
+            self._reservations = reservations
+            self._loaded_at = time.time()
+            self.loaded = True
+        return None
+
+    def table(self, table_id):
+        """Table details, or None if the table does not exist"""
+        with self.lock:
+            return self._tables.get(table_id)
+
+    def contains(self, reservation_id):
+        """True if the reservation is active in the index"""
+        with self.lock:
+            return reservation_id in self._reservations
+
+    def is_free(self, table_id, start):
+        """True if no active reservation on the table overlaps a slot starting at start"""
+        with self.lock:
+            starts = self._starts.get(table_id, [])
+            # Overlap means another start lies strictly within one slot of ours
+            i = bisect_right(starts, start - self._slot)
+            return i == len(starts) or starts[i] >= start + self._slot
+
+    def available_tables(self, start, guests):
+        """Tables with Capacity >= guests that are free at start, smallest first"""
+        with self.lock:
+            first = bisect_left(self._by_capacity, (guests,))
+            return [
+                self._tables[table_id]
+                for _, _, table_id in self._by_capacity[first:]
+                if self.is_free(table_id, start)
+            ]
+
+    def best_fit(self, start, guests):
+        """Smallest free table that seats the party, or None"""
+        with self.lock:
+            first = bisect_left(self._by_capacity, (guests,))
+            for _, _, table_id in self._by_capacity[first:]:
+                if self.is_free(table_id, start):
+                    return self._tables[table_id]
+            return None
+
+    def add(self, reservation_id, table_id, start):
+        """Record a newly active reservation"""
+        with self.lock:
+            self.remove(reservation_id)
+            insort(self._starts.setdefault(table_id, []), start)
+            self._reservations[reservation_id] = (table_id, start)
+
+    def remove(self, reservation_id):
+        """Forget a reservation that is no longer active"""
+        with self.lock:
+            entry = self._reservations.pop(reservation_id, None)
+            if entry is None:
+                return
+            table_id, start = entry
+            starts = self._starts[table_id]
+            del starts[bisect_left(starts, start)]
@@ -0,0 +1,380 @@
+"""
+In-memory sales cube over order line items: dictionary-encoded dimensions and NumPy measures
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Minimum number of seconds between two incremental refreshes
+REFRESH_INTERVAL_SECONDS = 60
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Stored per line item, or derived from stored columns at query time
+DIMENSIONS = ['category', 'item', 'order_type', 'payment_status', 'staff',
+              'year', 'month', 'date', 'weekday', 'hour']
+MEASURES = ['revenue', 'quantity', 'lines', 'orders', 'avg_ticket']
+
+# Every line of an order shares these, so distinct orders can be counted from first lines only
+ORDER_LEVEL_DIMENSIONS = {'order_type', 'payment_status', 'staff', 'year', 'month', 'date', 'weekday', 'hour'}
+
+# Above this many possible groups, keys are compacted with np.unique instead of np.bincount
+DENSE_GROUP_LIMIT = 1 << 20
+
+ITEMS_QUERY = """
+    SELECT mi.MenuItemID, mi.Name AS Item, mc.Name AS Category
+    FROM MENUITEMS mi
+    JOIN MENUCATEGORIES mc ON mi.CategoryID = mc.CategoryID
+"""
+
+STAFF_QUERY = """
+    SELECT StaffID, FirstName + ' ' + LastName AS StaffName
+    FROM STAFF
+"""
+
+UPPER_BOUND_QUERY = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) AS UpperBound"
+
+# New line items since the last load; a seek on the ORDERITEMS primary key
+LINES_QUERY = """
+    SELECT oi.OrderItemID, oi.OrderID, oi.MenuItemID, oi.Quantity,
+        oi.Quantity * oi.PriceAtPurchase AS Revenue,
+        o.StaffID, o.OrderType, o.PaymentStatus, o.OrderDateTime
+    FROM ORDERITEMS oi
+    JOIN ORDERS o ON oi.OrderID = o.OrderID
+    WHERE oi.OrderItemID > :last_item_id
+"""
+
+# Orders updated since the last load (payment status, staff, type or date changes)
+CHANGED_ORDERS_QUERY = """
+    SELECT OrderID, StaffID, OrderType, PaymentStatus, OrderDateTime
+    FROM ORDERS
+    WHERE RowVer >= CAST(:since AS BINARY(8))
+        AND RowVer < CAST(:upper AS BINARY(8))
+"""
+
+
+class Dictionary:
+    """Maps raw values to dense integer codes, assigning new codes as values appear"""
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        if value not in self._codes:
+            self._codes[value] = len(self.values)
+            self.values.append(value)
+        return self._codes[value]
+
+    def encode(self, raw):
+        """Codes for an array of raw values; only the distinct values are looked up in Python"""
+        uniques, inverse = np.unique(np.asarray(raw), return_inverse=True)
+        codes = np.array([self.code(value) for value in uniques.tolist()], dtype=self.dtype)
+        return codes[inverse.ravel()]
+
+
+class Column:
+    """Growable NumPy array with amortized O(1) appends"""
+
+    def __init__(self, dtype):
+        self.data = np.empty(1024, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class SalesCube:
+    """One row per order line item; group-bys and filters are vectorized over the code arrays"""
+
+    def __init__(self, fetch_dataframe):
+        # fetch_dataframe(query, params) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._last_item_id = 0
+        self._max_order_id = 0
+        self._since = None
+        self._items = Dictionary(np.uint16)       # MenuItemID
+        self._categories = Dictionary(np.uint8)   # category name
+        self._item_category = Column(np.uint8)    # item code -> category code
+        self._item_names = {}                     # MenuItemID -> name
+        self._item_category_names = {}            # MenuItemID -> category name
+        self._staff = Dictionary(np.uint16)       # StaffID
+        self._staff_names = {}                    # StaffID -> name
+        self._order_types = Dictionary(np.uint8)
+        self._statuses = Dictionary(np.uint8)
+        self._columns = {
+            'order_id': Column(np.int32),
+            'first_line': Column(np.bool_),   # first line item seen for its order
+            'item': Column(np.uint16),
+            'staff': Column(np.uint16),
+            'order_type': Column(np.uint8),
+            'payment_status': Column(np.uint8),
+            'day': Column(np.int32),       # days since 1970-01-01
+            'hour': Column(np.uint8),
+            'quantity': Column(np.uint16),
+            'revenue': Column(np.float32),
+        }
+
+    @property
+    def size(self):
+        return self._columns['order_id'].size
+
+    def memory(self):
+        """Bytes held by the populated part of every line-item column"""
+        used = sum(column.view().nbytes for column in self._columns.values())
+        return {"lines": self.size, "bytes": used, "bytes_per_line": round(used / self.size, 1) if self.size else None}
+
+    def _load_lookups(self):
+        items, error = self._fetch(ITEMS_QUERY, None)
+        if error:
+            return error
+        staff, error = self._fetch(STAFF_QUERY, None)
+        if error:
+            return error
+        self._item_names = dict(zip(items['MenuItemID'].astype(int), items['Item']))
+        self._item_category_names = dict(zip(items['MenuItemID'].astype(int), items['Category']))
+        self._staff_names = dict(zip(staff['StaffID'].astype(int), staff['StaffName']))
+        return None
+
+    def _encode_items(self, menu_item_ids):
+        codes = self._items.encode(menu_item_ids)
+        # Newly seen items get their category code appended in code order
+        for menu_item_id in self._items.values[self._item_category.size:]:
+            category = self._item_category_names.get(menu_item_id, 'Unknown')
+            self._item_category.extend([self._categories.code(category)])
+        return codes
+
+    def _first_lines(self, order_ids):
+        """Flag the first line of each order in a batch that was not already loaded"""
+        first = np.zeros(len(order_ids), dtype=bool)
+        first[np.unique(order_ids, return_index=True)[1]] = True
+        # Only orders at or below the previous maximum can already have lines in the cube
+        maybe_loaded = np.flatnonzero(first & (order_ids <= self._max_order_id))
+        if len(maybe_loaded):
+            loaded = np.isin(order_ids[maybe_loaded], self._columns['order_id'].view())
+            first[maybe_loaded[loaded]] = False
+        return first
+
+    def _upper_bound(self):
+        df, error = self._fetch(UPPER_BOUND_QUERY, None)
+        if error:
+            return None, error
+        return int(df['UpperBound'].iloc[0]), None
+
+    def refresh(self, force=False):
+        """Append new line items and re-encode lines of changed orders; returns an error or None"""
+        with self._lock:
+            if not force and time.time() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return None
+
+            upper, error = self._upper_bound()
+            if error:
+                return error
+            lines, error = self._fetch(LINES_QUERY, {"last_item_id": self._last_item_id})
+            if error:
+                return error
+
+            unknown = (
+                set(lines['MenuItemID'].astype(int)) - set(self._item_names)
+                or set(lines['StaffID'].astype(int)) - set(self._staff_names)
+            )
+            if not self._item_names or unknown:
+                error = self._load_lookups()
+                if error:
+                    return error
+
+            if not lines.empty:
+                when = pd.to_datetime(lines['OrderDateTime'])
+                order_ids = lines['OrderID'].to_numpy(dtype=np.int32)
+                new = {
+                    'order_id': order_ids,
+                    'first_line': self._first_lines(order_ids),
+                    'item': self._encode_items(lines['MenuItemID'].astype(int).to_numpy()),
+                    'staff': self._staff.encode(lines['StaffID'].astype(int).to_numpy()),
+                    'order_type': self._order_types.encode(lines['OrderType'].to_numpy(dtype=str)),
+                    'payment_status': self._statuses.encode(lines['PaymentStatus'].to_numpy(dtype=str)),
+                    'day': when.to_numpy().astype('datetime64[D]').astype(np.int32),
+                    'hour': when.dt.hour.to_numpy(dtype=np.uint8),
+                    'quantity': lines['Quantity'].to_numpy(dtype=np.uint16),
+                    'revenue': pd.to_numeric(lines['Revenue']).to_numpy(dtype=np.float32),
+                }
+                for name, values in new.items():
+                    self._columns[name].extend(values)
+                self._last_item_id = int(lines['OrderItemID'].max())
+                self._max_order_id = max(self._max_order_id, int(order_ids.max()))
+
+            if self._since is not None and upper > self._since:
+                error = self._apply_order_changes(upper)
+                if error:
+                    return error
+            self._since = upper
+            self._last_refresh = time.time()
+            return None
+
+    def _apply_order_changes(self, upper):
+        changed, error = self._fetch(CHANGED_ORDERS_QUERY, {"since": self._since, "upper": upper})
+        if error:
+            return error
+        if changed.empty:
+            return None
+
+        changed = changed.drop_duplicates('OrderID', keep='last').sort_values('OrderID')
+        order_ids = self._columns['order_id'].view()
+        positions = np.flatnonzero(np.isin(order_ids, changed['OrderID'].to_numpy(dtype=np.int32)))
+        if not len(positions):
+            return None
+
+        # Map each affected line to its order's row in the sorted change set
+        rows = np.searchsorted(changed['OrderID'].to_numpy(dtype=np.int32), order_ids[positions])
+        when = pd.to_datetime(changed['OrderDateTime'])
+        updates = {
+            'staff': self._staff.encode(changed['StaffID'].astype(int).to_numpy()),
+            'order_type': self._order_types.encode(changed['OrderType'].to_numpy(dtype=str)),
+            'payment_status': self._statuses.encode(changed['PaymentStatus'].to_numpy(dtype=str)),
+            'day': when.to_numpy().astype('datetime64[D]').astype(np.int32),
+            'hour': when.dt.hour.to_numpy(dtype=np.uint8),
+        }
+        for name, values in updates.items():
+            self._columns[name].data[positions] = values[rows]
+        return None
+
+    def _dimension(self, name, columns):
+        """(codes, cardinality, labels for codes) for a stored or derived dimension"""
+        if name == 'item':
+            labels = [self._item_names.get(v, f'Item {v}') for v in self._items.values]
+            return columns['item'], len(labels), labels
+        if name == 'category':
+            mapping = self._item_category.view()
+            return mapping[columns['item']], len(self._categories), list(self._categories.values)
+        if name == 'staff':
+            labels = [self._staff_names.get(v, f'Staff {v}') for v in self._staff.values]
+            return columns['staff'], len(labels), labels
+        if name == 'order_type':
+            return columns['order_type'], len(self._order_types), list(self._order_types.values)
+        if name == 'payment_status':
+            return columns['payment_status'], len(self._statuses), list(self._statuses.values)
+        if name == 'hour':
+            return columns['hour'], 24, list(range(24))
+        if name == 'weekday':
+            # 1970-01-01 was a Thursday
+            return (columns['day'] + 3) % 7, 7, WEEKDAYS
+
+        # Calendar dimensions map each line's day through a lookup table over the covered days
+        days = columns['day']
+        first = int(days.min(initial=0))
+        calendar = np.arange(first, int(days.max(initial=0)) + 1).astype('datetime64[D]')
+        offset = days - first
+        if name == 'date':
+            return offset, len(calendar), np.datetime_as_string(calendar).tolist()
+        months, month_of_day = np.unique(calendar.astype('datetime64[M]'), return_inverse=True)
+        if name == 'month':
+            return month_of_day.ravel()[offset], len(months), np.datetime_as_string(months).tolist()
+        years, year_of_month = np.unique(months.astype('datetime64[Y]'), return_inverse=True)
+        year_of_day = year_of_month.ravel()[month_of_day.ravel()]
+        return year_of_day[offset], len(years), [int(str(year)) for year in years]
+
+    def query(self, by, measures, filters=None, start=None, end=None, sort=None, limit=None):
+        """Group line items by dimensions; returns (DataFrame, error)
+
+        filters maps a dimension to the labels to keep; start/end bound the order date.
+        Groups come out in dimension order unless sorted (descending) by a measure.
+        """
+        error = self.refresh()
+        if error and not self.size:
+            return None, error
+
+        with self._lock:
+            columns = {name: column.view() for name, column in self._columns.items()}
+            mask = None
+            if start is not None:
+                mask = columns['day'] >= np.datetime64(start, 'D').astype(np.int64)
+            if end is not None:
+                before = columns['day'] < np.datetime64(end, 'D').astype(np.int64)
+                mask = before if mask is None else mask & before
+            for name, wanted in (filters or {}).items():
+                codes, cardinality, labels = self._dimension(name, columns)
+                allowed = np.zeros(max(cardinality, 1), dtype=bool)
+                allowed[[i for i, label in enumerate(labels) if str(label) in wanted]] = True
+                mask = allowed[codes] if mask is None else mask & allowed[codes]
+            dims = [self._dimension(name, columns) for name in by]
+
+        # One integer key per group: mixed-radix combination of the dimension codes.
+        # Filtered-out lines go to an extra sentinel group instead of copying every column.
+        shape = tuple(max(cardinality, 1) for _, cardinality, _ in dims)
+        groups = int(np.prod(shape, dtype=np.int64))
+        key = np.zeros(len(columns['order_id']), dtype=np.int32 if groups < 2**31 - 1 else np.int64)
+        for codes, cardinality, _ in dims:
+            key *= max(cardinality, 1)
+            key += codes
+        present = None
+        if groups > DENSE_GROUP_LIMIT:
+            if mask is not None:
+                key[~mask] = -1
+            present, key = np.unique(key, return_inverse=True)
+            key = key.ravel()
+            groups = len(present)
+            if mask is not None and present[0] == -1:
+                present = present[1:]
+                key -= 1
+                key[key < 0] = groups - 1
+                groups -= 1
+        elif mask is not None:
+            key[~mask] = groups
+
+        def total(weights=None, keys=key):
+            return np.bincount(keys, weights=weights, minlength=groups + 1)[:groups]
+
+        totals = {'lines': total()}
+        if 'revenue' in measures or 'avg_ticket' in measures:
+            totals['revenue'] = total(columns['revenue'])
+        if 'quantity' in measures:
+            totals['quantity'] = total(columns['quantity']).astype(np.int64)
+        if 'orders' in measures or 'avg_ticket' in measures:
+            if ORDER_LEVEL_DIMENSIONS.issuperset(list(by) + list(filters or {})):
+                # Each order falls in exactly one group, so counting its first line is enough
+                totals['orders'] = total(keys=key[columns['first_line']])
+            else:
+                # An order can span several item groups: count distinct (group, order) pairs
+                radix = self._max_order_id + 1
+                selected = key < groups
+                pairs = np.sort(key[selected].astype(np.int64) * radix + columns['order_id'][selected])
+                distinct = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+                totals['orders'] = total(keys=distinct // radix)
+        if 'avg_ticket' in measures:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                totals['avg_ticket'] = np.where(totals['orders'] > 0, totals['revenue'] / totals['orders'], np.nan)
+
+        nonempty = np.flatnonzero(totals['lines'])
+        group_keys = nonempty if present is None else present[nonempty]
+        result = {}
+        if dims:
+            for (codes, _, labels), name, index in zip(dims, by, np.unravel_index(group_keys, shape)):
+                result[name] = np.asarray(labels, dtype=object)[index]
+        for measure in measures:
+            values = totals[measure][nonempty]
+            result[measure] = np.round(values, 2) if values.dtype.kind == 'f' else values
+        df = pd.DataFrame(result, columns=list(by) + list(measures))
+        if sort:
+            df = df.sort_values(sort, ascending=False, na_position='last', kind='stable')
+        if limit:
+            df = df.head(limit)
+        df = df.reset_index(drop=True)
+        # NaN is not valid JSON
+        return df.astype(object).where(df.notna(), None), None
@@ -0,0 +1,234 @@
+"""
+Scatter-gather execution of named queries across several location databases
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from queries import QUERIES
+
+
+def _loyalty_tier(orders):
+    return np.select(
+        [orders >= 50, orders >= 20, orders >= 10],
+        ['VIP', 'Gold', 'Silver'],
+        default='Bronze'
+    )
+
+
+def _ratio(numerator, denominator, scale=1):
+    return numerator / denominator.replace(0, np.nan) * scale
+
+
+# How each query's per-location rows are combined:
+#   keys        -- columns identifying the same entity across locations (IDs differ per database)
+#   sum/min/max/mean -- column reductions
+#   weighted    -- {column: weight column}; averages are re-weighted by their underlying counts
+#   derive      -- recomputes ratios and averages from the merged sums
+#   filter      -- applied after merging (HAVING thresholds must see every location)
+#   location_totals -- columns holding one per-location value (e.g. its table count), summed across locations;
+#                  the shard query returns a row with empty keys when the location has nothing else
+#   shard_query -- variant sent to each location when the original pre-filters or truncates
+#   concat      -- location-specific entities (staff, tables) are tagged and stacked
+MERGE_SPECS = {
+    "top_menu_items_daily": {
+        "keys": ["MenuItem"],
+        "sum": ["OrderCount", "TotalQuantity", "Revenue"],
+        # Every item is fetched from every location so the global top 5 is exact
+        "shard_query": QUERIES["top_menu_items_daily"]["query"].replace("SELECT TOP 5", "SELECT"),
+        "sort": ("Revenue", False),
+        "top": 5,
+    },
+    "menu_item_performance": {
+        "keys": ["Name", "Category"],
+        "sum": ["TimesSold", "TotalQuantity", "TotalRevenue"],
+        "weighted": {"AvgPrice": "TimesSold"},
+        "sort": ("TotalRevenue", False),
+    },
+    "customer_loyalty": {
+        "keys": ["Email", "CustomerName"],
+        "sum": ["TotalOrders", "TotalSpent"],
+        "min": ["FirstOrder"],
+        "max": ["LastOrder"],
+        "shard_query": QUERIES["customer_loyalty"]["query"].replace("HAVING COUNT(o.OrderID) >= 5", ""),
+        "derive": lambda df: df.assign(
+            AvgOrderValue=_ratio(df["TotalSpent"], df["TotalOrders"]),
+            CustomerLifespanDays=(pd.to_datetime(df["LastOrder"]) - pd.to_datetime(df["FirstOrder"])).dt.days,
+            LoyaltyTier=_loyalty_tier(df["TotalOrders"]),
+        ),
+        "filter": lambda df: df[df["TotalOrders"] >= 5],
+        "sort": ("TotalSpent", False),
+    },
+    "staff_performance": {
+        "concat": True,
+        "sort": ("TotalSales", False),
+    },
+    "monthly_trends": {
+        "keys": ["Month", "MonthName"],
+        # Customers are registered per location, so distinct counts add up
+        "sum": ["TotalOrders", "Revenue", "UniqueCustomers", "DineInOrders", "TakeoutOrders", "DeliveryOrders"],
+        "derive": lambda df: df.assign(AvgOrderValue=_ratio(df["Revenue"], df["TotalOrders"])),
+        "sort": ("Month", True),
+    },
+    "profit_analysis": {
+        "keys": ["MenuItem"],
+        "sum": ["TimesSold", "TotalQuantitySold", "TotalRevenue", "TotalProfit"],
+        "mean": ["CurrentPrice", "EstimatedCost"],
+        "derive": lambda df: df.assign(
+            ProfitPerUnit=df["CurrentPrice"] - df["EstimatedCost"],
+            ProfitMargin=_ratio(df["CurrentPrice"] - df["EstimatedCost"], df["CurrentPrice"], 100).round(2),
+        ),
+        "sort": ("TotalProfit", False),
+    },
+    "hourly_orders": {
+        "keys": ["Hour"],
+        "sum": ["OrderCount", "Revenue"],
+        "sort": ("Hour", True),
+    },
+    "weekday_analysis": {
+        "keys": ["DayOfWeek", "DayNumber"],
+        "sum": ["TotalOrders", "TotalRevenue"],
+        "derive": lambda df: df.assign(AvgOrderValue=_ratio(df["TotalRevenue"], df["TotalOrders"])),
+        "sort": ("DayNumber", True),
+    },
+    "table_utilization": {"concat": True},
+    "table_utilization_range": {
+        # The dashboard compares tables by number and size, so the same table slot is combined across locations
+        "keys": ["TableNumber", "Capacity"],
+        "sum": ["TotalReservations", "CompletedReservations", "Canceled", "OccupiedHours", "Seated"],
+        "weighted": {"AvgGuestsPerReservation": "Seated", "UtilizationRate": "Seated"},
+        # Every location covers the same days, so the mean is seatings per day per table
+        "mean": ["TurnoverPerDay"],
+        "shard_query": QUERIES["table_utilization_range"]["query"].replace(
+            "ISNULL(SUM(h.OccupiedSlots), 0) AS OccupiedHours,",
+            "ISNULL(SUM(h.OccupiedSlots), 0) AS OccupiedHours,\n"
+            "                ISNULL(SUM(h.Reservations - h.Canceled), 0) AS Seated,"
+        ),
+        "sort": ("TableNumber", True),
+    },
+    "table_occupancy_heatmap": {
+        "keys": ["DayOfWeek", "DayNumber", "Hour"],
+        "sum": ["OccupiedTableHours"],
+        # Weekday counts depend only on the date range
+        "max": ["Days"],
+        "location_totals": ["Tables"],
+        # Every location reports its tables, even with no occupied slot in the range
+        "shard_query": QUERIES["table_occupancy_heatmap"]["query"].replace(
+            "                Days,\n",
+            "                Days,\n                LocationTables.Tables,\n"
+        ).replace(
+            "            FROM Calendar\n",
+            "            FROM (SELECT COUNT(*) AS Tables FROM TABLES) AS LocationTables\n"
+            "            LEFT JOIN Calendar ON 1 = 1\n"
+        ),
+        "derive": lambda df: df.assign(
+            AvgOccupiedTables=_ratio(df["OccupiedTableHours"], df["Days"]),
+            OccupancyRate=_ratio(df["OccupiedTableHours"], df["Days"] * df["Tables"], 100),
+        ),
+        "sort": (["DayNumber", "Hour"], True),
+    },
+    "customer_retention": {
+        "keys": ["Year", "Month"],
+        "sum": ["TotalCustomers", "ReturnedCustomers"],
+        "derive": lambda df: df.assign(
+            RetentionRate=_ratio(df["ReturnedCustomers"], df["TotalCustomers"], 100)
+        ),
+        "sort": (["Year", "Month"], True),
+    },
+}
+
+
+def merge_results(query_id, frames):
+    """Combine {location: DataFrame} into one result using the query's merge spec"""
+    spec = MERGE_SPECS.get(query_id, {"concat": True})
+    # From every location that responded, before rows are merged by key
+    totals = {
+        column: sum(pd.to_numeric(df[column]).iloc[0] for df in frames.values() if df is not None and not df.empty)
+        for column in spec.get("location_totals", [])
+    }
+    frames = {location: df for location, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return pd.DataFrame()
+
+    if spec.get("concat"):
+        merged = pd.concat(
+            [df.assign(Location=location) for location, df in frames.items()],
+            ignore_index=True
+        )
+    else:
+        combined = pd.concat(frames.values(), ignore_index=True)
+        if totals:
+            # Rows that only carry a location's totals
+            combined = combined.dropna(subset=spec["keys"], how='all')
+        numeric = spec.get("sum", []) + spec.get("mean", []) + list(spec.get("weighted", {}))
+        for column in numeric:
+            combined[column] = pd.to_numeric(combined[column])
+
+        # Weighted averages are re-derived from (average x weight) totals
+        for column, weight in spec.get("weighted", {}).items():
+            combined[column] = combined[column] * combined[weight].astype(float)
+
+        aggregations = {}
+        for op in ("sum", "min", "max", "mean"):
+            for column in spec.get(op, []):
+                aggregations[column] = op
+        for column in spec.get("weighted", {}):
+            aggregations[column] = "sum"
+
+        merged = combined.groupby(spec["keys"], dropna=False, as_index=False).agg(aggregations)
+        # Counted once per location, including locations with no row for a key
+        for column, total in totals.items():
+            merged[column] = total
+        for column, weight in spec.get("weighted", {}).items():
+            merged[column] = _ratio(merged[column], merged[weight].astype(float))
+        if "derive" in spec:
+            merged = spec["derive"](merged)
+        if "filter" in spec:
+            merged = spec["filter"](merged)
+
+    if "sort" in spec:
+        columns, ascending = spec["sort"]
+        merged = merged.sort_values(columns, ascending=ascending)
+    if "top" in spec:
+        merged = merged.head(spec["top"])
+    merged = merged.reset_index(drop=True)
+    # NaN is not valid JSON
+    return merged.astype(object).where(merged.notna(), None)
+
+
+class ScatterGather:
+    """Runs a named query on several locations in parallel and merges the results"""
+
+    def __init__(self, fetch_dataframe, locations, timeout):
+        # fetch_dataframe(query, params, location=..., timeout=...) -> (DataFrame, error)
+        self._fetch = fetch_dataframe
+        self.locations = list(locations)
+        self._timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.locations)),
+                                        thread_name_prefix="shard")
+
+    def run(self, query_id, params, locations=None):
+        """Return (merged DataFrame, missing locations, {location: error})"""
+        locations = locations or self.locations
+        query = MERGE_SPECS.get(query_id, {}).get("shard_query", QUERIES[query_id]["query"])
+        futures = {
+            self._pool.submit(self._fetch, query, params, location=location, timeout=self._timeout): location
+            for location in locations
+        }
+        done, not_done = wait(futures, timeout=self._timeout)
+
+        frames = {}
+        errors = {}
+        for future in done:
+            location = futures[future]
+            df, error = future.result()
+            if error:
+                errors[location] = error
+            else:
+                frames[location] = df
+        for future in not_done:
+            errors[futures[future]] = f"Timed out after {self._timeout}s"
+
+        missing = sorted(errors)
+        return merge_results(query_id, frames), missing, errors
@@ -0,0 +1,175 @@
+"""
+Validation and cost gating for ad-hoc SQL submitted to /api/custom-query
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from config import CUSTOM_QUERY_CONFIG
+
+# Words that may not appear as keywords anywhere in an ad-hoc statement.
+# Quoted identifiers ([CreatedAt], "Update") and string literals are not keywords.
+FORBIDDEN_KEYWORDS = {
+    'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'TRUNCATE', 'DROP', 'ALTER', 'CREATE',
+    'EXEC', 'EXECUTE', 'GRANT', 'REVOKE', 'DENY', 'INTO', 'DECLARE', 'SET', 'USE',
+    'BULK', 'OPENROWSET', 'OPENQUERY', 'OPENDATASOURCE', 'OPENXML', 'WAITFOR',
+    'DBCC', 'BACKUP', 'RESTORE', 'KILL', 'SHUTDOWN', 'RECONFIGURE',
+}
+
+TOKEN_PATTERN = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<line_comment>--[^\n]*)
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<open_comment>/\*)
+    | (?P<string>N?'(?:[^']|'')*')
+    | (?P<bracket_ident>\[(?:[^\]]|\]\])*\])
+    | (?P<quoted_ident>"(?:[^"]|"")*")
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<variable>@@?\w+)
+    | (?P<word>(?:[^\W\d]|\#)[\w$#]*)
+    | (?P<semicolon>;)
+    | (?P<op><>|!=|>=|<=|::|[-+*/%=<>(),.~&|^!])
+""", re.VERBOSE | re.DOTALL)
+
+
+def tokenize(sql):
+    """Split T-SQL into (kind, text) tokens, dropping whitespace and comments"""
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        match = TOKEN_PATTERN.match(sql, pos)
+        if not match:
+            snippet = sql[pos:pos + 20]
+            if sql.startswith("'", pos) or sql.startswith("N'", pos):
+                raise ValueError("Unterminated string literal")
+            raise ValueError(f"Unexpected input near: {snippet}")
+        kind = match.lastgroup
+        if kind == 'open_comment':
+            raise ValueError("Unterminated comment")
+        if kind not in ('space', 'line_comment', 'block_comment'):
+            tokens.append((kind, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def normalize(sql):
+    """Validate a read-only statement; returns (normalized_sql, fingerprint, error)"""
+    try:
+        tokens = tokenize(sql)
+    except ValueError as e:
+        return None, None, str(e)
+
+    # A single trailing semicolon is fine; anything after one is a second statement
+    while tokens and tokens[-1][0] == 'semicolon':
+        tokens.pop()
+    if not tokens:
+        return None, None, "Query is empty"
+    if any(kind == 'semicolon' for kind, _ in tokens):
+        return None, None, "Only a single statement is allowed"
+
+    first = tokens[0][1].upper()
+    if tokens[0][0] != 'word' or first not in ('SELECT', 'WITH'):
+        return None, None, "Only SELECT queries are allowed"
+
+    depth = 0
+    for kind, text in tokens:
+        if kind == 'op' and text == '(':
+            depth += 1
+        elif kind == 'op' and text == ')':
+            depth -= 1
+            if depth < 0:
+                return None, None, "Unbalanced parentheses"
+        elif kind == 'word':
+            word = text.upper()
+            if word in FORBIDDEN_KEYWORDS:
+                return None, None, f"Query contains forbidden keyword: {word}"
+            if word.startswith(('XP_', 'SP_')):
+                return None, None, f"System procedures are not allowed: {text}"
+        elif kind == 'variable':
+            return None, None, "Variables are not allowed"
+    if depth != 0:
+        return None, None, "Unbalanced parentheses"
+
+    # Case, spacing and comments are normalized away; literals are kept because
+    # values such as TOP counts and date bounds change the estimate
+    normalized = ' '.join(text.upper() if kind == 'word' else text for kind, text in tokens)
+    fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+    return normalized, fingerprint, None
+
+
+class _LRU:
+    """Small thread-safe LRU map"""
+
+    def __init__(self, size):
+        self._size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+
+class SqlGuard:
+    """Parses, estimates and gates ad-hoc statements, caching both steps"""
+
+    def __init__(self, estimate_plan):
+        # estimate_plan(sql) -> ({"subtree_cost", "estimated_rows", ...}, error)
+        self._estimate = estimate_plan
+        self._statements = _LRU(CUSTOM_QUERY_CONFIG['cache_size'])  # raw text -> (normalized, fingerprint)
+        self._estimates = _LRU(CUSTOM_QUERY_CONFIG['cache_size'])   # fingerprint -> estimate
+
+    def check(self, sql):
+        """Return (decision, error)
+
+        decision["action"] is 'run' or 'downgrade' when the statement may run, and
+        'invalid', 'estimate_failed' or 'reject' alongside an error otherwise.
+        """
+        cached = True
+        parsed = self._statements.get(sql)
+        if parsed is None:
+            cached = False
+            normalized, fingerprint, error = normalize(sql)
+            if error:
+                return {"action": "invalid"}, error
+            parsed = (normalized, fingerprint)
+            self._statements.put(sql, parsed)
+        normalized, fingerprint = parsed
+
+        estimate = self._estimates.get(fingerprint)
+        if estimate is None:
+            cached = False
+            estimate, error = self._estimate(sql)
+            if error:
+                return {"action": "estimate_failed", "fingerprint": fingerprint}, error
+            self._estimates.put(fingerprint, estimate)
+
+        decision = {
+            "fingerprint": fingerprint,
+            "estimated_cost": estimate["subtree_cost"],
+            "estimated_rows": estimate["estimated_rows"],
+            "cached": cached,
+            "action": "run",
+            "row_limit": None,
+        }
+        if estimate["subtree_cost"] > CUSTOM_QUERY_CONFIG['max_cost']:
+            decision["action"] = "reject"
+            return decision, (
+                f"Estimated cost {estimate['subtree_cost']:.2f} exceeds the limit of "
+                f"{CUSTOM_QUERY_CONFIG['max_cost']:.2f}; add filters or aggregate the query"
+            )
+        if estimate["estimated_rows"] > CUSTOM_QUERY_CONFIG['max_rows']:
+            decision["action"] = "downgrade"
+            decision["row_limit"] = CUSTOM_QUERY_CONFIG['max_rows']
+        return decision, None
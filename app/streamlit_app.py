@@ -6,7 +6,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import requests
-from datetime import datetime, date
+import json
+from datetime import datetime, date, timedelta
 
 # Configuration
 API_BASE_URL = "http://localhost:5000/api"
@@ -52,8 +53,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Location databases selected in the sidebar (empty means the default database)
+selected_locations = []
+
 def fetch_api(endpoint, params=None):
     """Fetch data from Flask API"""
+    if selected_locations and endpoint.startswith("query/"):
+        params = dict(params or {}, locations=",".join(selected_locations))
     try:
         response = requests.get(f"{API_BASE_URL}/{endpoint}", params=params, timeout=30)
         if response.status_code == 200:
@@ -64,6 +70,40 @@ def fetch_api(endpoint, params=None):
     except Exception as e:
         return None, str(e)
 
+def stream_live_events():
+    """Yield (event, error) from the API's server-sent event stream of today's orders"""
+    try:
+        with requests.get(f"{API_BASE_URL}/stream/live", stream=True, timeout=(5, 60)) as response:
+            if response.status_code != 200:
+                yield None, response.json().get('error', 'Unknown error')
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                # Comment lines are keep-alives; each event is carried on one data line
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: "):]), None
+    except requests.exceptions.ConnectionError:
+        yield None, "Cannot connect to API. Make sure Flask server is running."
+    except Exception as e:
+        yield None, str(e)
+
+def render_live_totals(live):
+    """Today's revenue, orders per hour and order-type mix"""
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Revenue Today", f"${live['revenue']:,.2f}")
+    col2.metric("Orders Today", f"{live['orders']:,}")
+    col3.metric("Paid Orders", f"{live['paid_orders']:,}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        hourly = pd.DataFrame({"Hour": range(24), "Orders": live["orders_per_hour"]})
+        fig = px.bar(hourly, x="Hour", y="Orders", title="Orders per Hour (Today)")
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        mix = pd.DataFrame(list(live["order_types"].items()), columns=["OrderType", "Orders"])
+        fig = px.pie(mix, values="Orders", names="OrderType", title="Order Type Mix (Today)")
+        st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"As of {live['as_of']}")
+
 def check_api_health():
     """Check if API is available"""
     data, error = fetch_api("health")
@@ -81,11 +121,22 @@ else:
     st.sidebar.error("❌ API Disconnected")
     st.sidebar.info("Run: `python flask_api.py`")
 
+# Location selection (only shown when the API has location databases configured)
+if api_healthy:
+    locations, _ = fetch_api("locations")
+    if locations:
+        selected_locations = st.sidebar.multiselect(
+            "Locations",
+            [loc['name'] for loc in locations],
+            help="Combine results from several restaurant locations"
+        )
+
 # Navigation
 page = st.sidebar.selectbox(
     "Select Dashboard",
     ["📊 Overview", "🍔 Menu Analytics", "👥 Customer Analytics", 
-     "👨‍💼 Staff Performance", "📈 Revenue Trends", "🔍 Custom Query"]
+     "👨‍💼 Staff Performance", "📈 Revenue Trends", "🪑 Table Utilization",
+     "📦 Inventory Forecast", "🧊 Pivot Explorer", "🔍 Custom Query"]
 )
 
 st.sidebar.markdown("---")
@@ -167,12 +218,41 @@ if page == "📊 Overview":
                     title="Revenue Distribution by Day"
                 )
                 st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("---")
+    st.subheader("🔴 Today")
+    
+    live_placeholder = st.empty()
+    if st.checkbox("Follow live updates", help="Keep this page connected to the API's live order feed"):
+        live = None
+        for event, error in stream_live_events():
+            if error:
+                st.error(f"Error: {error}")
+                break
+            if event["type"] == "snapshot":
+                live = event
+            elif live:
+                # Deltas carry new values for the hours and order types that changed
+                live.update({key: event[key] for key in ("version", "as_of", "revenue", "paid_orders", "orders")})
+                for hour, count in event["orders_per_hour"].items():
+                    live["orders_per_hour"][int(hour)] = count
+                live["order_types"].update(event["order_types"])
+            if live and live["date"]:
+                with live_placeholder.container():
+                    render_live_totals(live)
+    else:
+        live, error = fetch_api("live")
+        if error:
+            st.info(error)
+        elif live:
+            with live_placeholder.container():
+                render_live_totals(live)
 
 # Menu Analytics Page
 elif page == "🍔 Menu Analytics":
     st.header("Menu Item Analytics")
     
-    tab1, tab2, tab3 = st.tabs(["📊 Performance", "💵 Profit Analysis", "📅 Daily Top Items"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Performance", "💵 Profit Analysis", "📅 Daily Top Items", "🧺 Ordered Together"])
     
     with tab1:
         st.subheader("Menu Item Performance")
@@ -266,60 +346,118 @@ elif page == "🍔 Menu Analytics":
                 st.dataframe(df, use_container_width=True)
             else:
                 st.info("No data available for the selected date.")
+    
+    with tab4:
+        st.subheader("Frequently Ordered Together")
+        st.caption("Support: share of orders with both items. Confidence: share of orders with the first item that also have the second. Lift above 1: ordered together more often than chance.")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort = st.selectbox("Rank pairs by", ["lift", "support", "confidence", "orders"])
+        with col2:
+            min_orders = st.number_input("Minimum orders together", min_value=1, value=10, step=5)
+        with col3:
+            limit = st.slider("Pairs", 10, 200, 50, step=10)
+        
+        data, error = fetch_api("basket/pairs", {"sort": sort, "min_orders": min_orders, "limit": limit})
+        
+        if error:
+            st.error(f"Error: {error}")
+        elif data and data['data']:
+            df = pd.DataFrame(data['data'])
+            df['pair'] = df['item'] + " + " + df['with_item']
+            
+            fig = px.scatter(
+                df, x='support', y='confidence', size='orders', color='lift',
+                hover_name='pair', color_continuous_scale='RdYlGn', color_continuous_midpoint=1,
+                title=f"Top {len(df)} Pairs from {data['orders']:,} Orders"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(
+                df[['item', 'with_item', 'orders', 'support', 'confidence', 'reverse_confidence', 'lift']],
+                use_container_width=True
+            )
+            st.caption(f"{data['pairs']:,} item pairs tracked, updated at {data['updated_at']}")
+            
+            st.subheader("📎 Attach Rates")
+            items = df[['item_id', 'item']].drop_duplicates().sort_values('item')
+            item_id = st.selectbox("Menu item", items['item_id'], format_func=dict(zip(items['item_id'], items['item'])).get)
+            companions, error = fetch_api(f"basket/items/{int(item_id)}", {"limit": 15})
+            if error:
+                st.error(f"Error: {error}")
+            elif companions and companions['data']:
+                companions_df = pd.DataFrame(companions['data'])
+                fig = px.bar(
+                    companions_df, x='with_item', y='confidence', color='lift',
+                    color_continuous_scale='RdYlGn', color_continuous_midpoint=1,
+                    labels={'with_item': 'Ordered With', 'confidence': 'Attach Rate'},
+                    title=f"Items Ordered with {companions_df['item'].iloc[0]}"
+                )
+                fig.update_layout(xaxis_tickangle=-45, yaxis_tickformat='.0%')
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No item pairs meet the minimum yet.")
 
 # Customer Analytics Page
 elif page == "👥 Customer Analytics":
     st.header("Customer Analytics")
     
-    tab1, tab2 = st.tabs(["🏆 Loyalty Tiers", "📈 Retention"])
+    tab1, tab2 = st.tabs(["🎯 RFM Segments", "📈 Retention"])
     
     with tab1:
-        st.subheader("Customer Loyalty Analysis")
-        data, error = fetch_api("query/customer_loyalty")
+        st.subheader("RFM Segmentation")
+        st.caption("Recency, frequency and monetary scores (1-5, by quintile) for every customer with paid orders")
+        data, error = fetch_api("rfm/segments")
         
         if error:
             st.error(f"Error: {error}")
-        elif data and 'data' in data:
-            df = pd.DataFrame(data['data'])
+        elif data and data['customers']:
+            segments_df = pd.DataFrame(data['segments'])
+            col1, col2 = st.columns(2)
             
-            if not df.empty:
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Loyalty tier distribution
-                    tier_df = df['LoyaltyTier'].value_counts().reset_index()
-                    tier_df.columns = ['Tier', 'Count']
-                    
-                    colors = {'VIP': '#FFD700', 'Gold': '#FFA500', 'Silver': '#C0C0C0', 'Bronze': '#CD7F32'}
-                    fig = px.pie(
-                        tier_df, values='Count', names='Tier',
-                        title="Customer Loyalty Distribution",
-                        color='Tier',
-                        color_discrete_map=colors
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    # Top spenders
-                    fig = px.bar(
-                        df.head(10), x='CustomerName', y='TotalSpent',
-                        color='LoyaltyTier',
-                        title="Top 10 Customers by Spending"
-                    )
-                    fig.update_layout(xaxis_tickangle=-45)
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Scatter plot
-                fig = px.scatter(
-                    df, x='TotalOrders', y='TotalSpent',
-                    color='LoyaltyTier', size='AvgOrderValue',
-                    hover_name='CustomerName',
-                    title="Orders vs Spending by Customer"
+            with col1:
+                fig = px.bar(
+                    segments_df, x='segment', y='customers',
+                    color='avg_monetary', color_continuous_scale='Blues',
+                    title=f"Customers per Segment ({data['customers']:,} scored)",
+                    labels={'segment': 'Segment', 'customers': 'Customers', 'avg_monetary': 'Avg Spend'}
                 )
+                fig.update_layout(xaxis_tickangle=-45)
                 st.plotly_chart(fig, use_container_width=True)
-                
-                st.subheader("📋 Customer Details")
-                st.dataframe(df, use_container_width=True)
+            
+            with col2:
+                fig = px.imshow(
+                    data['grid'], origin='lower', text_auto=True, color_continuous_scale='Viridis',
+                    x=[1, 2, 3, 4, 5], y=[1, 2, 3, 4, 5],
+                    labels={'x': 'Frequency Score', 'y': 'Recency Score', 'color': 'Customers'},
+                    title="Customers by Recency × Frequency"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            
+            st.dataframe(segments_df, use_container_width=True)
+            st.caption(f"Scored at {data['scored_at']}")
+            
+            st.subheader("📋 Segment Members")
+            segment = st.selectbox("Segment", segments_df.loc[segments_df['customers'] > 0, 'segment'])
+            members, error = fetch_api(f"rfm/segments/{segment}", {"limit": 100})
+            if error:
+                st.error(f"Error: {error}")
+            elif members and members['data']:
+                st.dataframe(pd.DataFrame(members['data']), use_container_width=True)
+            
+            st.subheader("🔎 Customer Lookup")
+            customer_id = st.number_input("Customer ID", min_value=1, step=1)
+            customer, error = fetch_api(f"rfm/customers/{int(customer_id)}")
+            if error:
+                st.info(error)
+            elif customer:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Segment", customer['segment'], f"RFM {customer['rfm']}", delta_color="off")
+                col2.metric("Last Order", f"{customer['recency_days']} days ago")
+                col3.metric("Paid Orders", f"{customer['frequency']:,}")
+                col4.metric("Total Spent", f"${customer['monetary']:,.2f}")
+        else:
+            st.info("No customers with paid orders yet.")
     
     with tab2:
         st.subheader("Customer Retention Analysis")
@@ -400,7 +538,7 @@ elif page == "👨‍💼 Staff Performance":
 elif page == "📈 Revenue Trends":
     st.header("Revenue Trends Analysis")
     
-    tab1, tab2 = st.tabs(["📅 Monthly Trends", "⏰ Hourly Analysis"])
+    tab1, tab2, tab3 = st.tabs(["📅 Monthly Trends", "⏰ Hourly Analysis", "📉 Any Date Range"])
     
     with tab1:
         st.subheader("Monthly Revenue Trends")
@@ -475,12 +613,219 @@ elif page == "📈 Revenue Trends":
                     st.metric("Total Daily Revenue", f"${df['Revenue'].sum():,.2f}")
             else:
                 st.info("No data available for the selected date.")
+    
+    with tab3:
+        st.subheader("Revenue Over Any Date Range")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            range_start = st.date_input("From", date(2024, 1, 1), key="series_start")
+        with col2:
+            range_end = st.date_input("To", date(2024, 12, 31), key="series_end")
+        with col3:
+            metric_labels = {"Revenue": "revenue", "Orders": "orders", "Average Ticket": "avg_ticket"}
+            metric_label = st.selectbox("Metric", list(metric_labels), key="series_metric")
+        with col4:
+            method = st.selectbox("Downsampling", ["lttb", "minmax"], key="series_method",
+                                  help="LTTB keeps the visual shape; min/max keeps every peak and dip")
+        
+        if range_end < range_start:
+            st.warning("The end date must not be before the start date.")
+        else:
+            data, error = fetch_api("timeseries", {
+                "metric": metric_labels[metric_label],
+                "start": range_start.isoformat(),
+                # The end date is inclusive in the picker
+                "end": (range_end + timedelta(days=1)).isoformat(),
+                "method": method,
+            })
+            
+            if error:
+                st.error(f"Error: {error}")
+            elif data and data['data']:
+                df = pd.DataFrame(data['data'])
+                df['Bucket'] = pd.to_datetime(df['Bucket'])
+                column = {"revenue": "Revenue", "orders": "Orders", "avg_ticket": "AvgTicket"}[data['metric']]
+                fig = px.line(
+                    df, x='Bucket', y=column,
+                    title=f"{metric_label} by {data['granularity']}",
+                    labels={'Bucket': data['granularity'].title()}
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption(
+                    f"{data['row_count']:,} of {data['buckets']:,} {data['granularity']} buckets shown"
+                    + (f" ({data['method']} downsampling)" if data['method'] else "")
+                )
+            else:
+                st.info("No paid orders in the selected range.")
+
+# Table Utilization Page
+elif page == "🪑 Table Utilization":
+    st.header("Table Utilization & Turnover")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", date(2025, 1, 1), key="tables_start")
+    with col2:
+        end_date = st.date_input("End Date", date(2025, 12, 31), key="tables_end")
+    
+    range_params = {"start_date": start_date.strftime("%Y-%m-%d"), "end_date": end_date.strftime("%Y-%m-%d")}
+    
+    tab1, tab2 = st.tabs(["🪑 By Table", "🗓️ Weekday × Hour"])
+    
+    with tab1:
+        data, error = fetch_api("query/table_utilization_range", range_params)
+        
+        if error:
+            st.error(f"Error: {error}")
+        elif data and 'data' in data:
+            df = pd.DataFrame(data['data'])
+            
+            if not df.empty:
+                df['Table'] = 'Table ' + df['TableNumber'].astype(str)
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    fig = px.bar(
+                        df, x='Table', y='TurnoverPerDay',
+                        color='Capacity',
+                        title="Seatings per Day by Table"
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                
+                with col2:
+                    fig = px.bar(
+                        df, x='Table', y='UtilizationRate',
+                        color='Capacity',
+                        title="Seat Utilization Rate (%)"
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                
+                st.dataframe(df, use_container_width=True)
+    
+    with tab2:
+        data, error = fetch_api("query/table_occupancy_heatmap", range_params)
+        
+        if error:
+            st.error(f"Error: {error}")
+        elif data and 'data' in data:
+            df = pd.DataFrame(data['data'])
+            
+            if not df.empty:
+                grid = df.pivot_table(
+                    index=['DayNumber', 'DayOfWeek'], columns='Hour', values='OccupancyRate'
+                ).sort_index().droplevel('DayNumber')
+                fig = px.imshow(
+                    grid, aspect='auto', color_continuous_scale='Blues',
+                    labels={'x': 'Hour', 'y': 'Day', 'color': 'Occupancy %'},
+                    title="Table Occupancy by Weekday and Hour"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("No reservations in the selected range.")
+
+# Inventory Forecast Page
+elif page == "📦 Inventory Forecast":
+    st.header("Inventory Depletion Forecast")
+    
+    window = st.selectbox("Velocity Window (days)", [7, 14, 28], index=0)
+    
+    data, error = fetch_api("inventory/forecast", {"window": window})
+    
+    if error:
+        st.error(f"Error: {error}")
+    elif data and 'data' in data:
+        df = pd.DataFrame(data['data'])
+        
+        if not df.empty:
+            st.caption(f"Forecast as of {data['as_of']} using a {window}-day consumption window")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Below Reorder Level", int(df['ForecastStatus'].isin(['OUT OF STOCK', 'BELOW REORDER LEVEL']).sum()))
+            with col2:
+                st.metric("Reorder Soon", int((df['ForecastStatus'] == 'REORDER SOON').sum()))
+            with col3:
+                st.metric("Items Tracked", len(df))
+            
+            chart_df = df.dropna(subset=['DaysToStockout'])
+            if not chart_df.empty:
+                fig = px.bar(
+                    chart_df, x='Item', y='DaysToStockout',
+                    color='ForecastStatus',
+                    title="Projected Days to Stockout"
+                )
+                fig.update_layout(xaxis_tickangle=-45)
+                st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("📋 Forecast Details")
+            st.dataframe(df, use_container_width=True)
+        else:
+            st.info("No inventory data available.")
+
+# Pivot Explorer Page
+elif page == "🧊 Pivot Explorer":
+    st.header("Sales Pivot Explorer")
+    st.caption("Slice order line items by any dimensions; served from the API's in-memory sales cube")
+    
+    dimensions = ["category", "item", "order_type", "payment_status", "staff",
+                  "year", "month", "date", "weekday", "hour"]
+    measure_labels = {"revenue": "Revenue", "quantity": "Quantity", "orders": "Orders",
+                      "avg_ticket": "Average Ticket", "lines": "Line Items"}
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        rows = st.selectbox("Rows", dimensions, index=0)
+    with col2:
+        columns = st.selectbox("Columns", ["(none)"] + [d for d in dimensions if d != rows], index=0)
+    with col3:
+        measure = st.selectbox("Measure", list(measure_labels), format_func=measure_labels.get)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        paid_only = st.checkbox("Paid orders only", value=True)
+    with col2:
+        order_types = st.multiselect("Order Types", ["Dine-In", "Takeout", "Delivery"])
+    with col3:
+        pivot_range = st.date_input("Order Date Range", [], key="pivot_range")
+    
+    by = [rows] + ([columns] if columns != "(none)" else [])
+    params = {"by": ",".join(by), "measures": measure}
+    if paid_only:
+        params["payment_status"] = "Paid"
+    if order_types:
+        params["order_type"] = ",".join(order_types)
+    if len(pivot_range) == 2:
+        params["start"] = pivot_range[0].isoformat()
+        params["end"] = (pivot_range[1] + timedelta(days=1)).isoformat()
+    
+    data, error = fetch_api("cube", params)
+    
+    if error:
+        st.error(f"Error: {error}")
+    elif data and data['data']:
+        df = pd.DataFrame(data['data'])
+        memory = data['memory']
+        st.caption(f"{memory['lines']:,} line items in {memory['bytes'] / 2**20:.1f} MiB "
+                   f"({memory['bytes_per_line']} bytes each)")
+        
+        if len(by) == 2:
+            pivot = df.pivot(index=rows, columns=columns, values=measure).astype(float)
+            fig = px.imshow(pivot, aspect="auto", color_continuous_scale="Blues",
+                            title=f"{measure_labels[measure]} by {rows} and {columns}")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(pivot, use_container_width=True)
+        else:
+            fig = px.bar(df, x=rows, y=measure, title=f"{measure_labels[measure]} by {rows}")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(df, use_container_width=True)
+    else:
+        st.info("No line items match the selected filters.")
 
 # Custom Query Page
 elif page == "🔍 Custom Query":
     st.header("Custom SQL Query")
     
-    st.warning("⚠️ Only SELECT queries are allowed for security reasons.")
+    st.warning("⚠️ Only single SELECT queries are allowed. Queries with a high estimated cost are rejected.")
     
     # Sample queries
     st.subheader("📝 Sample Queries")
@@ -521,6 +866,12 @@ elif page == "🔍 Custom Query":
                 if response.status_code == 200:
                     result = response.json()
                     st.success(f"✅ Query executed successfully! ({result['row_count']} rows)")
+                    estimate = result.get('estimate', {})
+                    if result.get('truncated'):
+                        st.warning(
+                            f"⚠️ The optimizer expected ~{estimate.get('estimated_rows', 0):,.0f} rows, "
+                            f"so results were limited to {estimate.get('row_limit'):,}."
+                        )
                     
                     if result['data']:
                         df = pd.DataFrame(result['data'])
@@ -540,6 +891,49 @@ elif page == "🔍 Custom Query":
                 st.error(f"❌ Error: {str(e)}")
         else:
             st.warning("Please enter a query.")
+    
+    # Large results are written to a file on the server instead of passing through the dashboard
+    st.subheader("📦 Export Full Results")
+    st.caption("Runs the query in the background without a row limit and writes a compressed CSV or Parquet file.")
+    col1, col2 = st.columns(2)
+    with col1:
+        export_format = st.selectbox("Format", ["csv", "parquet"], format_func=lambda fmt: {"csv": "CSV (gzip)", "parquet": "Parquet"}[fmt])
+    with col2:
+        export_name = st.text_input("File name", value="query_results")
+    
+    if st.button("📦 Start Export"):
+        if query.strip():
+            try:
+                response = requests.post(
+                    f"{API_BASE_URL}/exports",
+                    json={"query": query, "format": export_format, "name": export_name},
+                    timeout=30
+                )
+                if response.status_code == 202:
+                    st.success("✅ Export started")
+                else:
+                    st.error(f"❌ Error: {response.json().get('error', 'Unknown error')}")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+        else:
+            st.warning("Please enter a query.")
+    
+    exports, error = fetch_api("exports")
+    if exports and exports['data']:
+        st.button("🔄 Refresh Exports")
+        for job in exports['data']:
+            rate = f", {job['rows_per_second']:,} rows/s" if job['rows_per_second'] else ""
+            label = f"{job['file_name']}: {job['status']}, {job['rows']:,} rows, {job['bytes'] / 2**20:.1f} MiB{rate}"
+            if job['status'] == 'running' and job['progress'] is not None:
+                st.progress(job['progress'], text=label)
+            elif job['status'] == 'completed':
+                # The browser downloads straight from the API, which supports resuming
+                st.markdown(f"✅ [{label}]({API_BASE_URL}/exports/{job['id']}/download)")
+            elif job['status'] == 'failed':
+                st.error(f"{label}: {job['error']}")
+            else:
+                st.info(label)
+        st.caption(f"Finished exports are deleted after {exports['ttl_seconds'] // 60} minutes.")
 
 # Footer
 st.markdown("---")
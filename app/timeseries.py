@@ -0,0 +1,152 @@
+"""
+Revenue, order count and average ticket over arbitrary date ranges, binned and downsampled server-side
+"""
+import numpy as np
+import pandas as pd
+
+METRICS = {
+    'revenue': 'Revenue',
+    'orders': 'Orders',
+    'avg_ticket': 'AvgTicket',
+}
+
+DOWNSAMPLING_METHODS = ['lttb', 'minmax']
+
+# SQL bucket expression and pandas step per granularity, finest first.
+# Day 0 (1900-01-01) was a Monday, so weeks start on Monday.
+GRANULARITIES = {
+    'hour': ("DATEADD(HOUR, DATEDIFF(HOUR, 0, OrderDateTime), 0)", pd.Timedelta(hours=1)),
+    'day': ("DATEADD(DAY, DATEDIFF(DAY, 0, OrderDateTime), 0)", pd.Timedelta(days=1)),
+    'week': ("DATEADD(DAY, DATEDIFF(DAY, 0, OrderDateTime) / 7 * 7, 0)", pd.Timedelta(weeks=1)),
+    'month': ("DATEADD(MONTH, DATEDIFF(MONTH, 0, OrderDateTime), 0)", pd.offsets.MonthBegin()),
+}
+
+# Automatic granularity picks the finest one giving at most this many buckets per
+# output point, so downsampling always has a few candidates per point to choose from
+BUCKETS_PER_POINT = 4
+
+SERIES_QUERY = """
+    SELECT
+        {bucket} AS Bucket,
+        COUNT(*) AS Orders,
+        SUM(TotalAmount) AS Revenue
+    FROM ORDERS
+    WHERE OrderDateTime >= :start AND OrderDateTime < :end
+        AND PaymentStatus = 'Paid'
+    GROUP BY {bucket}
+"""
+
+
+def bucket_range(start, end, granularity):
+    """Every bucket start between start (inclusive) and end (exclusive)"""
+    freq = GRANULARITIES[granularity][1]
+    first = pd.Timestamp(start).replace(minute=0, second=0, microsecond=0, nanosecond=0)
+    if granularity != 'hour':
+        first = first.normalize()
+    if granularity == 'week':
+        first -= pd.Timedelta(days=first.weekday())
+    elif granularity == 'month':
+        first = first.replace(day=1)
+    return pd.date_range(first, pd.Timestamp(end) - pd.Timedelta(microseconds=1), freq=freq)
+
+
+def bucket_count(start, end, granularity):
+    """Upper bound on the number of buckets, without building them"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return int((end - start) / GRANULARITIES[granularity][1]) + 2
+
+
+def choose_granularity(start, end, points):
+    """Finest granularity with at most BUCKETS_PER_POINT buckets per point"""
+    for granularity in GRANULARITIES:
+        if bucket_count(start, end, granularity) <= points * BUCKETS_PER_POINT:
+            return granularity
+    return 'month'
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of threshold points preserving the visual shape"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Interior points are split into threshold - 2 buckets; the ends are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # The third triangle vertex is the average of the next bucket (or the last point)
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def min_max(y, threshold):
+    """Indices of the minimum and maximum of each of threshold / 2 equal groups, in order"""
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    groups = np.array_split(np.arange(n), threshold // 2)
+    selected = []
+    for group in groups:
+        values = y[group]
+        selected.extend(sorted({group[np.argmin(values)], group[np.argmax(values)]}))
+    return np.array(selected, dtype=int)
+
+
+def build_series(fetch_dataframe, start, end, metric, points, granularity=None, method='lttb'):
+    """Return (result dict, error) for one metric between start and end"""
+    granularity = granularity or choose_granularity(start, end, points)
+    buckets = bucket_range(start, end, granularity)
+
+    query = SERIES_QUERY.format(bucket=GRANULARITIES[granularity][0])
+    df, error = fetch_dataframe(query, {"start": start, "end": end})
+    if error:
+        return None, error
+
+    # Buckets without orders are real zeros, not gaps
+    df['Bucket'] = pd.to_datetime(df['Bucket'])
+    series = df.set_index('Bucket').reindex(buckets)
+    orders = series['Orders'].fillna(0).to_numpy(dtype=float)
+    revenue = pd.to_numeric(series['Revenue']).fillna(0).to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_ticket = np.where(orders > 0, revenue / orders, np.nan)
+
+    values = {'Orders': orders, 'Revenue': revenue, 'AvgTicket': avg_ticket}[METRICS[metric]]
+    x = buckets.asi8.astype(float)
+    # Empty buckets have no average ticket; they are skipped rather than drawn as zero
+    candidates = np.flatnonzero(~np.isnan(values))
+    if method == 'minmax':
+        keep = candidates[min_max(values[candidates], points)]
+    else:
+        keep = candidates[lttb(x[candidates], values[candidates], points)]
+
+    result = pd.DataFrame({
+        'Bucket': buckets[keep].strftime('%Y-%m-%dT%H:%M:%S'),
+        'Orders': orders[keep].astype(int),
+        'Revenue': np.round(revenue[keep], 2),
+        'AvgTicket': np.round(avg_ticket[keep], 2),
+    })
+    # NaN is not valid JSON
+    result = result.astype(object).where(result.notna(), None)
+    return {
+        "metric": metric,
+        "granularity": granularity,
+        "method": method if len(keep) < len(candidates) else None,
+        "buckets": len(buckets),
+        "data": result.to_dict(orient='records'),
+        "row_count": len(result),
+    }, None